@@ -0,0 +1,250 @@
+import numpy as np
+import pandas as pd
+
+# --- Default Degradation Thresholds ---
+DEFAULT_THRESHOLDS = {
+    "ttft": 2.0,   # sec, degraded above
+    "tpot": 0.2,   # sec, degraded above
+    "tps": 5.0,    # tokens/sec, degraded below
+}
+
+PEAK_LOAD_QUANTILE = 0.6
+
+
+# --- Helpers ---
+def _column(df, name):
+    return df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def load_column(df):
+    """Concurrency column for load analysis: time-weighted `avg_concurrency` when recorded, else the start snapshot."""
+    if "avg_concurrency" in df.columns and df["avg_concurrency"].notna().any():
+        return "avg_concurrency"
+    return "concurrent_requests"
+
+
+def _first_concurrency(df, mask):
+    """Concurrency at the first row where `mask` is set, or None."""
+    if not mask.any():
+        return None
+    value = _column(df, load_column(df))[mask.argmax()]
+    return None if np.isnan(value) else int(round(value))
+
+
+# --- Load Limits ---
+def failure_mask(df):
+    return (df["status"] != "success").to_numpy()
+
+
+def degradation_mask(df, thresholds=None):
+    """Rows that break any threshold; NaN values never count as degraded."""
+    t = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    with np.errstate(invalid="ignore"):
+        return (
+            (_column(df, "ttft") > t["ttft"])
+            | (_column(df, "tpot") > t["tpot"])
+            | (_column(df, "tps") < t["tps"])
+        )
+
+
+def first_failure_concurrency(df):
+    return _first_concurrency(df, failure_mask(df))
+
+
+def first_degradation_concurrency(df, thresholds=None):
+    return _first_concurrency(df, degradation_mask(df, thresholds))
+
+
+def ttft_at_peak(df, quantile=PEAK_LOAD_QUANTILE):
+    """Mean TTFT over rows at or above the `quantile` of concurrency."""
+    concurrency = _column(df, load_column(df))
+    if len(concurrency) == 0 or np.isnan(concurrency).all():
+        return float("nan")
+    peak = concurrency >= np.nanquantile(concurrency, quantile)
+    return float(np.nanmean(_column(df, "ttft")[peak])) if peak.any() else float("nan")
+
+
+# --- Throughput & Errors ---
+def duration_seconds(df):
+    if len(df) == 0:
+        return 1.0
+    ts = df["timestamp"]
+    return max((ts.max() - ts.min()).total_seconds(), 1)
+
+
+def throughput(df, duration_sec=None):
+    """(tps, rps) over the run's wall-clock duration."""
+    duration_sec = duration_sec or duration_seconds(df)
+    total_tokens = float(np.nansum(_column(df, "tokens_per_request")))
+    return total_tokens / duration_sec, len(df) / duration_sec
+
+
+def error_rate(df):
+    """Failed requests as a percentage of all requests."""
+    return float(failure_mask(df).mean() * 100) if len(df) else 0.0
+
+
+def percentiles(df, column, qs=(50, 95, 99)):
+    """`{q: value}` for a column, ignoring missing values."""
+    values = _column(df, column)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {q: None for q in qs}
+    return dict(zip(qs, (float(v) for v in np.percentile(values, qs))))
+
+
+# --- Dashboard Summary ---
+def summarize(df, thresholds=None, peak_quantile=PEAK_LOAD_QUANTILE):
+    """Every headline number on the Dashboard for one run."""
+    duration_sec = duration_seconds(df)
+    tps, rps = throughput(df, duration_sec)
+    failures = int(failure_mask(df).sum())
+    return {
+        "requests": int(len(df)),
+        "failures": failures,
+        "duration_sec": float(duration_sec),
+        "first_failure_concurrency": first_failure_concurrency(df),
+        "first_degradation_concurrency": first_degradation_concurrency(df, thresholds),
+        "ttft_at_peak": ttft_at_peak(df, peak_quantile),
+        "tps": tps,
+        "rps": rps,
+        "tps_per_request_avg": float(np.nanmean(_column(df, "tps"))) if len(df) else float("nan"),
+        "error_rate": error_rate(df),
+        "ttft_avg": float(np.nanmean(_column(df, "ttft"))) if len(df) else float("nan"),
+        "tpot_avg": float(np.nanmean(_column(df, "tpot"))) if len(df) else float("nan"),
+        "latency_avg": float(np.nanmean(_column(df, "total_latency"))) if len(df) else float("nan"),
+        "tokens_per_request_avg": float(np.nanmean(_column(df, "tokens_per_request"))) if len(df) else float("nan"),
+        "latency_min": float(np.nanmin(_column(df, "total_latency"))) if len(df) else float("nan"),
+        "latency_max": float(np.nanmax(_column(df, "total_latency"))) if len(df) else float("nan"),
+        "latency_percentiles": percentiles(df, "total_latency", (50, 95)),
+    }
+
+
+def run_summary(df):
+    """Per-run aggregates stored in the run index for Benchmark Comparison (JSON-safe)."""
+    duration_sec = duration_seconds(df)
+    tps, rps = throughput(df, duration_sec)
+    summary = {
+        "requests": int(len(df)),
+        "failures": int(failure_mask(df).sum()),
+        "duration_sec": float(duration_sec),
+        "rps": round(rps, 2),
+        "tps": round(tps, 2),
+        "max_ttft": float(np.nanmax(_column(df, "ttft"))) if df["ttft"].notna().any() else None,
+        "max_tpot": float(np.nanmax(_column(df, "tpot"))) if df["tpot"].notna().any() else None,
+        "max_latency": float(np.nanmax(_column(df, "total_latency"))) if df["total_latency"].notna().any() else None,
+    }
+    for col in ["ttft", "tpot", "total_latency"]:
+        for q, value in percentiles(df, col, (50, 95, 99)).items():
+            summary[f"{col}_p{q}"] = value
+    return summary
+
+
+# --- Prefix Cache ---
+def prefix_cache_summary(df):
+    """Hit rate and TTFT for prefix hits vs misses (successful requests), or None without prefix tags."""
+    if "prefix_hit" not in df.columns or df["prefix_hit"].isna().all():
+        return None
+    ok = df[(df["status"] == "success") & df["prefix_hit"].notna()]
+    hits = _column(ok, "prefix_hit") == 1
+    ttft = _column(ok, "ttft")
+    hit_ttft = float(np.nanmedian(ttft[hits])) if hits.any() else float("nan")
+    miss_ttft = float(np.nanmedian(ttft[~hits])) if (~hits).any() else float("nan")
+    return {
+        "hit_rate": float(hits.mean() * 100) if len(ok) else 0.0,
+        "ttft_hit_p50": hit_ttft,
+        "ttft_miss_p50": miss_ttft,
+        "ttft_saving_pct": (1 - hit_ttft / miss_ttft) * 100 if miss_ttft > 0 else float("nan"),
+    }
+
+
+# --- Harness Measurement Error (mock server runs) ---
+def harness_error(df, truth, qs=(50, 95, 99)):
+    """Measured vs server-emitted TTFT and total latency percentiles, from a mock server's `_mock.json` stats.
+
+    The difference is what the harness adds on top of the server: client
+    scheduling, connection setup, HTTP and SSE parsing.
+    """
+    ok = df[df["status"] == "success"]
+    rows = []
+    for metric in ["ttft", "total_latency"]:
+        for q, measured in percentiles(ok, metric, qs).items():
+            server = truth.get(f"{metric}_p{q:g}")
+            if measured is None or server is None:
+                continue
+            rows.append({
+                "metric": metric,
+                "percentile": f"p{q:g}",
+                "server": server,
+                "measured": measured,
+                "error": measured - server,
+                "error_pct": (measured - server) / server * 100 if server else float("nan"),
+            })
+    return pd.DataFrame(rows, columns=["metric", "percentile", "server", "measured", "error", "error_pct"])
+
+
+# --- Multi-Target Runs ---
+def run_targets(df):
+    """Target names tagged on a run's rows, or [] for single-target runs."""
+    if "target" not in df.columns:
+        return []
+    return sorted(t for t in df["target"].dropna().unique() if t != "N/A")
+
+
+def target_summary(df):
+    """One row per target: volume, error rate, throughput over the shared run window, and latency percentiles."""
+    df = df[df["target"].isin(run_targets(df))].assign(failed=lambda d: d["status"] != "success")
+    duration_sec = duration_seconds(df)
+    grouped = df.groupby("target", sort=True)
+    targets = grouped.agg(requests=("status", "size"), failures=("failed", "sum"), tokens=("tokens_per_request", "sum"))
+    targets["error_rate"] = targets["failures"] / targets["requests"] * 100
+    targets["rps"] = targets["requests"] / duration_sec
+    targets["tps"] = targets["tokens"] / duration_sec
+    ok = df[~df["failed"]].groupby("target")
+    for col in ["ttft", "tpot", "total_latency"]:
+        quantiles = ok[col].quantile([0.5, 0.95, 0.99]).unstack()
+        for q in [0.5, 0.95, 0.99]:
+            targets[f"{col}_p{int(q * 100)}"] = quantiles[q] if q in quantiles else np.nan
+    return targets.drop(columns=["tokens"]).reset_index()
+
+
+# --- Cross-Run History ---
+HISTORY_COLUMNS = ["run_id", "date", "endpoint", "model", "timestamp", "status", "ttft", "tpot", "total_latency", "tokens_per_request"]
+
+
+def history_summary(df):
+    """One row per run from columnar-store rows: volume, error rate, throughput and latency percentiles."""
+    if df.empty:
+        return pd.DataFrame(columns=["run_id", "date", "endpoint", "model", "requests", "error_rate", "rps", "tps"])
+    df = df.assign(failed=(df["status"] != "success"))
+    grouped = df.groupby("run_id", sort=True)
+    runs = grouped.agg(
+        date=("date", "first"),
+        endpoint=("endpoint", "first"),
+        model=("model", "first"),
+        start=("timestamp", "min"),
+        end=("timestamp", "max"),
+        requests=("status", "size"),
+        failures=("failed", "sum"),
+        tokens=("tokens_per_request", "sum"),
+    )
+    duration = (runs["end"] - runs["start"]).dt.total_seconds().clip(lower=1)
+    runs["error_rate"] = runs["failures"] / runs["requests"] * 100
+    runs["rps"] = runs["requests"] / duration
+    runs["tps"] = runs["tokens"] / duration
+    for col in ["ttft", "tpot", "total_latency"]:
+        quantiles = grouped[col].quantile([0.5, 0.95]).unstack()
+        runs[f"{col}_p50"] = quantiles[0.5]
+        runs[f"{col}_p95"] = quantiles[0.95]
+    return runs.reset_index()
+
+
+# --- Chart Labels ---
+def hover_labels(melted, units):
+    """Vectorized `"<Metric>: <Value> <unit><br>Test: <Test>"` hover strings for a melted comparison frame.
+
+    `units` is one unit string or a `{metric: unit}` mapping.
+    """
+    values = pd.Series(np.char.mod("%.2f", melted["Value"].to_numpy(dtype=np.float64, na_value=np.nan)), index=melted.index)
+    unit = melted["Metric"].map(units).fillna("") if isinstance(units, dict) else units
+    return melted["Metric"].astype(str) + ": " + values + " " + unit + "<br>Test: " + melted["Test"].astype(str)
@@ -0,0 +1,97 @@
+import os
+import random
+
+# --- Load Modes ---
+LOAD_MODES = ["closed", "open", "capacity"]  # capacity: SLO search, see capacity.py
+ARRIVAL_PROCESSES = ["poisson", "constant"]
+
+# A dispatch that fires later than this after its scheduled time is counted as late
+LATE_THRESHOLD = 0.010  # sec
+
+
+# --- Arrival Schedule ---
+class ArrivalSchedule:
+    """Open-loop request arrivals at a target rate, independent of how fast responses come back.
+
+    The rate ramps linearly from `start_rate` to `rate` over `ramp` seconds.
+    Poisson arrivals draw exponential gaps; constant arrivals are evenly spaced.
+    """
+
+    def __init__(self, rate, process="poisson", start_rate=None, ramp=0, max_in_flight=1000, seed=None):
+        if process not in ARRIVAL_PROCESSES:
+            raise ValueError(f"Unknown arrival process: {process}")
+        self.rate = float(rate)
+        self.process = process
+        self.start_rate = float(start_rate) if start_rate else self.rate
+        self.ramp = float(ramp)
+        self.max_in_flight = int(max_in_flight)
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_env(cls, share=1):
+        """Build the schedule from ARRIVAL_* env vars; `share` splits the rate across worker processes."""
+        return cls(
+            rate=float(os.environ.get("ARRIVAL_RATE", 1)) / share,
+            process=os.environ.get("ARRIVAL_PROCESS", "poisson"),
+            start_rate=float(os.environ.get("ARRIVAL_START_RATE", 0)) / share,
+            ramp=float(os.environ.get("ARRIVAL_RAMP", 0)),
+            max_in_flight=max(int(os.environ.get("ARRIVAL_MAX_IN_FLIGHT", 1000)) // share, 1),
+            seed=os.environ.get("ARRIVAL_SEED"),
+        )
+
+    def rate_at(self, elapsed):
+        if self.ramp <= 0 or elapsed >= self.ramp:
+            return self.rate
+        return self.start_rate + (self.rate - self.start_rate) * elapsed / self.ramp
+
+    def next_interval(self, elapsed):
+        rate = max(self.rate_at(elapsed), 1e-6)
+        if self.process == "constant":
+            return 1.0 / rate
+        return self._random.expovariate(rate)
+
+
+def arrival_env(rate, process="poisson", start_rate=0, ramp=0, max_in_flight=1000, seed=None):
+    """Env vars that hand an arrival schedule to a load engine subprocess."""
+    env = {
+        "LOAD_MODE": "open",
+        "ARRIVAL_RATE": str(rate),
+        "ARRIVAL_PROCESS": process,
+        "ARRIVAL_START_RATE": str(start_rate),
+        "ARRIVAL_RAMP": str(ramp),
+        "ARRIVAL_MAX_IN_FLIGHT": str(max_in_flight),
+    }
+    if seed is not None:
+        env["ARRIVAL_SEED"] = str(seed)
+    return env
+
+
+# --- Dispatch Accounting ---
+class DispatchStats:
+    """Counts how well the client kept up with the schedule."""
+
+    def __init__(self):
+        self.scheduled = 0
+        self.dispatched = 0
+        self.late = 0
+        self.dropped = 0
+        self.max_lag = 0.0
+
+    def record(self, lag, dropped):
+        self.scheduled += 1
+        self.max_lag = max(self.max_lag, lag)
+        if dropped:
+            self.dropped += 1
+            return
+        self.dispatched += 1
+        if lag > LATE_THRESHOLD:
+            self.late += 1
+
+    def as_dict(self):
+        return {
+            "scheduled": self.scheduled,
+            "dispatched": self.dispatched,
+            "late": self.late,
+            "dropped": self.dropped,
+            "max_lag": round(self.max_lag, 4),
+        }
@@ -0,0 +1,224 @@
+"""Single-process asyncio load engine.
+
+Drives the same streaming chat completions workload as `locust_load_test.py`
+with a pooled aiohttp client and writes the same `data/<ts>_metrics.csv`,
+`_chunks.bin` and config fields, so the Dashboard treats both engines alike.
+
+    python async_load_test.py --host https://endpoint --users 2000 --spawn-rate 100 --run-time 5m
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import time
+
+import aiohttp
+
+from arrivals import ArrivalSchedule, DispatchStats
+from concurrency import ConcurrencyTracker, ConcurrencySampler, sample_interval_from_env
+from client_health import HarnessMonitor, harness_interval_from_env, profiler_from_env
+from http_client import ClientOptions, aiohttp_trace_config
+from launcher import parse_run_time
+from metrics_writer import RunRecorder, writer_options_from_env
+from sse_parser import aiter_data, StreamStats
+from token_counter import TokenCounter
+from targets import targets_from_env
+from workload import workload_from_env, REQUEST_HEADERS
+
+# --- Optional Faster Event Loop ---
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+WAIT_TIME = (1, 3)  # same as ChatCompletionsUser.wait_time = between(1, 3)
+LOOP_LAG_PROBE_INTERVAL = 0.1  # sec
+
+
+# --- Async Engine ---
+class AsyncLoadTest:
+    def __init__(self, host, users, spawn_rate, run_time, recorder, token_counter, workload, pool_size=0, schedule=None,
+                 client_options=None, monitor=None, targets=None):
+        # Endpoint/model pairs; the default single target posts to `host` with the workload's model
+        self.targets = targets or targets_from_env(host)
+        self.users = users
+        self.spawn_rate = spawn_rate
+        self.duration = parse_run_time(run_time)
+        self.recorder = recorder
+        self.token_counter = token_counter
+        self.pool_size = pool_size
+        # Keep-alive and connect timeout; the backend is always aiohttp here
+        self.client_options = client_options or ClientOptions()
+        self.headers = self.client_options.headers(REQUEST_HEADERS)
+        # Harness self-monitoring; the event loop lag probe feeds it while the run is active
+        self.monitor = monitor
+        self.workload = workload
+        self.concurrency = ConcurrencyTracker()
+        self.active_users = 0
+        self.request_ids = itertools.count()
+        # Open-loop arrival schedule; None keeps the closed-loop users
+        self.schedule = schedule
+        self.dispatch_stats = DispatchStats()
+
+    async def chat_completions(self, session):
+        current_concurrency, token = self.concurrency.start()
+        streamed = False
+        request_id = next(self.request_ids)
+        item = self.workload.next()
+        target = self.targets.next()
+
+        trace = {}
+        timing = None
+        try:
+            # Timed from before the request, so TTFT and latency include connection setup and time-to-headers
+            start_time = time.perf_counter()
+            async with session.post(target.endpoint, data=target.payload(item.payload), headers=self.headers, trace_request_ctx=trace) as response:
+                timing = {"time_to_headers": time.perf_counter() - start_time, "connect_time": trace.get("connect"), "tls_time": None,
+                          "connect_timed": True}
+                stream = StreamStats(start_time)
+
+                if response.status != 200:
+                    print(f"Request failed: {response.status} - {await response.text()}")
+                    avg_concurrency, token = self.concurrency.finish(token, streamed), None
+                    self.recorder.log(time.strftime("%Y-%m-%d %H:%M:%S"), None, 0, 0, current_concurrency, "fail", request_id,
+                                      input_tokens=item.input_tokens, avg_concurrency=avg_concurrency, timing=timing, prefix=item.prefix,
+                                      target=target.name)
+                    return
+                self.concurrency.streaming()
+                streamed = True
+
+                async for line, start in aiter_data(response.content):
+                    try:
+                        stream.feed(line, start)
+                    except ValueError:
+                        print("Warning: JSON decode failed.")
+
+            total_latency = time.perf_counter() - start_time
+            if self.monitor is not None:
+                self.monitor.add_parse_time(stream.parse_seconds)
+            tokens, _ = self.token_counter.count(stream.text(), stream.usage)
+            input_tokens = (stream.usage or {}).get("prompt_tokens") or item.input_tokens
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+            avg_concurrency, token = self.concurrency.finish(token, streamed), None
+            self.recorder.log(timestamp, stream.ttft, total_latency, tokens, current_concurrency, "success", request_id, stream.chunk_offsets,
+                              input_tokens, avg_concurrency, timing, item.prefix, target.name)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Request failed: {e!r}")
+            avg_concurrency, token = self.concurrency.finish(token, streamed), None
+            self.recorder.log(time.strftime("%Y-%m-%d %H:%M:%S"), None, 0, 0, current_concurrency, "fail", request_id,
+                              input_tokens=item.input_tokens, avg_concurrency=avg_concurrency, timing=timing, prefix=item.prefix,
+                              target=target.name)
+
+        finally:
+            if token is not None:
+                self.concurrency.finish(token, streamed)
+
+    async def user(self, session):
+        self.active_users += 1
+        try:
+            while True:
+                await self.chat_completions(session)
+                await asyncio.sleep(random.uniform(*WAIT_TIME))
+        finally:
+            self.active_users -= 1
+
+    async def dispatch(self, session, tasks):
+        """Open loop: start a request at every scheduled arrival, dropping those over max_in_flight."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        next_at = start
+        while True:
+            next_at += self.schedule.next_interval(next_at - start)
+            await asyncio.sleep(max(next_at - loop.time(), 0))
+            lag = loop.time() - next_at
+            dropped = self.concurrency.in_flight >= self.schedule.max_in_flight
+            self.dispatch_stats.record(lag, dropped)
+            if not dropped:
+                task = asyncio.create_task(self.chat_completions(session))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+    async def probe_loop_lag(self):
+        """How late the event loop wakes a short sleep; sustained lag means the client is the bottleneck."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOOP_LAG_PROBE_INTERVAL
+            await asyncio.sleep(LOOP_LAG_PROBE_INTERVAL)
+            self.monitor.record_lag(max(loop.time() - expected, 0.0))
+
+    async def run(self):
+        # limit=0 lets the pool grow to one keep-alive connection per concurrent stream
+        connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300, force_close=not self.client_options.keep_alive)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.client_options.connect_timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[aiohttp_trace_config()]) as session:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.duration
+            tasks = set()
+            if self.monitor is not None:
+                tasks.add(asyncio.create_task(self.probe_loop_lag()))
+            if self.schedule is not None:
+                tasks.add(asyncio.create_task(self.dispatch(session, tasks)))
+            else:
+                for _ in range(self.users):
+                    if loop.time() >= deadline:
+                        break
+                    tasks.add(asyncio.create_task(self.user(session)))
+                    await asyncio.sleep(1 / self.spawn_rate)
+
+            await asyncio.sleep(max(deadline - loop.time(), 0))
+            # Like locust's --run-time, stop users immediately; in-flight requests are not recorded
+            pending = list(tasks)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="asyncio load engine for streaming chat completions")
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--spawn-rate", type=float, default=2)
+    parser.add_argument("--run-time", default="1m")
+    parser.add_argument("--pool-size", type=int, default=int(os.environ.get("ASYNC_POOL_SIZE", 0)),
+                        help="max pooled connections (0 = unlimited)")
+    args = parser.parse_args()
+
+    timestamp_prefix = os.environ.get("TEST_TIMESTAMP", time.strftime("%Y-%m-%d_%H-%M-%S"))
+    os.makedirs("data", exist_ok=True)
+    token_counter = TokenCounter()
+    recorder = RunRecorder(
+        f"data/{timestamp_prefix}_metrics.csv",
+        f"data/{timestamp_prefix}_chunks.bin",
+        f"data/{timestamp_prefix}_config.json",
+        token_counter,
+        f"data/{timestamp_prefix}_sketches.json",
+        **writer_options_from_env(),
+    )
+    schedule = ArrivalSchedule.from_env() if os.environ.get("LOAD_MODE") == "open" else None
+    workload = workload_from_env(token_counter)
+    recorder.config_sources["workload"] = workload.describe
+    client_options = ClientOptions.from_env()
+    engine = AsyncLoadTest(args.host, args.users, args.spawn_rate, args.run_time, recorder, token_counter, workload, args.pool_size, schedule,
+                           client_options)
+    engine.monitor = HarnessMonitor(f"data/{timestamp_prefix}_harness.csv", "main", harness_interval_from_env(),
+                                    recorder.write_seconds, lambda: engine.concurrency.in_flight)
+    recorder.config_sources["client_health"] = engine.monitor.summary
+    recorder.config_sources["targets"] = engine.targets.describe
+    profiler = profiler_from_env(f"data/{timestamp_prefix}_profile.folded", ["chat_completions"])
+    recorder.config_sources["http_client"] = lambda: {**client_options.describe(), "backend": "aiohttp", "pool_size": args.pool_size}
+    if schedule is not None:
+        recorder.config_sources["dispatch"] = engine.dispatch_stats.as_dict
+    sampler = ConcurrencySampler(engine.concurrency, f"data/{timestamp_prefix}_concurrency.csv", lambda: engine.active_users,
+                                 sample_interval_from_env())
+    try:
+        asyncio.run(engine.run())
+    finally:
+        sampler.close()
+        engine.monitor.close()
+        if profiler is not None:
+            profiler.close()
+        recorder.flush()
+        recorder.close()
@@ -0,0 +1,215 @@
+"""Headless load test runner for CI jobs and soak tests.
+
+Builds the same `_config.json` as the Home page, launches the load engine,
+merges worker shards and prints (or writes) the summary numbers the
+Dashboard shows. Only the standard library and the launcher are imported
+at startup; pandas and the analytics code load after the run finishes.
+
+    python bench.py --target-url https://endpoint --users 50 --spawn-rate 5 --run-time 5m --output summary.json
+    python bench.py --mock --users 200 --run-time 1m --max-error-rate 1
+
+Exit status: 0 on success, 1 when a `--max-*` gate fails, 2 when the run
+produced no metrics.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+from arrivals import ARRIVAL_PROCESSES
+from http_client import HTTP_CLIENTS, DEFAULT_POOL_SIZE
+from launcher import (DATA_DIR, ENGINES, build_run_config, write_run_config, start_load_test, wait_for_processes, stop_processes,
+                      merge_shards, parse_run_time, start_mock_server, stop_mock_server)
+
+PROGRESS_INTERVAL = 10  # sec between progress lines
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a load test without the UI and print its summary")
+    target = parser.add_argument_group("target")
+    target.add_argument("--target-url", help="endpoint base URL (not needed with --mock)")
+    target.add_argument("--targets", help="JSON list (or path to one) of {name, url, model, weight} targets to split traffic across")
+    target.add_argument("--mock", action="store_true", help="run against a local mock server")
+    target.add_argument("--mock-ttft", default="0.2")
+    target.add_argument("--mock-itl", default="0.02")
+    target.add_argument("--mock-tokens", default="200")
+    target.add_argument("--mock-port", type=int, default=8000)
+
+    load = parser.add_argument_group("load")
+    load.add_argument("--users", type=int, default=10)
+    load.add_argument("--spawn-rate", type=float, default=2)
+    load.add_argument("--run-time", default="1m")
+    load.add_argument("--engine", choices=ENGINES, default="locust")
+    load.add_argument("--workers", type=int, default=0)
+    load.add_argument("--rate", type=float, help="open loop: target requests/sec (replaces --users)")
+    load.add_argument("--arrival-process", choices=ARRIVAL_PROCESSES, default="poisson")
+    load.add_argument("--max-in-flight", type=int, default=1000)
+
+    workload = parser.add_argument_group("workload")
+    workload.add_argument("--dataset", help="JSONL prompt dataset to replay")
+    workload.add_argument("--prompt-tokens", type=int, help="synthetic prompts of this many words")
+    workload.add_argument("--max-tokens", type=int, help="output cap for synthetic prompts")
+    workload.add_argument("--http-client", choices=HTTP_CLIENTS, default="requests")
+    workload.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE)
+    workload.add_argument("--no-keep-alive", action="store_true")
+
+    report = parser.add_argument_group("report")
+    report.add_argument("--output", help="write the summary JSON here")
+    report.add_argument("--no-compact", action="store_true", help="skip the Parquet copy for the History page")
+    report.add_argument("--whole-run", action="store_true", help="summarize the whole run instead of its steady-state window")
+    report.add_argument("--ttft-threshold", type=float, help="degradation threshold (sec), as on the Dashboard")
+    report.add_argument("--tpot-threshold", type=float)
+    report.add_argument("--tps-threshold", type=float)
+    report.add_argument("--max-error-rate", type=float, help="fail when the error rate (%%) is above this")
+    report.add_argument("--max-ttft-p95", type=float, help="fail when TTFT p95 (sec) is above this")
+    args = parser.parse_args(argv)
+    if not args.target_url and not args.mock:
+        parser.error("--target-url is required unless --mock is given")
+    return args
+
+
+def _load_targets(value):
+    if not value:
+        return None
+    if os.path.exists(value):
+        with open(value) as f:
+            return json.load(f)
+    return json.loads(value)
+
+
+# --- Run ---
+def run(args):
+    """Launch the engine and wait for it; returns `(timestamp_prefix, exit code)`."""
+    timestamp_prefix = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    target_url = args.target_url
+
+    mock = mock_process = None
+    if args.mock:
+        mock = {"ttft": args.mock_ttft, "itl": args.mock_itl, "tokens": args.mock_tokens}
+        mock_process, target_url = start_mock_server(timestamp_prefix, port=args.mock_port, **mock)
+
+    arrival = None
+    if args.rate:
+        arrival = {"rate": args.rate, "process": args.arrival_process, "max_in_flight": args.max_in_flight}
+    dataset = {"path": args.dataset} if args.dataset else None
+    synthetic = None
+    if args.prompt_tokens or args.max_tokens:
+        synthetic = {"prompt_tokens": args.prompt_tokens or 128, "max_tokens": args.max_tokens}
+    http_client = {"backend": args.http_client, "pool_size": args.pool_size, "keep_alive": not args.no_keep_alive}
+    targets = _load_targets(args.targets)
+
+    config = build_run_config(timestamp_prefix, target_url, args.users, args.spawn_rate, args.run_time, args.workers, args.engine,
+                              arrival, dataset, targets=targets, mock=mock, synthetic=synthetic)
+    write_run_config(timestamp_prefix, config)
+    print(f"Run {timestamp_prefix}: {config['engine']} engine, {config['load_mode']} loop, {target_url}", flush=True)
+
+    processes = start_load_test(timestamp_prefix, target_url, args.users, args.spawn_rate, args.run_time, args.workers, args.engine,
+                                arrival, dataset, http_client=http_client, targets=targets, synthetic=synthetic)
+    duration = parse_run_time(args.run_time)
+    started = time.monotonic()
+    next_progress = PROGRESS_INTERVAL
+    try:
+        while processes[0].poll() is None:
+            time.sleep(1)
+            elapsed = time.monotonic() - started
+            if elapsed >= next_progress:
+                print(f"  {int(elapsed)}s / {duration}s", flush=True)
+                next_progress += PROGRESS_INTERVAL
+        returncode = wait_for_processes(processes, timeout=60)
+    except KeyboardInterrupt:
+        print("Interrupted; stopping the load engine...", flush=True)
+        returncode = stop_processes(processes)
+    finally:
+        if mock_process is not None:
+            stop_mock_server(mock_process)
+
+    merge_shards(timestamp_prefix)
+    return timestamp_prefix, returncode
+
+
+# --- Summary (heavy imports happen here, after the run) ---
+def _json_safe(value):
+    if isinstance(value, dict):
+        return {str(k): _json_safe(v) for k, v in value.items()}
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def run_report(timestamp_prefix, thresholds=None, compact=True, whole_run=False):
+    """The Dashboard's headline numbers and latency percentiles over the run's steady-state window, or None without metrics.
+
+    The detected window is stored with the run before it is compacted.
+    """
+    metrics_path = os.path.join(DATA_DIR, f"{timestamp_prefix}_metrics.csv")
+    if not os.path.exists(metrics_path):
+        return None
+    from analytics import summarize, percentiles
+    from run_index import load_metrics
+    from steady_state import record_steady_state, trim_to_window
+
+    df = load_metrics(metrics_path)
+    window = record_steady_state(metrics_path, df)
+    if not whole_run:
+        df = trim_to_window(df, window)
+    report = {"run_id": timestamp_prefix, "steady_state": window, **summarize(df, thresholds)}
+    ok = df[df["status"] == "success"]
+    for col in ["ttft", "tpot", "total_latency"]:
+        for q, value in percentiles(ok, col, (50, 95, 99)).items():
+            report[f"{col}_p{q}"] = value
+    if compact:
+        from run_store import compact_run
+        compact_run(metrics_path)
+    return _json_safe(report)
+
+
+def print_report(report):
+    from steady_state import describe_window
+
+    rows = [
+        ("Window", describe_window(report.get("steady_state"))),
+        ("Requests", report["requests"]),
+        ("Failures", f"{report['failures']} ({report['error_rate']:.2f}%)"),
+        ("RPS", f"{report['rps']:.2f}"),
+        ("TPS", f"{report['tps']:.2f}"),
+        ("Max users before degradation", report["first_degradation_concurrency"] or "-"),
+        ("Max users without failures", report["first_failure_concurrency"] or "-"),
+    ]
+    for col, label in [("ttft", "TTFT"), ("tpot", "TPOT"), ("total_latency", "Latency")]:
+        values = [report.get(f"{col}_p{q}") for q in (50, 95, 99)]
+        rows.append((f"{label} p50/p95/p99 (s)", " / ".join("-" if v is None else f"{v:.3f}" for v in values)))
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"{label:<{width}}  {value}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    timestamp_prefix, returncode = run(args)
+    thresholds = {k: v for k, v in {"ttft": args.ttft_threshold, "tpot": args.tpot_threshold, "tps": args.tps_threshold}.items()
+                  if v is not None}
+    report = run_report(timestamp_prefix, thresholds, compact=not args.no_compact, whole_run=args.whole_run)
+    if report is None:
+        print(f"No metrics were recorded (engine exit code {returncode}).", file=sys.stderr)
+        return 2
+    report["engine_returncode"] = returncode
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+    failed = []
+    if args.max_error_rate is not None and report["error_rate"] > args.max_error_rate:
+        failed.append(f"error rate {report['error_rate']:.2f}% > {args.max_error_rate}%")
+    if args.max_ttft_p95 is not None and (report["ttft_p95"] is None or report["ttft_p95"] > args.max_ttft_p95):
+        failed.append(f"TTFT p95 {report['ttft_p95']} s > {args.max_ttft_p95} s")
+    for reason in failed:
+        print(f"FAILED: {reason}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
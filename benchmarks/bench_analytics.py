@@ -0,0 +1,99 @@
+"""Benchmark: Dashboard metric calculations, legacy row-wise code vs analytics.py.
+
+Builds a synthetic run with --rows requests (default 1M) and times the
+inline Streamlit calculations it replaced against the vectorized module.
+Run from the repo root:
+
+    python benchmarks/bench_analytics.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+
+
+# --- Synthetic Run ---
+def make_run(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    concurrency = np.minimum(np.arange(rows) // max(rows // 500, 1) + 1, 500)
+    ttft = rng.gamma(2.0, 0.1, rows) * (1 + concurrency / 100)
+    tokens = rng.integers(50, 800, rows)
+    latency = ttft + tokens * rng.uniform(0.01, 0.05, rows)
+    status = np.where(rng.random(rows) < 0.002, "fail", "success")
+    return pd.DataFrame({
+        "timestamp": pd.Timestamp("2025-01-01") + pd.to_timedelta(np.arange(rows) * 3600 / rows, unit="s"),
+        "ttft": ttft,
+        "total_latency": latency,
+        "tokens_per_request": tokens,
+        "tps": tokens / latency,
+        "tpot": latency / tokens,
+        "concurrent_requests": concurrency,
+        "status": status,
+    })
+
+
+# --- Legacy Inline Calculations (from streamlit_app.py before analytics.py) ---
+def legacy(df):
+    high_ttft_threshold, high_tpot_threshold, low_tps_threshold = 2.0, 0.2, 5.0
+    duration_sec = max((df["timestamp"].max() - df["timestamp"].min()).total_seconds(), 1)
+    failed_df = df[df["status"] != "success"]
+    max_safe_users = int(df.loc[failed_df.index[0], "concurrent_requests"]) if not failed_df.empty else None
+
+    def is_degraded(row):
+        return (
+            row["ttft"] > high_ttft_threshold or
+            row["tpot"] > high_tpot_threshold or
+            row["tps"] < low_tps_threshold
+        )
+    degraded_rows = df[df.apply(is_degraded, axis=1)]
+    max_perf_users = int(df.loc[degraded_rows.index[0], "concurrent_requests"]) if not degraded_rows.empty else None
+
+    high_conc_threshold = df["concurrent_requests"].quantile(0.6)
+    ttft_at_peak = df[df["concurrent_requests"] >= high_conc_threshold]["ttft"].mean()
+    tps = df["tokens_per_request"].sum() / duration_sec
+    rps = len(df) / duration_sec
+    error_rate = len(df[df["status"] != "success"]) / len(df) * 100
+    p50, p95 = np.percentile(df["total_latency"], 50), np.percentile(df["total_latency"], 95)
+    return max_safe_users, max_perf_users, ttft_at_peak, tps, rps, error_rate, p50, p95
+
+
+def vectorized(df):
+    s = analytics.summarize(df)
+    p = s["latency_percentiles"]
+    return (s["first_failure_concurrency"], s["first_degradation_concurrency"], s["ttft_at_peak"],
+            s["tps"], s["rps"], s["error_rate"], p[50], p[95])
+
+
+def timed(fn, df, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_run(args.rows)
+    legacy_time, legacy_result = timed(legacy, df, 1)
+    vector_time, vector_result = timed(vectorized, df, args.repeat)
+
+    assert legacy_result[:2] == vector_result[:2], (legacy_result, vector_result)
+    assert np.allclose(legacy_result[2:], vector_result[2:]), (legacy_result, vector_result)
+
+    print(f"rows: {args.rows:,}")
+    print(f"legacy row-wise:   {legacy_time:8.3f} s")
+    print(f"analytics.py:      {vector_time:8.3f} s")
+    print(f"speedup:           {legacy_time / vector_time:8.1f}x")
@@ -0,0 +1,70 @@
+"""Side-by-side benchmark of the locust and asyncio load engines.
+
+Runs each engine against the same endpoint with the same users/spawn rate/run
+time, then reports achieved throughput, TTFT and the client's own CPU and
+peak memory cost per concurrent stream. Run from the repo root:
+
+    python benchmarks/bench_engines.py --host http://127.0.0.1:8000 --users 2000 --spawn-rate 200 --run-time 1m
+"""
+import argparse
+import csv
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from launcher import DATA_DIR, start_load_test, wait_for_processes
+
+
+def summarize(metrics_path):
+    with open(metrics_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    ok = [r for r in rows if r["status"] == "success"]
+    ttfts = sorted(float(r["ttft"]) for r in ok if r["ttft"] != "N/A")
+    return {
+        "requests": len(rows),
+        "failures": len(rows) - len(ok),
+        "tokens": sum(int(r["tokens_per_request"]) for r in ok),
+        "peak_concurrency": max((int(r["concurrent_requests"]) for r in rows), default=0),
+        "ttft_p50": ttfts[len(ttfts) // 2] if ttfts else float("nan"),
+    }
+
+
+def run_engine(engine, args):
+    timestamp_prefix = f"bench_{engine}_{time.strftime('%Y-%m-%d_%H-%M-%S')}"
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    processes = start_load_test(timestamp_prefix, args.host, args.users, args.spawn_rate, args.run_time, 0, engine)
+    wait_for_processes(processes)
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    stats = summarize(os.path.join(DATA_DIR, f"{timestamp_prefix}_metrics.csv"))
+    stats["wall_s"] = wall
+    stats["cpu_s"] = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    # ru_maxrss is the largest child so far (KiB on Linux), so run the heavier engine last for a clean reading
+    stats["max_rss_mb"] = after.ru_maxrss / 1024
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--spawn-rate", type=int, default=100)
+    parser.add_argument("--run-time", default="1m")
+    parser.add_argument("--engines", nargs="+", default=["asyncio", "locust"])
+    args = parser.parse_args()
+
+    results = {engine: run_engine(engine, args) for engine in args.engines}
+
+    print(f"{'engine':<10}{'requests':>10}{'fail':>7}{'rps':>9}{'tps':>10}{'peak conc':>11}"
+          f"{'ttft p50':>10}{'cpu s':>9}{'cpu ms/req':>12}{'max rss MB':>12}")
+    for engine, r in results.items():
+        rps = r["requests"] / r["wall_s"]
+        tps = r["tokens"] / r["wall_s"]
+        cpu_per_req = r["cpu_s"] / r["requests"] * 1000 if r["requests"] else float("nan")
+        print(f"{engine:<10}{r['requests']:>10}{r['failures']:>7}{rps:>9.1f}{tps:>10.1f}{r['peak_concurrency']:>11}"
+              f"{r['ttft_p50']:>10.3f}{r['cpu_s']:>9.1f}{cpu_per_req:>12.2f}{r['max_rss_mb']:>12.1f}")
@@ -0,0 +1,95 @@
+"""Micro-benchmark: chunks/sec for the legacy str-based SSE loop vs sse_parser.
+
+Run from the repo root:
+    python benchmarks/bench_sse_parser.py --chunks 200000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sse_parser import JSON_BACKEND, decode_chunk, chunk_content, extract_content, iter_data
+
+
+# --- Synthetic Stream ---
+def make_stream(n_chunks):
+    words = ["General", "relativity", "describes", "gravity", "as", "the", "curvature", "of", "spacetime."]
+    lines = []
+    for i in range(n_chunks):
+        chunk = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "meta/llama-3.1-70b-instruct",
+            "choices": [{"index": 0, "delta": {"content": words[i % len(words)] + " "}, "finish_reason": None}],
+        }
+        lines.append(b"data: " + json.dumps(chunk).encode("utf-8"))
+        lines.append(b"")
+    lines.append(b"data: [DONE]")
+    return lines
+
+
+# --- Parsers Under Test ---
+def legacy_loop(lines):
+    tokens = 0
+    for line in lines:
+        if not line:
+            continue
+        decoded_line = line.decode("utf-8").strip()
+        if not decoded_line.startswith("data: "):
+            continue
+        data_str = decoded_line[6:].strip()
+        if data_str == "[DONE]":
+            break
+        chunk = json.loads(data_str)
+        content = chunk.get("choices", [{}])[0].get("delta", {}).get("content", "")
+        if content:
+            tokens += 1
+    return tokens
+
+
+def full_decode_loop(lines):
+    tokens = 0
+    for line, start in iter_data(lines):
+        if chunk_content(decode_chunk(line, start)):
+            tokens += 1
+    return tokens
+
+
+def content_only_loop(lines):
+    tokens = 0
+    for line, start in iter_data(lines):
+        if extract_content(line, start):
+            tokens += 1
+    return tokens
+
+
+def bench(fn, lines, n_chunks, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        assert fn(lines) == n_chunks
+        best = min(best, time.perf_counter() - start)
+    return n_chunks / best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    lines = make_stream(args.chunks)
+    baseline = bench(legacy_loop, lines, args.chunks, args.repeat)
+    print(f"JSON backend: {JSON_BACKEND}")
+    print(f"{'parser':<28}{'chunks/sec':>14}{'speedup':>10}")
+    for name, fn in [
+        ("legacy str loop", legacy_loop),
+        (f"bytes + {JSON_BACKEND} full decode", full_decode_loop),
+        ("bytes content-only", content_only_loop),
+    ]:
+        rate = bench(fn, lines, args.chunks, args.repeat) if fn is not legacy_loop else baseline
+        print(f"{name:<28}{rate:>14,.0f}{rate / baseline:>9.2f}x")
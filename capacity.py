@@ -0,0 +1,263 @@
+import json
+import os
+import time
+
+from sketches import QuantileSketch
+
+# --- Search Modes ---
+CAPACITY_MODES = ["step", "binary"]
+
+# --- Default SLOs (applied to each level's steady-state window) ---
+DEFAULT_SLO = {
+    "ttft_p95": 2.0,        # sec
+    "tpot_p95": 0.2,        # sec
+    "error_rate": 1.0,      # percent
+}
+
+
+# --- Knee Detection ---
+def find_knee(xs, ys):
+    """Index of the point farthest from the chord joining the first and last points (Kneedle-style).
+
+    Both axes are normalized to [0, 1] first; returns None for fewer than 3 points.
+    """
+    if len(xs) < 3:
+        return None
+    x0, x1, y0, y1 = min(xs), max(xs), min(ys), max(ys)
+    if x1 == x0 or y1 == y0:
+        return None
+    nx = [(x - x0) / (x1 - x0) for x in xs]
+    ny = [(y - y0) / (y1 - y0) for y in ys]
+    ax, ay, bx, by = nx[0], ny[0], nx[-1], ny[-1]
+    length = ((bx - ax) ** 2 + (by - ay) ** 2) ** 0.5 or 1.0
+    distances = [abs((bx - ax) * (ay - py) - (ax - px) * (by - ay)) / length for px, py in zip(nx, ny)]
+    return max(range(len(distances)), key=distances.__getitem__)
+
+
+# --- One Concurrency Level ---
+class LevelStats:
+    """Samples completed while the search held one user count.
+
+    The first `warmup` seconds after the level starts are discarded (users
+    still spawning or stopping). Measured samples go into per-window
+    sketches for the stability check and into whole-level sketches for
+    the SLO check.
+    """
+
+    def __init__(self, users, started, warmup, window):
+        self.users = users
+        self.started = started
+        self.warmup = warmup
+        self.window = window
+        self.ended = None
+        self.requests = 0
+        self.failures = 0
+        self.tokens = 0
+        self.sketches = {m: QuantileSketch() for m in ("ttft", "tpot", "total_latency")}
+        self.windows = {}  # window index -> total_latency sketch
+
+    def add(self, ttft, tpot, total_latency, tokens, ok, now):
+        if now - self.started < self.warmup:
+            return
+        self.requests += 1
+        if not ok:
+            self.failures += 1
+            return
+        self.tokens += tokens
+        self.sketches["ttft"].add(ttft)
+        self.sketches["tpot"].add(tpot if tokens else None)
+        self.sketches["total_latency"].add(total_latency)
+        idx = int((now - self.started - self.warmup) // self.window)
+        self.windows.setdefault(idx, QuantileSketch()).add(total_latency)
+
+    def measured_seconds(self, now):
+        return max((self.ended or now) - self.started - self.warmup, 1e-9)
+
+    def is_stable(self, now, tolerance):
+        """True when p95 latency of the last two complete windows differs by at most `tolerance`."""
+        complete = int((now - self.started - self.warmup) // self.window)
+        if complete < 2:
+            return False
+        prev, last = self.windows.get(complete - 2), self.windows.get(complete - 1)
+        if prev is None or last is None or not prev.count or not last.count:
+            return False
+        a, b = prev.quantile(0.95), last.quantile(0.95)
+        return abs(b - a) <= tolerance * max(a, 1e-9)
+
+    def error_rate(self):
+        return self.failures / self.requests * 100 if self.requests else 0.0
+
+    def meets(self, slo):
+        if self.requests == 0:
+            return False
+        ttft = self.sketches["ttft"].quantile(0.95)
+        tpot = self.sketches["tpot"].quantile(0.95)
+        return (
+            (ttft is not None and ttft <= slo["ttft_p95"])
+            and (tpot is None or tpot <= slo["tpot_p95"])
+            and self.error_rate() <= slo["error_rate"]
+        )
+
+    def summary(self, slo, now):
+        seconds = self.measured_seconds(now)
+        return {
+            "users": self.users,
+            "requests": self.requests,
+            "rps": self.requests / seconds,
+            "tps": self.tokens / seconds,
+            "error_rate": self.error_rate(),
+            "ttft_p50": self.sketches["ttft"].quantile(0.5),
+            "ttft_p95": self.sketches["ttft"].quantile(0.95),
+            "tpot_p95": self.sketches["tpot"].quantile(0.95),
+            "latency_p50": self.sketches["total_latency"].quantile(0.5),
+            "latency_p95": self.sketches["total_latency"].quantile(0.95),
+            "held_seconds": (self.ended or now) - self.started,
+            "slo_met": self.meets(slo),
+        }
+
+
+# --- Capacity Search ---
+class CapacitySearch:
+    """Finds the highest user count that meets the SLOs.
+
+    `step` mode raises users by `step` from `start_users`; `binary` mode doubles
+    until the SLOs break, then bisects between the last passing and first
+    failing level down to `resolution` users. Each level is held for at least
+    `min_hold` seconds and until latency is stable (or `max_hold` passes)
+    before it is judged. The search stops at the first failure in step mode.
+    """
+
+    def __init__(self, mode="step", start_users=1, step=5, max_users=200, resolution=1, min_hold=30,
+                 max_hold=180, window=10, stability=0.1, slo=None, spawn_rate=None):
+        if mode not in CAPACITY_MODES:
+            raise ValueError(f"Unknown capacity mode: {mode}")
+        self.mode = mode
+        self.start_users = start_users
+        self.step = step
+        self.max_users = max_users
+        self.resolution = resolution
+        self.min_hold = min_hold
+        self.max_hold = max_hold
+        self.window = window
+        self.stability = stability
+        self.slo = {**DEFAULT_SLO, **(slo or {})}
+        self.spawn_rate = spawn_rate or max(step, 1)
+        self.levels = []
+        self.current = None
+        self.best_pass = None
+        self.first_fail = None
+        self.done = False
+
+    @classmethod
+    def from_env(cls):
+        env = os.environ.get
+        return cls(
+            mode=env("CAPACITY_MODE", "step"),
+            start_users=int(env("CAPACITY_START_USERS", 1)),
+            step=int(env("CAPACITY_STEP", 5)),
+            max_users=int(env("CAPACITY_MAX_USERS", 200)),
+            resolution=int(env("CAPACITY_RESOLUTION", 1)),
+            min_hold=float(env("CAPACITY_MIN_HOLD", 30)),
+            max_hold=float(env("CAPACITY_MAX_HOLD", 180)),
+            window=float(env("CAPACITY_WINDOW", 10)),
+            stability=float(env("CAPACITY_STABILITY", 0.1)),
+            slo={
+                "ttft_p95": float(env("CAPACITY_SLO_TTFT_P95", DEFAULT_SLO["ttft_p95"])),
+                "tpot_p95": float(env("CAPACITY_SLO_TPOT_P95", DEFAULT_SLO["tpot_p95"])),
+                "error_rate": float(env("CAPACITY_SLO_ERROR_RATE", DEFAULT_SLO["error_rate"])),
+            },
+            spawn_rate=float(env("CAPACITY_SPAWN_RATE", 0)) or None,
+        )
+
+    def _start_level(self, users, now):
+        if self.current is not None:
+            self.current.ended = now
+        self.current = LevelStats(users, now, warmup=self.window, window=self.window)
+        self.levels.append(self.current)
+
+    def record(self, ttft, tpot, total_latency, tokens, ok, now=None):
+        if self.current is not None and not self.done:
+            self.current.add(ttft, tpot, total_latency, tokens, ok, time.monotonic() if now is None else now)
+
+    def _next_users(self, passed):
+        users = self.current.users
+        if passed:
+            self.best_pass = max(self.best_pass or 0, users)
+        else:
+            self.first_fail = min(self.first_fail or users, users)
+
+        if self.mode == "step":
+            if not passed or users >= self.max_users:
+                return None
+            return min(users + self.step, self.max_users)
+
+        # binary: expand by doubling until a failure, then bisect
+        if self.first_fail is None:
+            return None if users >= self.max_users else min(users * 2, self.max_users)
+        low = self.best_pass or 0
+        if self.first_fail - low <= self.resolution:
+            return None
+        return (low + self.first_fail) // 2 or None
+
+    def tick(self, now=None):
+        """User count to run now, or None when the search is finished."""
+        now = time.monotonic() if now is None else now
+        if self.done:
+            return None
+        if self.current is None:
+            self._start_level(self.start_users, now)
+            return self.current.users
+
+        held = now - self.current.started
+        if held < self.min_hold + self.window:
+            return self.current.users
+        if held < self.max_hold and not self.current.is_stable(now, self.stability):
+            return self.current.users
+
+        next_users = self._next_users(self.current.meets(self.slo))
+        if next_users is None:
+            self.current.ended = now
+            self.done = True
+            return None
+        self._start_level(next_users, now)
+        return next_users
+
+    def results(self, now=None):
+        now = time.monotonic() if now is None else now
+        curve = sorted((level.summary(self.slo, now) for level in self.levels if level.requests), key=lambda r: r["users"])
+        knee = find_knee([r["rps"] for r in curve], [r["latency_p95"] or 0 for r in curve])
+        return {
+            "mode": self.mode,
+            "slo": self.slo,
+            "max_sustainable_users": self.best_pass,
+            "first_failing_users": self.first_fail,
+            "knee_users": curve[knee]["users"] if knee is not None else None,
+            "finished": self.done,
+            "curve": curve,
+        }
+
+    def save(self, path):
+        results = self.results()
+        with open(path, "w") as f:
+            json.dump(results, f, indent=4)
+        return results
+
+
+def capacity_env(mode="step", start_users=1, step=5, max_users=200, min_hold=30, max_hold=180, slo=None, **extra):
+    """Env vars that put a locust run into capacity-search mode."""
+    slo = {**DEFAULT_SLO, **(slo or {})}
+    env = {
+        "LOAD_MODE": "capacity",
+        "CAPACITY_MODE": mode,
+        "CAPACITY_START_USERS": str(start_users),
+        "CAPACITY_STEP": str(step),
+        "CAPACITY_MAX_USERS": str(max_users),
+        "CAPACITY_MIN_HOLD": str(min_hold),
+        "CAPACITY_MAX_HOLD": str(max_hold),
+        "CAPACITY_SLO_TTFT_P95": str(slo["ttft_p95"]),
+        "CAPACITY_SLO_TPOT_P95": str(slo["tpot_p95"]),
+        "CAPACITY_SLO_ERROR_RATE": str(slo["error_rate"]),
+    }
+    for key, value in extra.items():
+        env[f"CAPACITY_{key.upper()}"] = str(value)
+    return env
@@ -0,0 +1,211 @@
+import csv
+import importlib
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# --- Harness Samples CSV (one row per interval per load generator process) ---
+HARNESS_HEADER = ["timestamp", "process", "cpu_percent", "sched_lag_ms", "parse_percent", "write_percent", "in_flight"]
+DEFAULT_HARNESS_INTERVAL = 1.0  # sec
+
+# --- Saturation Thresholds ---
+CPU_SATURATION_PERCENT = 90.0   # of one core; locust and asyncio engines run on a single core per process
+LAG_SATURATION_MS = 100.0       # scheduler wake-up lateness at p99
+
+
+def _nearest_rank(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+# --- Harness Monitor ---
+class HarnessMonitor:
+    """Samples the load generator's own CPU use, scheduling lag and metric bookkeeping cost.
+
+    Every `interval` seconds it writes a row with process CPU (percent of
+    one core), how late its own wake-up was (under gevent this is the time
+    other greenlets held the loop; the asyncio engine feeds loop lag through
+    `record_lag`), and the share of wall time spent parsing SSE chunks and
+    recording metrics. `summary()` flags the run as client-bound when CPU
+    or lag stay over the saturation thresholds.
+    """
+
+    def __init__(self, path, process="main", interval=DEFAULT_HARNESS_INTERVAL, write_seconds=None, in_flight=None):
+        self.path = path
+        self.process = process
+        self.interval = interval
+        self.write_seconds = write_seconds or (lambda: 0.0)
+        self.in_flight = in_flight or (lambda: 0)
+        self.parse_seconds = 0.0
+        self._lags = []
+        self._cpu_samples = []
+        self._lag_samples = []
+        self._parse_total = 0.0
+        self._write_total = 0.0
+        self._elapsed_total = 0.0
+        self._stop = threading.Event()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, mode="w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(HARNESS_HEADER)
+        self._thread = threading.Thread(target=self._run, name="harness-monitor", daemon=True)
+        self._thread.start()
+
+    def add_parse_time(self, seconds):
+        self.parse_seconds += seconds
+
+    def record_lag(self, lag):
+        self._lags.append(lag)
+
+    def _run(self):
+        last_wall = time.perf_counter()
+        last_cpu = time.process_time()
+        last_parse = 0.0
+        last_write = self.write_seconds()
+        while True:
+            expected = time.perf_counter() + self.interval
+            if self._stop.wait(self.interval):
+                break
+            now = time.perf_counter()
+            self.record_lag(max(now - expected, 0.0))
+            cpu = time.process_time()
+            parse, write = self.parse_seconds, self.write_seconds()
+            elapsed = max(now - last_wall, 1e-9)
+
+            lags, self._lags = self._lags, []
+            lag_ms = max(lags) * 1000
+            cpu_percent = (cpu - last_cpu) / elapsed * 100
+            self._cpu_samples.append(cpu_percent)
+            self._lag_samples.append(lag_ms)
+            self._parse_total += parse - last_parse
+            self._write_total += write - last_write
+            self._elapsed_total += elapsed
+            self._writer.writerow([
+                f"{time.time():.3f}", self.process, f"{cpu_percent:.1f}", f"{lag_ms:.2f}",
+                f"{(parse - last_parse) / elapsed * 100:.2f}", f"{(write - last_write) / elapsed * 100:.2f}", self.in_flight(),
+            ])
+            self._file.flush()
+            last_wall, last_cpu, last_parse, last_write = now, cpu, parse, write
+
+    def summary(self):
+        cpu = sorted(self._cpu_samples)
+        lag = sorted(self._lag_samples)
+        cpu_p95 = _nearest_rank(cpu, 0.95)
+        lag_p99 = _nearest_rank(lag, 0.99)
+        elapsed = self._elapsed_total or 1e-9
+        return {
+            "samples": len(cpu),
+            "cpu_percent_max": round(cpu[-1], 1) if cpu else None,
+            "cpu_percent_p95": round(cpu_p95, 1) if cpu_p95 is not None else None,
+            "sched_lag_ms_max": round(lag[-1], 2) if lag else None,
+            "sched_lag_ms_p99": round(lag_p99, 2) if lag_p99 is not None else None,
+            "parse_percent": round(self._parse_total / elapsed * 100, 2),
+            "write_percent": round(self._write_total / elapsed * 100, 2),
+            "saturated": bool(
+                (cpu_p95 is not None and cpu_p95 >= CPU_SATURATION_PERCENT)
+                or (lag_p99 is not None and lag_p99 >= LAG_SATURATION_MS)
+            ),
+        }
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.interval + 5)
+        self._file.close()
+
+
+def harness_interval_from_env():
+    return float(os.environ.get("HARNESS_INTERVAL", DEFAULT_HARNESS_INTERVAL))
+
+
+def merge_harness_summaries(summaries):
+    """Combine per-worker summaries: worst CPU and lag, mean bookkeeping share, saturated if any worker was."""
+    summaries = [s for s in summaries if s and s.get("samples")]
+    if not summaries:
+        return None
+
+    def worst(key):
+        return max((s[key] for s in summaries if s.get(key) is not None), default=None)
+
+    return {
+        "samples": sum(s["samples"] for s in summaries),
+        "cpu_percent_max": worst("cpu_percent_max"),
+        "cpu_percent_p95": worst("cpu_percent_p95"),
+        "sched_lag_ms_max": worst("sched_lag_ms_max"),
+        "sched_lag_ms_p99": worst("sched_lag_ms_p99"),
+        "parse_percent": round(sum(s["parse_percent"] for s in summaries) / len(summaries), 2),
+        "write_percent": round(sum(s["write_percent"] for s in summaries) / len(summaries), 2),
+        "saturated": any(s["saturated"] for s in summaries),
+        "workers_saturated": sum(1 for s in summaries if s["saturated"]),
+    }
+
+
+# --- Opt-In Streaming Loop Profiler ---
+def _original(module, name):
+    """`module.name` as it was before gevent monkey-patching (unchanged without gevent)."""
+    try:
+        from gevent import monkey
+        return monkey.get_original(module, name)
+    except ImportError:
+        return getattr(importlib.import_module(module), name)
+
+
+class StackSampler:
+    """Samples the main thread's stack from a native thread and writes collapsed stacks.
+
+    Only samples whose stack passes through one of the `focus` functions
+    (the request / streaming loop) are kept. The output is one
+    `frame;frame;frame count` line per distinct stack, the input format of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, path, focus, interval=0.005):
+        self.path = path
+        self.focus = set(focus)
+        self.interval = interval
+        self.stacks = Counter()
+        # Native thread ids and sleep, so sampling keeps running while greenlets hold the loop
+        self._main_id = _original("_thread", "get_ident")()
+        self._sleep = _original("time", "sleep")
+        self._running = True
+        self._finished = False  # plain flag: gevent Events are not safe across native threads
+        _original("_thread", "start_new_thread")(self._run, ())
+
+    def _run(self):
+        try:
+            while self._running:
+                frame = sys._current_frames().get(self._main_id)
+                stack = []
+                focused = False
+                while frame is not None:
+                    code = frame.f_code
+                    focused = focused or code.co_name in self.focus
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if focused:
+                    self.stacks[";".join(reversed(stack))] += 1
+                self._sleep(self.interval)
+        finally:
+            self._finished = True
+
+    def close(self):
+        if not self._running:
+            return
+        self._running = False
+        deadline = time.monotonic() + 1
+        while not self._finished and time.monotonic() < deadline:
+            time.sleep(self.interval)
+        with open(self.path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def profiler_from_env(path, focus):
+    """A StackSampler when HARNESS_PROFILE=1, else None."""
+    if os.environ.get("HARNESS_PROFILE", "0") == "0":
+        return None
+    return StackSampler(path, focus, float(os.environ.get("HARNESS_PROFILE_INTERVAL", 0.005)))
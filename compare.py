@@ -0,0 +1,199 @@
+"""Run-to-run regression comparison with bootstrap confidence intervals.
+
+Compares latency percentiles (and per-second throughput) of a candidate run
+against a baseline over each run's steady-state window (plus an optional
+extra warm-up trim). Exits with status 1
+when any latency percentile regresses significantly, so it can gate CI:
+
+    python compare.py 2025-01-01_10-00-00 2025-01-02_10-00-00 --warmup 30 --min-effect 5
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_METRICS = ["ttft", "tpot", "total_latency"]
+DEFAULT_QUANTILES = [0.5, 0.95, 0.99]
+DEFAULT_BOOTSTRAP = 2000
+MAX_RESAMPLE_CELLS = 4_000_000  # resample in batches so n_boot x n stays within memory
+MAX_BOOTSTRAP_SAMPLE = 50_000  # larger samples are subsampled once before resampling (wider, conservative CIs)
+
+
+# --- Warm-Up Trimming ---
+def trim_warmup(df, seconds):
+    """Drop rows completed in the first `seconds` of the run."""
+    if not seconds or df.empty:
+        return df
+    return df[df["timestamp"] >= df["timestamp"].min() + pd.Timedelta(seconds=seconds)]
+
+
+# --- Vectorized Bootstrap ---
+def _resampled_quantiles(values, qs, n_boot, rng):
+    """`(n_boot, len(qs))` bootstrap replicates of the `qs` quantiles of `values`.
+
+    Every quantile is read from the same resamples, drawn in memory-bounded batches.
+    """
+    n = len(values)
+    batch = max(MAX_RESAMPLE_CELLS // max(n, 1), 1)
+    out = np.empty((n_boot, len(qs)))
+    for start in range(0, n_boot, batch):
+        size = min(batch, n_boot - start)
+        idx = rng.integers(0, n, size=(size, n))
+        out[start:start + size] = np.quantile(values[idx], qs, axis=1).T
+    return out
+
+
+def _subsample(values, rng):
+    if len(values) > MAX_BOOTSTRAP_SAMPLE:
+        values = rng.choice(values, MAX_BOOTSTRAP_SAMPLE, replace=False)
+    return values
+
+
+def bootstrap_quantile_diffs(baseline, candidate, qs, n_boot=DEFAULT_BOOTSTRAP, confidence=0.95, seed=0):
+    """Candidate minus baseline difference for each of the `qs` quantiles, with percentile-bootstrap confidence intervals.
+
+    Each run is resampled once, and all quantiles are computed from those
+    shared replicates. Point estimates use the full samples. Samples larger
+    than MAX_BOOTSTRAP_SAMPLE are subsampled before resampling, which widens
+    the intervals. Returns None when either sample is empty. `significant`
+    means the interval excludes zero.
+    """
+    rng = np.random.default_rng(seed)
+    baseline = np.asarray(baseline, dtype=np.float64)
+    candidate = np.asarray(candidate, dtype=np.float64)
+    baseline = baseline[~np.isnan(baseline)]
+    candidate = candidate[~np.isnan(candidate)]
+    if len(baseline) == 0 or len(candidate) == 0:
+        return None
+    qs = list(qs)
+    diffs = (_resampled_quantiles(_subsample(candidate, rng), qs, n_boot, rng)
+             - _resampled_quantiles(_subsample(baseline, rng), qs, n_boot, rng))
+    alpha = (1 - confidence) / 2
+    lows, highs = np.quantile(diffs, [alpha, 1 - alpha], axis=0)
+    base_qs = np.quantile(baseline, qs)
+    cand_qs = np.quantile(candidate, qs)
+    results = []
+    for base_q, cand_q, low, high in zip(base_qs, cand_qs, lows, highs):
+        base_q, cand_q = float(base_q), float(cand_q)
+        results.append({
+            "baseline": base_q,
+            "candidate": cand_q,
+            "diff": cand_q - base_q,
+            "diff_pct": (cand_q - base_q) / base_q * 100 if base_q else float("nan"),
+            "ci_low": float(low),
+            "ci_high": float(high),
+            "significant": bool(low > 0 or high < 0),
+            "n_baseline": int(len(baseline)),
+            "n_candidate": int(len(candidate)),
+        })
+    return results
+
+
+def bootstrap_quantile_diff(baseline, candidate, q, n_boot=DEFAULT_BOOTSTRAP, confidence=0.95, seed=0):
+    """Single-quantile form of `bootstrap_quantile_diffs`."""
+    results = bootstrap_quantile_diffs(baseline, candidate, [q], n_boot, confidence, seed)
+    return results[0] if results else None
+
+
+def per_second_tokens(df):
+    """Tokens completed in each whole second of the run (empty seconds count as 0)."""
+    if df.empty:
+        return np.array([])
+    seconds = df["timestamp"].dt.floor("s")
+    counts = df.groupby(seconds)["tokens_per_request"].sum()
+    full = pd.date_range(counts.index.min(), counts.index.max(), freq="s")
+    return counts.reindex(full, fill_value=0).to_numpy(dtype=np.float64)
+
+
+# --- Run Comparison ---
+def compare_runs(baseline_df, candidate_df, metrics=DEFAULT_METRICS, quantiles=DEFAULT_QUANTILES, warmup=0,
+                 n_boot=DEFAULT_BOOTSTRAP, confidence=0.95, min_effect_pct=0.0, seed=0):
+    """One row per metric and quantile, plus median per-second token throughput.
+
+    A latency row is a `regression` when the candidate is significantly
+    slower by at least `min_effect_pct` percent; the throughput row when
+    tokens/sec is significantly lower by that much.
+    """
+    baseline_df = trim_warmup(baseline_df, warmup)
+    candidate_df = trim_warmup(candidate_df, warmup)
+    base_ok = baseline_df[baseline_df["status"] == "success"]
+    cand_ok = candidate_df[candidate_df["status"] == "success"]
+
+    rows = []
+    for metric in metrics:
+        if metric not in base_ok.columns or metric not in cand_ok.columns:
+            continue
+        results = bootstrap_quantile_diffs(base_ok[metric], cand_ok[metric], quantiles, n_boot, confidence, seed)
+        for q, result in zip(quantiles, results or []):
+            result.update({"metric": metric, "statistic": f"p{q * 100:g}"})
+            result["regression"] = result["significant"] and result["diff"] > 0 and result["diff_pct"] >= min_effect_pct
+            rows.append(result)
+
+    tps = bootstrap_quantile_diff(per_second_tokens(baseline_df), per_second_tokens(candidate_df), 0.5, n_boot, confidence, seed)
+    if tps is not None:
+        tps.update({"metric": "tps", "statistic": "p50 per second"})
+        tps["regression"] = tps["significant"] and tps["diff"] < 0 and -tps["diff_pct"] >= min_effect_pct
+        rows.append(tps)
+
+    columns = ["metric", "statistic", "baseline", "candidate", "diff", "diff_pct", "ci_low", "ci_high",
+               "significant", "regression", "n_baseline", "n_candidate"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+# --- Headless Command ---
+def resolve_run(arg, data_dir="data"):
+    """Accept a metrics CSV path or a run timestamp prefix."""
+    if arg.endswith(".csv"):
+        return arg
+    return os.path.join(data_dir, f"{arg}_metrics.csv")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two load test runs with bootstrap confidence intervals")
+    parser.add_argument("baseline", help="baseline run (timestamp prefix or _metrics.csv path)")
+    parser.add_argument("candidate", help="candidate run (timestamp prefix or _metrics.csv path)")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--metrics", nargs="+", default=DEFAULT_METRICS)
+    parser.add_argument("--quantiles", nargs="+", type=float, default=[q * 100 for q in DEFAULT_QUANTILES],
+                        help="percentiles, e.g. 50 95 99")
+    parser.add_argument("--warmup", type=float, default=0, help="seconds trimmed from the start of each run")
+    parser.add_argument("--whole-run", action="store_true", help="compare whole runs instead of their steady-state windows")
+    parser.add_argument("--bootstrap", type=int, default=DEFAULT_BOOTSTRAP)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--min-effect", type=float, default=0.0, help="minimum slowdown (%%) that counts as a regression")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from run_index import load_metrics
+    from steady_state import load_steady_state
+
+    def load(arg):
+        path = resolve_run(arg, args.data_dir)
+        return load_metrics(path) if args.whole_run else load_steady_state(path)[0]
+
+    result = compare_runs(
+        load(args.baseline),
+        load(args.candidate),
+        metrics=args.metrics,
+        quantiles=[q / 100 for q in args.quantiles],
+        warmup=args.warmup,
+        n_boot=args.bootstrap,
+        confidence=args.confidence,
+        min_effect_pct=args.min_effect,
+        seed=args.seed,
+    )
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(result.round(4).to_string(index=False))
+
+    regressions = result[result["regression"]]
+    if not regressions.empty:
+        print(f"\nREGRESSION: {', '.join(regressions['metric'] + ' ' + regressions['statistic'])}")
+        return 1
+    print("\nNo significant regression.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import csv
+import os
+import threading
+import time
+from collections import defaultdict
+
+# --- Timeline CSV Schema (one row per sampling interval) ---
+TIMELINE_HEADER = ["timestamp", "in_flight", "in_flight_avg", "streaming", "queued", "active_users"]
+DEFAULT_SAMPLE_INTERVAL = 1.0  # sec
+
+
+# --- In-Flight Request Tracker ---
+class ConcurrencyTracker:
+    """Counts in-flight requests and integrates the count over time.
+
+    A request is queued from `start()` until `streaming()` (response headers
+    received), then streaming until `finish()`. Because the tracker keeps the
+    running area under the in-flight curve, `finish()` can return the
+    time-weighted average concurrency over the request's own lifetime
+    without storing any history.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.streaming_count = 0
+        self._area = 0.0
+        self._last = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _advance(self, now):
+        self._area += self.in_flight * (now - self._last)
+        self._last = now
+
+    def area(self, now=None):
+        """Integral of in-flight requests over time (request-seconds) up to `now`."""
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            return self._area + self.in_flight * (now - self._last)
+
+    def start(self):
+        """Count a new request; returns `(in_flight, token)` where `token` is passed to `finish`."""
+        now = time.perf_counter()
+        with self._lock:
+            self._advance(now)
+            self.in_flight += 1
+            return self.in_flight, (now, self._area)
+
+    def streaming(self):
+        with self._lock:
+            self.streaming_count += 1
+
+    def finish(self, token, streamed=False):
+        """Stop counting a request; returns its time-weighted average in-flight count."""
+        now = time.perf_counter()
+        started, start_area = token
+        with self._lock:
+            self._advance(now)
+            elapsed = now - started
+            avg = (self._area - start_area) / elapsed if elapsed > 0 else float(self.in_flight)
+            self.in_flight -= 1
+            if streamed:
+                self.streaming_count -= 1
+        return avg
+
+
+# --- Timeline Sampler ---
+class ConcurrencySampler:
+    """Writes one timeline row per `interval` seconds to the run's `_concurrency.csv`.
+
+    Sample times are aligned to epoch multiples of `interval`, so shards from
+    worker processes line up and can be summed row by row. `in_flight_avg` is
+    the time-weighted mean over the interval; the other columns are the
+    values at the sample time. `active_users` is a callable.
+    """
+
+    def __init__(self, tracker, path, active_users=None, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.tracker = tracker
+        self.path = path
+        self.active_users = active_users or (lambda: 0)
+        self.interval = interval
+        self._stop = threading.Event()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, mode="w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(TIMELINE_HEADER)
+        self._thread = threading.Thread(target=self._run, name="concurrency-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last_area = self.tracker.area()
+        last_time = time.perf_counter()
+        while True:
+            wall = time.time()
+            next_tick = (int(wall // self.interval) + 1) * self.interval
+            if self._stop.wait(next_tick - wall):
+                break
+            now = time.perf_counter()
+            area = self.tracker.area(now)
+            in_flight = self.tracker.in_flight
+            streaming = self.tracker.streaming_count
+            self._writer.writerow([
+                f"{next_tick:.3f}", in_flight, f"{(area - last_area) / max(now - last_time, 1e-9):.3f}",
+                streaming, in_flight - streaming, self.active_users(),
+            ])
+            self._file.flush()
+            last_area, last_time = area, now
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.interval + 5)
+        self._file.close()
+
+
+def sample_interval_from_env():
+    return float(os.environ.get("CONCURRENCY_SAMPLE_INTERVAL", DEFAULT_SAMPLE_INTERVAL))
+
+
+# --- Shard Merging ---
+def merge_timeline_files(paths, out_path):
+    """Sum per-worker timelines by sample time into one file."""
+    totals = defaultdict(lambda: [0, 0.0, 0, 0, 0])
+    for path in paths:
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) != len(TIMELINE_HEADER):
+                    continue
+                total = totals[float(row[0])]
+                total[0] += int(row[1])
+                total[1] += float(row[2])
+                total[2] += int(row[3])
+                total[3] += int(row[4])
+                total[4] += int(row[5])
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(TIMELINE_HEADER)
+        for ts in sorted(totals):
+            in_flight, avg, streaming, queued, users = totals[ts]
+            writer.writerow([f"{ts:.3f}", in_flight, f"{avg:.3f}", streaming, queued, users])
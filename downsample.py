@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# --- Chart Budgets (points sent to the browser per chart, whatever the run length) ---
+MAX_SERIES_POINTS = 2000    # per line after LTTB
+MAX_RAW_SCATTER_POINTS = 5000  # below this, scatters are drawn point by point
+SCATTER_BINS = 60
+BAND_QUANTILES = [0.5, 0.95, 0.99]
+MAX_OUTLIERS = 500
+
+
+def _numeric(values):
+    """Float view of an x column; datetimes become nanoseconds."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+# --- Largest-Triangle-Three-Buckets ---
+def lttb_indices(x, y, n_out):
+    """Indices of `n_out` points that keep the visual shape of the series `(x, y)`.
+
+    `x` must be ascending and neither array may hold NaN. The first and
+    last points are always kept; from each of the `n_out - 2` buckets in
+    between, LTTB keeps the point forming the largest triangle with the
+    previously kept point and the mean of the next bucket, so peaks and
+    dips survive where plain striding would drop them.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def downsample_series(df, x, ys, n_out=MAX_SERIES_POINTS, group=None):
+    """LTTB-reduced lines in long form: columns `x`, `group` (if any), `series` and `value`.
+
+    Each `y` column (and each group) becomes its own line of at most `n_out` points.
+    """
+    id_vars = [x] + ([group] if group else [])
+    long = df[id_vars + list(ys)].melt(id_vars=id_vars, var_name="series", value_name="value")
+    long = long.dropna(subset=[x, "value"])
+    parts = []
+    for _, part in long.groupby((["series"] + ([group] if group else [])), sort=False):
+        part = part.sort_values(x, kind="stable")
+        keep = lttb_indices(_numeric(part[x]), part["value"].to_numpy(dtype=np.float64), n_out)
+        parts.append(part.iloc[keep])
+    if not parts:
+        return long
+    return pd.concat(parts, ignore_index=True)
+
+
+# --- Binned Percentile Bands ---
+def binned_bands(df, x, ys, bins=SCATTER_BINS, quantiles=BAND_QUANTILES, max_outliers=MAX_OUTLIERS, group=None):
+    """Percentile bands of `ys` over bins of `x`, plus the outliers above the top band.
+
+    Returns `(bands, outliers)`. `bands` has one row per bin, series, group
+    and quantile (`x` is the bin center, `band` the quantile label,
+    `value` the percentile). `outliers` holds at most `max_outliers` raw
+    points above their bin's highest quantile, largest first, so the
+    spikes a scatter would show are kept.
+    """
+    id_vars = [x] + ([group] if group else [])
+    long = df[id_vars + list(ys)].melt(id_vars=id_vars, var_name="series", value_name="value").dropna(subset=[x, "value"])
+    keys = ["series"] + ([group] if group else [])
+    if long.empty:
+        return pd.DataFrame(columns=keys + [x, "band", "value", "count"]), long
+
+    xv = _numeric(long[x])
+    distinct = np.unique(xv)
+    if len(distinct) <= bins:
+        centers = xv  # few distinct loads (e.g. integer user counts): one bin per value
+    else:
+        edges = np.linspace(distinct[0], distinct[-1], bins + 1)
+        idx = np.clip(np.digitize(xv, edges) - 1, 0, bins - 1)
+        centers = ((edges[:-1] + edges[1:]) / 2)[idx]
+    long = long.assign(_bin=centers)
+
+    grouped = long.groupby(keys + ["_bin"], sort=True)["value"]
+    table = grouped.quantile(quantiles).unstack()
+    table.columns = [f"p{q * 100:g}" for q in quantiles]
+    table["count"] = grouped.size()
+    top = table[f"p{quantiles[-1] * 100:g}"].rename("_top")
+
+    outliers = long.join(top, on=keys + ["_bin"])
+    outliers = outliers[outliers["value"] > outliers["_top"]].nlargest(max_outliers, "value").drop(columns=["_bin", "_top"])
+
+    bands = table.reset_index().melt(id_vars=keys + ["_bin", "count"], var_name="band", value_name="value")
+    bands = bands.rename(columns={"_bin": x}).sort_values(keys + ["band", x])
+    if pd.api.types.is_datetime64_any_dtype(df[x]):
+        bands[x] = pd.to_datetime(bands[x].astype(np.int64))
+    return bands.reset_index(drop=True), outliers.reset_index(drop=True)
@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+
+# --- Client Backends ---
+HTTP_CLIENTS = ["requests", "fasthttp"]  # locust HttpUser session / geventhttpclient-based FastHttpUser
+DEFAULT_POOL_SIZE = 100
+
+# Connection columns on every metrics row (seconds; blank when not applicable)
+CONNECTION_COLUMNS = ["time_to_headers", "connect_time", "tls_time"]
+
+
+class ClientOptions:
+    """HTTP client backend plus its pool and keep-alive settings (HTTP_* env vars)."""
+
+    def __init__(self, backend="requests", pool_size=DEFAULT_POOL_SIZE, keep_alive=True, connect_timeout=60.0):
+        if backend not in HTTP_CLIENTS:
+            raise ValueError(f"Unknown HTTP client: {backend}")
+        self.backend = backend
+        self.pool_size = int(pool_size)
+        self.keep_alive = keep_alive
+        self.connect_timeout = float(connect_timeout)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            backend=os.environ.get("HTTP_CLIENT", "requests"),
+            pool_size=int(os.environ.get("HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)),
+            keep_alive=os.environ.get("HTTP_KEEP_ALIVE", "1") != "0",
+            connect_timeout=float(os.environ.get("HTTP_CONNECT_TIMEOUT", 60)),
+        )
+
+    def headers(self, base):
+        """Request headers; without keep-alive every request asks the server to close its connection."""
+        return base if self.keep_alive else {**base, "Connection": "close"}
+
+    def describe(self):
+        return {
+            "backend": self.backend,
+            "pool_size": self.pool_size,
+            "keep_alive": self.keep_alive,
+            "connect_timeout": self.connect_timeout,
+        }
+
+
+def client_env(backend="requests", pool_size=DEFAULT_POOL_SIZE, keep_alive=True, connect_timeout=60):
+    """Env vars that hand client settings to a load engine subprocess."""
+    return {
+        "HTTP_CLIENT": backend,
+        "HTTP_POOL_SIZE": str(pool_size),
+        "HTTP_KEEP_ALIVE": "1" if keep_alive else "0",
+        "HTTP_CONNECT_TIMEOUT": str(connect_timeout),
+    }
+
+
+def configure_session(session, options, hosts=1):
+    """Size the connection pool of a requests session (locust's default HttpUser client).
+
+    requests keeps only `pool_maxsize` idle connections per host and silently
+    opens throwaway ones beyond that, so open-loop runs need a pool as large
+    as their in-flight limit to reuse connections. `hosts` is how many
+    endpoints the user talks to, so each keeps its own pool.
+    """
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=options.pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def stream_errors(backend):
+    """Exceptions a streamed locust response can raise mid-body (reset connections, truncated chunked encoding)."""
+    errors = [OSError]
+    try:
+        if backend == "fasthttp":
+            from geventhttpclient.response import HTTPParseError
+            errors.append(HTTPParseError)
+        else:
+            from requests.exceptions import RequestException
+            errors.append(RequestException)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def iter_response_lines(response):
+    """Raw SSE lines from a streamed locust response, for either client backend."""
+    if hasattr(response, "iter_lines"):
+        return response.iter_lines()
+    return _iter_stream_lines(response.stream)
+
+
+def _iter_stream_lines(stream):
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        yield line.rstrip(b"\r\n")
+
+
+# --- Connection Setup Timing (per greenlet / thread) ---
+_timing = threading.local()
+
+
+def reset_connection_timing():
+    _timing.connect = None
+    _timing.tls = None
+
+
+def take_connection_timing():
+    """`(connect, tls)` seconds recorded since the last reset; `(None, None)` when a pooled connection was reused."""
+    timing = getattr(_timing, "connect", None), getattr(_timing, "tls", None)
+    reset_connection_timing()
+    return timing
+
+
+def _timed(func, on_done):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            on_done(time.perf_counter() - start)
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+def _set_connect(elapsed):
+    _timing.connect = elapsed
+
+
+def _set_tls(elapsed):
+    # The TLS-wrapped call includes the TCP connect made inside it
+    _timing.tls = max(elapsed - (getattr(_timing, "connect", None) or 0.0), 0.0)
+
+
+_installed = {}  # backend -> whether its connect hook is active
+
+
+def install_connection_timing(backend):
+    """Wrap the client's socket setup so new connections record TCP connect and TLS handshake time.
+
+    Returns whether the connect hook is active; only then does a missing
+    connect time mean a pooled connection was reused. Safe to call more
+    than once. Library versions without the expected hooks are left alone
+    and the connection columns stay blank.
+    """
+    if backend in _installed:
+        return _installed[backend]
+    _installed[backend] = False
+    try:
+        if backend == "fasthttp":
+            from geventhttpclient.connectionpool import ConnectionPool, SSLConnectionPool
+            ConnectionPool._connect_socket = _timed(ConnectionPool._connect_socket, _set_connect)
+            _installed[backend] = True
+            SSLConnectionPool._connect_socket = _timed(SSLConnectionPool._connect_socket, _set_tls)
+        else:
+            from urllib3.connection import HTTPConnection, HTTPSConnection
+            HTTPConnection._new_conn = _timed(HTTPConnection._new_conn, _set_connect)
+            _installed[backend] = True
+            HTTPSConnection.connect = _timed(HTTPSConnection.connect, _set_tls)
+    except (ImportError, AttributeError):
+        pass
+    return _installed[backend]
+
+
+# --- aiohttp Tracing (asyncio engine) ---
+def aiohttp_trace_config():
+    """TraceConfig that stores connection setup time in the request's `trace_request_ctx` dict.
+
+    aiohttp reports TCP connect and TLS handshake as one step, so the
+    asyncio engine records it as `connect_time` and leaves `tls_time` blank.
+    """
+    import aiohttp
+
+    async def on_create_start(session, ctx, params):
+        ctx.trace_request_ctx["_connect_start"] = time.perf_counter()
+
+    async def on_create_end(session, ctx, params):
+        ctx.trace_request_ctx["connect"] = time.perf_counter() - ctx.trace_request_ctx.pop("_connect_start")
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_start.append(on_create_start)
+    trace_config.on_connection_create_end.append(on_create_end)
+    return trace_config
@@ -0,0 +1,406 @@
+import csv
+import glob
+import heapq
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from arrivals import arrival_env
+from capacity import capacity_env
+from client_health import merge_harness_summaries
+from concurrency import merge_timeline_files
+from http_client import client_env
+from sketches import merge_sketch_files
+from targets import targets_env
+from workload import dataset_env, prefix_env, synthetic_env
+
+DATA_DIR = "data"
+LOCUSTFILE = "locust_load_test.py"
+ASYNC_ENGINE_SCRIPT = "async_load_test.py"
+MOCK_SERVER_SCRIPT = "mock_server.py"
+ENGINES = ["locust", "asyncio"]
+
+
+# --- Time Parsing Function ---
+def parse_run_time(rt_str):
+    rt_str = rt_str.lower().strip()
+    minutes, seconds = 0, 0
+    if "m" in rt_str and "s" in rt_str:
+        parts = rt_str.replace("m", " ").replace("s", "").split()
+        minutes = int(parts[0])
+        seconds = int(parts[1])
+    elif "m" in rt_str:
+        minutes = int(rt_str.replace("m", ""))
+    elif "s" in rt_str:
+        seconds = int(rt_str.replace("s", ""))
+    return minutes * 60 + seconds
+
+
+# --- Shard Naming (workers never write the `_metrics.csv` the Dashboard lists) ---
+def shard_metrics_path(timestamp_prefix, worker_index):
+    return os.path.join(DATA_DIR, f"{timestamp_prefix}_metrics.w{worker_index}.csv")
+
+
+def shard_chunks_path(timestamp_prefix, worker_index):
+    return os.path.join(DATA_DIR, f"{timestamp_prefix}_chunks.w{worker_index}.bin")
+
+
+def shard_sketches_path(timestamp_prefix, worker_index):
+    return os.path.join(DATA_DIR, f"{timestamp_prefix}_sketches.w{worker_index}.json")
+
+
+def shard_concurrency_path(timestamp_prefix, worker_index):
+    return os.path.join(DATA_DIR, f"{timestamp_prefix}_concurrency.w{worker_index}.csv")
+
+
+def shard_harness_path(timestamp_prefix, worker_index):
+    return os.path.join(DATA_DIR, f"{timestamp_prefix}_harness.w{worker_index}.csv")
+
+
+def shard_profile_path(timestamp_prefix, worker_index):
+    return os.path.join(DATA_DIR, f"{timestamp_prefix}_profile.w{worker_index}.folded")
+
+
+def shard_config_path(timestamp_prefix, worker_index):
+    return os.path.join(DATA_DIR, f"{timestamp_prefix}_config.w{worker_index}.json")
+
+
+# --- Locust Commands ---
+def build_locust_commands(target_url, users, spawn_rate, run_time, workers=0):
+    """Return the locust command lines to start: one standalone process, or a master plus `workers` workers."""
+    base = ["locust", "-f", LOCUSTFILE]
+    run_args = [
+        "--host", target_url,
+        "--users", str(users),
+        "--spawn-rate", str(spawn_rate),
+        "--headless",
+        "--run-time", run_time,
+    ]
+    if workers <= 0:
+        return [base + run_args]
+
+    commands = [base + run_args + ["--master", "--expect-workers", str(workers)]]
+    for _ in range(workers):
+        commands.append(base + ["--worker", "--master-host", "127.0.0.1"])
+    return commands
+
+
+def build_async_command(target_url, users, spawn_rate, run_time):
+    """Command line for the single-process asyncio engine (same options as the locust run)."""
+    return [
+        sys.executable, ASYNC_ENGINE_SCRIPT,
+        "--host", target_url,
+        "--users", str(users),
+        "--spawn-rate", str(spawn_rate),
+        "--run-time", run_time,
+    ]
+
+
+# --- Run Config ---
+def build_run_config(timestamp_prefix, target_url, users, spawn_rate, run_time, workers=0, engine="locust", arrival=None,
+                     dataset=None, capacity=None, targets=None, mock=None, synthetic=None):
+    """The `_config.json` fields known before launch, from the same arguments as `start_load_test`.
+
+    The engines add their own sections (workload, token counting, client
+    health, ...) while the run is going.
+    """
+    if capacity is not None:
+        engine = "locust"
+    config = {
+        "timestamp": timestamp_prefix,
+        "users": users,
+        "spawn_rate": spawn_rate,
+        "run_time": run_time,
+        "target_url": target_url,
+        "workers": workers if engine == "locust" else 0,
+        "engine": engine,
+        "load_mode": "capacity" if capacity is not None else "open" if arrival is not None else "closed",
+    }
+    if targets:
+        config["targets"] = targets
+    if mock is not None:
+        config["mock_server"] = mock
+    if synthetic is not None:
+        config["synthetic"] = synthetic
+    if dataset is not None:
+        config.update({"dataset": dataset["path"], "dataset_seed": dataset.get("seed")})
+    if arrival is not None:
+        config.update({
+            "target_rps": arrival["rate"],
+            "arrival_process": arrival.get("process", "poisson"),
+            "ramp_start_rps": arrival.get("start_rate", 0),
+            "ramp_seconds": arrival.get("ramp", 0),
+            "max_in_flight": arrival.get("max_in_flight", 1000),
+        })
+    if capacity is not None:
+        config["capacity_search"] = capacity
+    return config
+
+
+def write_run_config(timestamp_prefix, config):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"{timestamp_prefix}_config.json")
+    with open(path, "w") as f:
+        json.dump(config, f, indent=4)
+    return path
+
+
+def start_load_test(timestamp_prefix, target_url, users, spawn_rate, run_time, workers=0, engine="locust", arrival=None, dataset=None,
+                    capacity=None, http_client=None, prefix=None, profile=False, targets=None, synthetic=None):
+    """Launch the load test processes and return their Popen handles (master or standalone first).
+
+    The asyncio engine always runs as one process, so `workers` only applies to locust.
+    `arrival` (keyword arguments for `arrivals.arrival_env`) switches to open-loop mode,
+    where locust runs one dispatcher user per process instead of `users` closed-loop users.
+    `dataset` (keyword arguments for `workload.dataset_env`) replays prompts from a JSONL file.
+    `capacity` (keyword arguments for `capacity.capacity_env`) runs the SLO capacity search,
+    which needs locust's LoadTestShape and so always uses the locust engine.
+    `http_client` (keyword arguments for `http_client.client_env`) picks the locust client
+    backend and sets pool size and keep-alive; the asyncio engine applies the pool and keep-alive settings.
+    `prefix` (keyword arguments for `workload.prefix_env`) sends shared-prefix prompt families
+    instead of the fixed prompt or dataset.
+    `profile` samples the streaming loop into a collapsed-stack `_profile.folded` file.
+    `targets` (a list of `{name, url, model, weight}` dicts for `targets.targets_env`) splits
+    every request stream across several endpoint/model pairs; `target_url` stays the default host.
+    `synthetic` (keyword arguments for `workload.synthetic_env`) sends unique fixed-length prompts
+    with an optional `max_tokens` cap.
+    """
+    extra_env = {}
+    if capacity is not None:
+        extra_env.update(capacity_env(**capacity))
+        engine = "locust"
+    if arrival is not None:
+        extra_env.update(arrival_env(**arrival))
+        users = spawn_rate = max(workers, 1)
+    if dataset is not None:
+        extra_env.update(dataset_env(**dataset))
+    if prefix is not None:
+        extra_env.update(prefix_env(**prefix))
+    elif synthetic is not None:
+        extra_env.update(synthetic_env(**synthetic))
+    if profile:
+        extra_env["HARNESS_PROFILE"] = "1"
+    if targets:
+        extra_env.update(targets_env(targets))
+    if http_client is not None:
+        extra_env.update(client_env(**http_client))
+        extra_env["ASYNC_POOL_SIZE"] = extra_env["HTTP_POOL_SIZE"]
+
+    if engine == "asyncio":
+        workers = 0
+        commands = [build_async_command(target_url, users, spawn_rate, run_time)]
+    else:
+        commands = build_locust_commands(target_url, users, spawn_rate, run_time, workers)
+
+    processes = []
+    for i, command in enumerate(commands):
+        env = dict(os.environ, TEST_TIMESTAMP=timestamp_prefix, **extra_env)
+        if workers > 0:
+            env["LOCUST_WORKERS"] = str(workers)
+            if i > 0:
+                env["WORKER_INDEX"] = str(i - 1)
+        processes.append(subprocess.Popen(command, env=env))
+    return processes
+
+
+# --- Local Mock Server ---
+def mock_summary_path(timestamp_prefix):
+    return os.path.join(DATA_DIR, f"{timestamp_prefix}_mock.json")
+
+
+def start_mock_server(timestamp_prefix, port=8000, startup_timeout=10, **options):
+    """Start `mock_server.py` for a run and wait until it accepts connections.
+
+    `options` are keyword arguments for `mock_server.mock_args`. The server
+    writes its ground-truth stats to the run's `_mock.json` when stopped.
+    Returns `(process, base_url)`.
+    """
+    from mock_server import mock_args
+
+    command = [sys.executable, MOCK_SERVER_SCRIPT] + mock_args(port=port, summary=mock_summary_path(timestamp_prefix), **options)
+    process = subprocess.Popen(command)
+    deadline = time.monotonic() + startup_timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            break
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                stop_mock_server(process)
+                raise RuntimeError(f"Mock server did not start on port {port}")
+            time.sleep(0.1)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def stop_mock_server(process, timeout=10):
+    """SIGTERM lets the server write its summary; kill it if it does not exit in time."""
+    if process.poll() is None:
+        process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def wait_for_processes(processes, timeout=None):
+    """Wait for every process to exit; kills stragglers after `timeout` seconds. Returns the master's exit code."""
+    for proc in processes:
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    return processes[0].returncode if processes else None
+
+
+def stop_processes(processes, timeout=30):
+    """Interrupt every process still running, then wait, killing any that outlive `timeout`.
+
+    SIGINT (not SIGTERM) so that both locust and the asyncio engine shut
+    down through their normal exit path and flush the run's files.
+    """
+    for proc in processes:
+        if proc.poll() is None:
+            proc.send_signal(signal.SIGINT)
+    return wait_for_processes(processes, timeout)
+
+
+# --- Shard Merging ---
+def merge_shards(timestamp_prefix, remove_shards=True):
+    """Merge per-worker shards (metrics, chunks, sketches, concurrency, harness samples, profiles, config)
+    into the single-run files the Dashboard reads.
+
+    Each worker's CSV is already in completion order (its BatchWriter writes
+    rows in queue order), so rows are k-way merged on timestamp without
+    loading whole shards into memory; no metrics file is written when every
+    shard is empty. Returns the
+    number of shards merged (0 for single-process runs).
+    """
+    metrics_shards = sorted(glob.glob(os.path.join(DATA_DIR, f"{timestamp_prefix}_metrics.w*.csv")))
+    if not metrics_shards:
+        return 0
+
+    files = [open(p, newline="") for p in metrics_shards]
+    try:
+        readers = [csv.reader(f) for f in files]
+        headers = [next(r, None) for r in readers]
+        # Every shard can be empty when workers died before their first flush; the other artifacts still merge
+        header = next((h for h in headers if h), None)
+        if header is not None:
+            with open(os.path.join(DATA_DIR, f"{timestamp_prefix}_metrics.csv"), "w", newline="") as out:
+                writer = csv.writer(out)
+                writer.writerow(header)
+                writer.writerows(heapq.merge(*readers, key=lambda row: row[0]))
+    finally:
+        for f in files:
+            f.close()
+
+    chunk_shards = sorted(glob.glob(os.path.join(DATA_DIR, f"{timestamp_prefix}_chunks.w*.bin")))
+    if chunk_shards:
+        with open(os.path.join(DATA_DIR, f"{timestamp_prefix}_chunks.bin"), "wb") as out:
+            for p in chunk_shards:
+                with open(p, "rb") as f:
+                    while block := f.read(1 << 20):
+                        out.write(block)
+
+    sketch_shards = sorted(glob.glob(os.path.join(DATA_DIR, f"{timestamp_prefix}_sketches.w*.json")))
+    if sketch_shards:
+        merge_sketch_files(sketch_shards, os.path.join(DATA_DIR, f"{timestamp_prefix}_sketches.json"))
+
+    timeline_shards = sorted(glob.glob(os.path.join(DATA_DIR, f"{timestamp_prefix}_concurrency.w*.csv")))
+    if timeline_shards:
+        merge_timeline_files(timeline_shards, os.path.join(DATA_DIR, f"{timestamp_prefix}_concurrency.csv"))
+
+    # Harness samples carry a `process` column, so shards are simply concatenated
+    harness_shards = sorted(glob.glob(os.path.join(DATA_DIR, f"{timestamp_prefix}_harness.w*.csv")))
+    if harness_shards:
+        with open(os.path.join(DATA_DIR, f"{timestamp_prefix}_harness.csv"), "w") as out:
+            for i, p in enumerate(harness_shards):
+                with open(p) as f:
+                    header = f.readline()
+                    if i == 0:
+                        out.write(header)
+                    out.write(f.read())
+
+    profile_shards = sorted(glob.glob(os.path.join(DATA_DIR, f"{timestamp_prefix}_profile.w*.folded")))
+    if profile_shards:
+        stacks = Counter()
+        for p in profile_shards:
+            with open(p) as f:
+                for line in f:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack:
+                        stacks[stack] += int(count)
+        with open(os.path.join(DATA_DIR, f"{timestamp_prefix}_profile.folded"), "w") as out:
+            for stack, count in stacks.most_common():
+                out.write(f"{stack} {count}\n")
+
+    config_shards = sorted(glob.glob(os.path.join(DATA_DIR, f"{timestamp_prefix}_config.w*.json")))
+    if config_shards:
+        _merge_config_shards(timestamp_prefix, config_shards)
+
+    if remove_shards:
+        for p in metrics_shards + chunk_shards + sketch_shards + timeline_shards + harness_shards + profile_shards + config_shards:
+            os.remove(p)
+    return len(metrics_shards)
+
+
+def _merge_config_shards(timestamp_prefix, config_shards):
+    from metrics_writer import update_run_config
+
+    methods = Counter()
+    tokenizer = None
+    dispatch = Counter()
+    max_lag = None
+    health = []
+    targets = None
+    writer = Counter()
+    passthrough = {}
+    for p in config_shards:
+        with open(p) as f:
+            shard = json.load(f)
+        for key, value in shard.items():
+            if key not in ("token_counting", "dispatch", "client_health", "targets", "metrics_writer"):
+                passthrough.setdefault(key, value)
+        health.append(shard.get("client_health"))
+        writer.update(shard.get("metrics_writer") or {})
+        if shard.get("targets"):
+            # Every worker runs the same target list; sum the requests each one sent
+            if targets is None:
+                targets = [dict(t) for t in shard["targets"]]
+            else:
+                for total, t in zip(targets, shard["targets"]):
+                    total["requests"] += t["requests"]
+        token_counting = shard.get("token_counting") or {}
+        methods.update(token_counting.get("requests_by_method") or {})
+        tokenizer = tokenizer or token_counting.get("tokenizer")
+        if "dispatch" in shard:
+            shard_dispatch = dict(shard["dispatch"])
+            shard_lag = shard_dispatch.pop("max_lag", 0)
+            max_lag = shard_lag if max_lag is None else max(max_lag, shard_lag)
+            dispatch.update(shard_dispatch)
+
+    updates = {
+        **passthrough,
+        "token_counting": {
+            "method": methods.most_common(1)[0][0] if methods else None,
+            "tokenizer": tokenizer,
+            "requests_by_method": dict(methods),
+        }
+    }
+    if max_lag is not None:
+        updates["dispatch"] = {**dispatch, "max_lag": max_lag}
+    client_health = merge_harness_summaries(health)
+    if client_health is not None:
+        updates["client_health"] = client_health
+    if targets is not None:
+        updates["targets"] = targets
+    if writer:
+        updates["metrics_writer"] = dict(writer)
+    update_run_config(os.path.join(DATA_DIR, f"{timestamp_prefix}_config.json"), updates)
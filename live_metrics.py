@@ -0,0 +1,141 @@
+import csv
+import glob
+import io
+import os
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# --- Incremental CSV Tail ---
+class MetricsTail:
+    """Reads only the bytes appended to one or more metrics CSVs since the last poll.
+
+    `pattern` is a glob so worker shards that appear mid-run are picked up.
+    Partial trailing lines are held back until the writer finishes them.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.header = None
+        self._offsets = {}
+        self._partial = {}
+        self._headers_read = set()
+
+    def poll(self):
+        """Return the complete rows appended since the previous call."""
+        return [row for rows in self.poll_files().values() for row in rows]
+
+    def poll_files(self):
+        """Like `poll`, but keyed by file so per-worker series can be told apart."""
+        rows = {}
+        for path in sorted(glob.glob(self.pattern)):
+            offset = self._offsets.get(path, 0)
+            try:
+                size = os.path.getsize(path)
+                if size <= offset:
+                    continue
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    data = f.read(size - offset)
+            except OSError:
+                continue
+            self._offsets[path] = offset + len(data)
+
+            data = self._partial.pop(path, b"") + data
+            complete, sep, rest = data.rpartition(b"\n")
+            if not sep:
+                self._partial[path] = data
+                continue
+            if rest:
+                self._partial[path] = rest
+
+            reader = csv.reader(io.StringIO(complete.decode("utf-8")))
+            if path not in self._headers_read:
+                self._headers_read.add(path)
+                header = next(reader, None)
+                self.header = self.header or header
+            rows[path] = list(reader)
+        return rows
+
+
+# --- Rolling Per-Second Aggregates ---
+class LiveAggregator:
+    """Per-second TTFT, TPS, error rate and concurrency over the last `window` seconds.
+
+    `in_flight` comes from the sampled concurrency timeline (summed across
+    worker files), so it keeps moving while streams stall and nothing
+    completes. `concurrency_at_start` is the highest `concurrent_requests`
+    snapshot among the requests that completed in that second.
+    """
+
+    def __init__(self, window=300):
+        self.window = window
+        self._buckets = OrderedDict()  # second -> [requests, failures, ttft_sum, ttft_n, tokens, max_concurrency]
+        self._in_flight = {}           # second -> {timeline file: in_flight}
+        self.total_requests = 0
+        self.total_failures = 0
+
+    def update(self, header, rows):
+        if not rows or not header:
+            return
+        col = {name: i for i, name in enumerate(header)}
+        for row in rows:
+            second = row[col["timestamp"]]
+            bucket = self._buckets.get(second)
+            if bucket is None:
+                bucket = self._buckets[second] = [0, 0, 0.0, 0, 0, 0]
+            bucket[0] += 1
+            if row[col["status"]] != "success":
+                bucket[1] += 1
+            ttft = row[col["ttft"]]
+            if ttft not in ("", "N/A"):
+                bucket[2] += float(ttft)
+                bucket[3] += 1
+            bucket[4] += int(row[col["tokens_per_request"]] or 0)
+            bucket[5] = max(bucket[5], int(row[col["concurrent_requests"]] or 0))
+        self.total_requests += len(rows)
+        self.total_failures += sum(1 for row in rows if row[col["status"]] != "success")
+
+        self._trim(self._buckets)
+
+    def update_timeline(self, header, rows_by_file):
+        """Fold in concurrency timeline rows (epoch-second timestamps) from `MetricsTail.poll_files`."""
+        if not header:
+            return
+        col = {name: i for i, name in enumerate(header)}
+        for path, rows in rows_by_file.items():
+            for row in rows:
+                if len(row) != len(header):
+                    continue
+                second = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(float(row[col["timestamp"]])))
+                self._in_flight.setdefault(second, {})[path] = int(row[col["in_flight"]])
+        self._trim(self._in_flight)
+
+    def _trim(self, buckets):
+        # Timestamps are zero-padded "%Y-%m-%d %H:%M:%S" strings, so they sort chronologically
+        if len(buckets) > self.window:
+            for second in sorted(buckets)[:len(buckets) - self.window]:
+                del buckets[second]
+
+    def frame(self):
+        """Per-second aggregates as a DataFrame sorted by time."""
+        seconds = sorted(set(self._buckets) | set(self._in_flight))[-self.window:]
+        records = []
+        for second in seconds:
+            b = self._buckets.get(second, [0, 0, 0.0, 0, 0, None])
+            sampled = self._in_flight.get(second)
+            records.append({
+                "timestamp": second,
+                "rps": b[0],
+                "ttft": b[2] / b[3] if b[3] else None,
+                "tps": b[4],
+                "error_rate": b[1] / b[0] * 100 if b[0] else None,
+                "in_flight": sum(sampled.values()) if sampled else None,
+                "concurrency_at_start": b[5],
+            })
+        df = pd.DataFrame(records, columns=["timestamp", "rps", "ttft", "tps", "error_rate", "in_flight",
+                                            "concurrency_at_start"])
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        return df
@@ -1,112 +1,318 @@
-from locust import HttpUser, task, between
+from locust import HttpUser, LoadTestShape, task, between, constant, events
+from locust.runners import MasterRunner, WorkerRunner
+import gevent
+from gevent.pool import Pool
 import time
-import json
-from threading import Lock
-import csv
 import os
+import itertools
 
-# --- Concurrency Tracker ---
-concurrent_requests = 0
-concurrent_lock = Lock()
+from metrics_writer import RunRecorder, writer_options_from_env, update_run_config
+from sse_parser import iter_data, StreamStats
+from workload import workload_from_env, REQUEST_HEADERS
+from targets import targets_from_env
+from token_counter import TokenCounter
+from launcher import (shard_metrics_path, shard_chunks_path, shard_sketches_path, shard_config_path, shard_concurrency_path,
+                      shard_harness_path, shard_profile_path)
+from arrivals import ArrivalSchedule, DispatchStats
+from capacity import CapacitySearch
+from concurrency import ConcurrencyTracker, ConcurrencySampler, sample_interval_from_env
+from client_health import HarnessMonitor, harness_interval_from_env, profiler_from_env
+from http_client import (ClientOptions, configure_session, install_connection_timing, iter_response_lines,
+                         reset_connection_timing, take_connection_timing, stream_errors)
+
+# --- Load Mode: "closed" (users with think time), "open" (arrival-rate driven) or "capacity" (SLO search) ---
+LOAD_MODE = os.environ.get("LOAD_MODE", "closed")
+dispatch_stats = DispatchStats()
+
+# --- HTTP Client Backend: locust's requests session or geventhttpclient (HTTP_* env vars) ---
+client_options = ClientOptions.from_env()
+connect_timed = install_connection_timing(client_options.backend)
+STREAM_ERRORS = stream_errors(client_options.backend)
+if client_options.backend == "fasthttp":
+    from locust.contrib.fasthttp import FastHttpUser as ClientUser
+else:
+    ClientUser = HttpUser
+
+# --- Concurrency Tracker (time-weighted; sampled into the run's `_concurrency.csv` timeline) ---
+concurrency_tracker = ConcurrencyTracker()
+sampler = None
+# --- Harness Self-Monitoring (CPU, greenlet lag, parse/write cost) and opt-in profiler (HARNESS_PROFILE=1) ---
+monitor = None
+profiler = None
+
+# --- Distributed Mode (master + local workers started by launcher.py) ---
+worker_index = os.environ.get("WORKER_INDEX")
+is_master = os.environ.get("LOCUST_WORKERS") is not None and worker_index is None
+CONCURRENCY_REPORT_INTERVAL = 0.25
+cluster_concurrency = {"total": 0, "reported": 0}  # worker: last cluster total and own count it included
+worker_concurrency = {}  # master: latest in-flight count per worker node
 
 # --- CSV Setup ---
 timestamp_prefix = os.environ.get("TEST_TIMESTAMP", time.strftime("%Y-%m-%d_%H-%M-%S"))
 os.makedirs("data", exist_ok=True)
-csv_file = f"data/{timestamp_prefix}_metrics.csv"
-csv_lock = Lock()
+if worker_index is None:
+    csv_file = f"data/{timestamp_prefix}_metrics.csv"
+    chunks_file = f"data/{timestamp_prefix}_chunks.bin"
+    config_file = f"data/{timestamp_prefix}_config.json"
+    sketches_file = f"data/{timestamp_prefix}_sketches.json"
+    concurrency_file = f"data/{timestamp_prefix}_concurrency.csv"
+    harness_file = f"data/{timestamp_prefix}_harness.csv"
+    profile_file = f"data/{timestamp_prefix}_profile.folded"
+else:
+    # Each worker writes its own shard; launcher.merge_shards combines them after the run
+    csv_file = shard_metrics_path(timestamp_prefix, worker_index)
+    chunks_file = shard_chunks_path(timestamp_prefix, worker_index)
+    config_file = shard_config_path(timestamp_prefix, worker_index)
+    sketches_file = shard_sketches_path(timestamp_prefix, worker_index)
+    concurrency_file = shard_concurrency_path(timestamp_prefix, worker_index)
+    harness_file = shard_harness_path(timestamp_prefix, worker_index)
+    profile_file = shard_profile_path(timestamp_prefix, worker_index)
+
+# Prefers the server's usage block, then a local tokenizer (TOKENIZER env var)
+token_counter = TokenCounter()
+# Rows and per-chunk arrival offsets are queued and written in batches by background writers
+recorder = None
+if not is_master:
+    recorder = RunRecorder(csv_file, chunks_file, config_file, token_counter, sketches_file, **writer_options_from_env())
+    if LOAD_MODE == "open":
+        recorder.config_sources["dispatch"] = dispatch_stats.as_dict
+
+# Fixed prompt, or streaming JSONL replay when DATASET_PATH is set; payloads are pre-serialized
+workload = None
+# Endpoint/model pairs sharing this run (TARGETS env var); a single unnamed target otherwise
+targets = None
+if not is_master:
+    workload = workload_from_env(token_counter, seed_offset=int(worker_index or 0))
+    targets = targets_from_env()
+    recorder.config_sources["workload"] = workload.describe
+    recorder.config_sources["targets"] = targets.describe
+    recorder.config_sources["http_client"] = client_options.describe
+# Capacity search state lives where the shape runs (master or standalone); workers forward samples
+capacity_search = CapacitySearch.from_env() if LOAD_MODE == "capacity" and worker_index is None else None
+capacity_samples = []
+capacity_file = f"data/{timestamp_prefix}_capacity.json"
+
+# Worker index in the high bits keeps request ids unique across merged shards
+request_ids = itertools.count(int(worker_index or 0) << 40)
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+    global sampler, monitor, profiler
+    if not is_master:
+        sampler = ConcurrencySampler(concurrency_tracker, concurrency_file, lambda: environment.runner.user_count,
+                                     sample_interval_from_env())
+        monitor = HarnessMonitor(harness_file, worker_index or "main", harness_interval_from_env(),
+                                 recorder.write_seconds, lambda: concurrency_tracker.in_flight)
+        recorder.config_sources["client_health"] = monitor.summary
+        profiler = profiler_from_env(profile_file, ["chat_completion_request"])
+    if isinstance(environment.runner, MasterRunner):
+        environment.runner.register_message("worker_concurrency", on_worker_concurrency)
+        environment.runner.register_message("capacity_samples", on_capacity_samples)
+    elif isinstance(environment.runner, WorkerRunner):
+        environment.runner.register_message("cluster_concurrency", on_cluster_concurrency)
+        gevent.spawn(report_concurrency, environment)
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    if capacity_search is not None:
+        update_run_config(config_file, {"capacity": {k: v for k, v in capacity_search.save(capacity_file).items() if k != "curve"}})
+    if is_master:
+        return
+    recorder.flush()
 
-if not os.path.exists("data"):
-    os.makedirs("data")
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    if is_master:
+        return
+    if sampler is not None:
+        sampler.close()
+    if monitor is not None:
+        monitor.close()
+    if profiler is not None:
+        profiler.close()
+    recorder.close()
 
-if not os.path.exists(csv_file):
-    with open(csv_file, mode="w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["timestamp", "ttft", "total_latency", "tokens_per_request", "tps", "tpot", "concurrent_requests", "status"])
+# --- Cross-Process Concurrency ---
+def report_concurrency(environment):
+    """Worker loop: send this process's in-flight count to the master."""
+    while True:
+        local = concurrency_tracker.in_flight
+        environment.runner.send_message("worker_concurrency", local)
+        cluster_concurrency["reported"] = local
+        if capacity_samples:
+            environment.runner.send_message("capacity_samples", capacity_samples[:])
+            del capacity_samples[:]
+        gevent.sleep(CONCURRENCY_REPORT_INTERVAL)
+
+def on_worker_concurrency(environment, msg, **kwargs):
+    """Master: sum the latest per-worker counts and broadcast the cluster total."""
+    worker_concurrency[msg.node_id] = msg.data
+    environment.runner.send_message("cluster_concurrency", sum(worker_concurrency.values()))
+
+def on_cluster_concurrency(environment, msg, **kwargs):
+    cluster_concurrency["total"] = msg.data
+
+def on_capacity_samples(environment, msg, **kwargs):
+    """Master: feed worker samples into the capacity search."""
+    for sample in msg.data:
+        capacity_search.record(*sample)
+
+def other_processes_concurrency():
+    """In-flight requests on the other workers, from the last cluster total the master sent."""
+    if worker_index is None:
+        return 0
+    return max(cluster_concurrency["total"] - cluster_concurrency["reported"], 0)
+
+def global_concurrency(local):
+    """In-flight requests across all processes, given this process's current count."""
+    return local + other_processes_concurrency()
 
 # --- Helper to Log Metrics ---
-def log_metrics(timestamp, ttft, total_latency, tokens, concurrent, status):
-    tps = tokens / total_latency if total_latency > 0 else 0
-    tpot = total_latency / tokens if tokens > 0 else 0
-    with csv_lock:
-        with open(csv_file, mode="a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([timestamp, f"{ttft:.4f}" if ttft else "N/A", f"{total_latency:.4f}", tokens, 
-            f"{tps:.4f}", f"{tpot:.4f}", concurrent, status
-            ])
-
-# --- Locust User Class ---
-class ChatCompletionsUser(HttpUser):
-    wait_time = between(1, 3)
+def log_metrics(timestamp, ttft, total_latency, tokens, concurrent, status, request_id, chunk_offsets=None, input_tokens=None,
+                avg_concurrency=None, timing=None, prefix=None, target=None):
+    recorder.log(timestamp, ttft, total_latency, tokens, concurrent, status, request_id, chunk_offsets, input_tokens, avg_concurrency,
+                 timing, prefix, target)
+    if LOAD_MODE == "capacity":
+        sample = (ttft, total_latency / tokens if tokens else None, total_latency, tokens, status == "success")
+        if capacity_search is not None:
+            capacity_search.record(*sample)
+        else:
+            capacity_samples.append(sample)
 
-    def on_start(self):
-        self.headers = {"Content-Type": "application/json"}
-        # Pre-encode the payload for faster reuse
-        payload = {
-            "model": "meta/llama-3.1-70b-instruct",
-            "messages": [{"role": "user", "content": "Explain General Relativity in simple terms?"}],
-            "stream": True
-        }
-        self.encoded_payload = json.dumps(payload)
+# --- Streaming Request (shared by closed- and open-loop users) ---
+def chat_completion_request(client, headers):
+    # Track concurrency: the snapshot at start, plus the time-weighted average while the request runs
+    local, token = concurrency_tracker.start()
+    others_at_start = other_processes_concurrency()
+    current_concurrency = local + others_at_start
+    streamed = False
 
-    @task
-    def chat_completions(self):
-        global concurrent_requests
+    request_id = next(request_ids)
+    item = workload.next()
+    target = targets.next()
 
-        # Track concurrency
-        with concurrent_lock:
-            concurrent_requests += 1
-            current_concurrency = concurrent_requests
+    try:
+        # Timed from before post(): with stream=True it returns once headers arrive, so
+        # TTFT and latency include connection setup and time-to-headers
+        reset_connection_timing()
+        start_time = time.perf_counter()
+        response = client.post(
+            target.endpoint,
+            data=target.payload(item.payload),
+            headers=headers,
+            stream=True,
+            name=target.name  # locust stats per target; None keeps the path
+        )
+        connect_time, tls_time = take_connection_timing()
+        timing = {"time_to_headers": time.perf_counter() - start_time, "connect_time": connect_time, "tls_time": tls_time,
+                  "connect_timed": connect_timed}
+        stream = StreamStats(start_time)
 
-        ttft = None
-        tokens = 0
+        if response.status_code != 200:
+            print(f"Request failed: {response.status_code} - {response.text}")
+            avg_concurrency, token = finish_concurrency(token, others_at_start, streamed), None
+            log_metrics(time.strftime("%Y-%m-%d %H:%M:%S"), None, 0, 0, current_concurrency, "fail", request_id,
+                        input_tokens=item.input_tokens, avg_concurrency=avg_concurrency, timing=timing, prefix=item.prefix,
+                        target=target.name)
+            return
+        concurrency_tracker.streaming()
+        streamed = True
 
         try:
-            response = self.client.post(
-                "/v1/chat/completions",
-                data=self.encoded_payload,
-                headers=self.headers,
-                stream=True
-            )
-            start_time = time.perf_counter()
-            
-            if response.status_code != 200:
-                print(f"Request failed: {response.status_code} - {response.text}")
-                log_metrics(time.strftime("%Y-%m-%d %H:%M:%S"), None, 0, 0, current_concurrency, "fail")
-                return
-            
-            for line in response.iter_lines():
-                if not line:
-                    continue
-
-                decoded_line = line.decode("utf-8").strip()
-                if not decoded_line.startswith("data: "):
-                    continue
-
-                data_str = decoded_line[6:].strip()
-                if data_str == "[DONE]":
-                    break
-
+            for line, start in iter_data(iter_response_lines(response)):
                 try:
-                    chunk = json.loads(data_str)
-                    content = chunk.get("choices", [{}])[0].get("delta", {}).get("content", "")
+                    stream.feed(line, start)
+                except ValueError:
+                    print("Warning: JSON decode failed.")
+        except STREAM_ERRORS as e:
+            # Mid-stream failure (reset connection, truncated body): a fail row, as the asyncio engine records
+            print(f"Request failed: {e!r}")
+            avg_concurrency, token = finish_concurrency(token, others_at_start, streamed), None
+            log_metrics(time.strftime("%Y-%m-%d %H:%M:%S"), None, 0, 0, current_concurrency, "fail", request_id,
+                        input_tokens=item.input_tokens, avg_concurrency=avg_concurrency, timing=timing, prefix=item.prefix,
+                        target=target.name)
+            return
 
-                    if content:
-                        if ttft is None:
-                            ttft = time.perf_counter() - start_time
-                            print(f"Time to First Token: {ttft:.3f} sec")
+        total_latency = time.perf_counter() - start_time
+        monitor.add_parse_time(stream.parse_seconds)
+        tokens, _ = token_counter.count(stream.text(), stream.usage)
+        input_tokens = (stream.usage or {}).get("prompt_tokens") or item.input_tokens
 
-                        tokens += len(content.split())
-                        #print(content, end="", flush=True)
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        avg_concurrency, token = finish_concurrency(token, others_at_start, streamed), None
+        log_metrics(timestamp, stream.ttft, total_latency, tokens, current_concurrency, "success", request_id, stream.chunk_offsets,
+                    input_tokens, avg_concurrency, timing, item.prefix, target.name)
 
-                except json.JSONDecodeError:
-                    print("Warning: JSON decode failed.")
+    finally:
+        if token is not None:
+            concurrency_tracker.finish(token, streamed)
+
+def finish_concurrency(token, others_at_start, streamed):
+    """Stop tracking a request; returns the average cluster-wide in-flight count it saw.
+
+    The local part is exact; other workers are approximated by the mean of
+    their counts at the request's start and end.
+    """
+    local_avg = concurrency_tracker.finish(token, streamed)
+    return local_avg + (others_at_start + other_processes_concurrency()) / 2
+
+# --- Locust User Classes ---
+class ChatUser(ClientUser):
+    """Client backend settings shared by the closed- and open-loop users."""
+    abstract = True
+    # FastHttpUser: connections pooled per user and connect timeout; ignored by HttpUser
+    concurrency = client_options.pool_size
+    connection_timeout = client_options.connect_timeout
+
+    def on_start(self):
+        self.headers = client_options.headers(REQUEST_HEADERS)
+        if client_options.backend == "requests":
+            configure_session(self.client, client_options, hosts=len(targets.targets))
 
-            total_latency = time.perf_counter() - start_time
-            print(f"\nTotal Latency: {total_latency:.3f} sec")
+class ChatCompletionsUser(ChatUser):
+    # Closed loop: each user waits for its response before sending the next request
+    abstract = LOAD_MODE == "open"
+    wait_time = between(1, 3)
+
+    @task
+    def chat_completions(self):
+        chat_completion_request(self.client, self.headers)
+
+# --- Open-Loop Dispatcher ---
+class OpenLoopUser(ChatUser):
+    """Sends requests on an arrival schedule (ARRIVAL_* env vars) regardless of response times.
+
+    Run with one user per process; each dispatcher takes an equal share of the
+    target rate. Arrivals that find `max_in_flight` requests already running
+    are dropped, and dispatches that fire late are counted, so the run shows
+    when the client could not keep up.
+    """
+    abstract = LOAD_MODE != "open"
+    wait_time = constant(0)
+
+    @task
+    def dispatch(self):
+        schedule = ArrivalSchedule.from_env(share=int(os.environ.get("LOCUST_WORKERS") or 1))
+        pool = Pool(schedule.max_in_flight)
+        start = time.perf_counter()
+        next_at = start
+        while True:
+            next_at += schedule.next_interval(next_at - start)
+            # sleep(0) still yields to in-flight streams when the dispatcher is behind schedule
+            gevent.sleep(max(next_at - time.perf_counter(), 0))
+            lag = time.perf_counter() - next_at
+            dropped = pool.full()
+            dispatch_stats.record(lag, dropped)
+            if not dropped:
+                pool.spawn(chat_completion_request, self.client, self.headers)
 
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-            log_metrics(timestamp, ttft, total_latency, tokens, current_concurrency, "success")
+# --- Capacity Search Shape ---
+if LOAD_MODE == "capacity":
+    class CapacityShape(LoadTestShape):
+        """Steps or bisects the user count until the SLOs break (see capacity.CapacitySearch)."""
 
-        finally:
-            with concurrent_lock:
-                concurrent_requests -= 1
+        def tick(self):
+            users = capacity_search.tick()
+            if users is None:
+                return None
+            return users, capacity_search.spawn_rate
@@ -0,0 +1,297 @@
+import csv
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+
+from sketches import WindowedSketches, DEFAULT_WINDOW_SECONDS
+from workload import length_bin
+
+# --- Metrics CSV Schema (read by streamlit_app.py) ---
+METRICS_HEADER = [
+    "timestamp", "ttft", "total_latency", "tokens_per_request", "tps", "tpot", "concurrent_requests", "status",
+    "request_id", "itl_p50", "itl_p90", "itl_p99", "max_stall",
+    "input_tokens", "input_bin", "output_bin", "avg_concurrency",
+    "time_to_headers", "connect_time", "tls_time", "reused_connection",
+    "prefix_hit", "reuse_distance", "target",
+]
+
+# --- Chunk Times Sidecar Record: request_id, chunk count, then float32 offsets (s) ---
+CHUNK_RECORD_HEADER = struct.Struct("<QI")
+
+
+# --- Batched Background Writer ---
+class BatchWriter(ABC):
+    """Queues records in memory and appends them to a file in batches.
+
+    A background thread (a greenlet once Locust has monkey-patched threading)
+    flushes whenever `batch_size` rows are waiting or `flush_interval` seconds
+    have passed. Rows only leave the queue inside `flush()`, under the file
+    lock, so every flush (the thread's, an explicit one, or the caller's when
+    the queue is full) writes all rows queued so far in queue order. The
+    queue is bounded by `max_queue` rows; when it is full the caller flushes
+    inline instead of growing memory, so no rows are dropped while the writer
+    is open. Rows written after `close()` are counted in `dropped`.
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0, max_queue=50000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._closed = False
+        self.dropped = 0  # rows written after close
+        self.write_seconds = 0.0  # time spent encoding and writing batches
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = self._open()
+
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    @abstractmethod
+    def _open(self):
+        """Open `self.path` for appending and return the file object."""
+
+    @abstractmethod
+    def _encode(self, rows):
+        """Write a batch of rows to the open file."""
+
+    def write(self, row):
+        if self._closed:
+            if not self.dropped:
+                print(f"Warning: {self.path} is closed; dropping rows logged after shutdown", file=sys.stderr)
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # Back-pressure: drain the queue on the caller instead of buffering more
+            self.flush()
+            self._queue.put_nowait(row)
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def _drain(self, limit=None):
+        rows = []
+        while limit is None or len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write_rows(self, rows):
+        # Caller holds _file_lock
+        if not rows or self._file.closed:
+            return
+        started = time.perf_counter()
+        self._encode(rows)
+        self._file.flush()
+        self.write_seconds += time.perf_counter() - started
+
+    def flush(self):
+        """Write every row queued so far, in queue order."""
+        with self._file_lock:
+            while True:
+                rows = self._drain(self.batch_size)
+                if not rows:
+                    break
+                self._write_rows(rows)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        with self._file_lock:
+            self._file.close()
+
+
+# --- Metrics CSV Writer ---
+class MetricsWriter(BatchWriter):
+    """Appends metric rows to the run's `_metrics.csv`, writing the header for new files."""
+
+    def __init__(self, path, header, **kwargs):
+        self.header = header
+        super().__init__(path, **kwargs)
+
+    def _open(self):
+        new_file = not os.path.exists(self.path)
+        f = open(self.path, mode="a", newline="")
+        self._writer = csv.writer(f)
+        if new_file:
+            self._writer.writerow(self.header)
+        return f
+
+    def _encode(self, rows):
+        self._writer.writerows(rows)
+
+
+# --- Chunk Arrival Times Writer ---
+class ChunkTimesWriter(BatchWriter):
+    """Appends packed per-request chunk arrival offsets to the run's `_chunks.bin` sidecar.
+
+    Each record is `(request_id, offsets)` where `offsets` is an `array("f")`
+    of seconds since the request's `start_time`.
+    """
+
+    def _open(self):
+        return open(self.path, mode="ab")
+
+    def _encode(self, rows):
+        for request_id, offsets in rows:
+            self._file.write(CHUNK_RECORD_HEADER.pack(request_id, len(offsets)))
+            self._file.write(offsets.tobytes())
+
+
+def read_chunk_times(path):
+    """Yield `(request_id, array("f") offsets)` records from a `_chunks.bin` sidecar."""
+    with open(path, mode="rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + CHUNK_RECORD_HEADER.size <= len(data):
+        request_id, count = CHUNK_RECORD_HEADER.unpack_from(data, pos)
+        pos += CHUNK_RECORD_HEADER.size
+        offsets = array("f")
+        offsets.frombytes(data[pos:pos + count * 4])
+        pos += count * 4
+        yield request_id, offsets
+
+
+# --- Inter-Token Latency Summary ---
+def _percentile(sorted_values, q):
+    idx = (len(sorted_values) - 1) * q
+    lo = int(idx)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (idx - lo)
+
+
+def summarize_itl(chunk_offsets):
+    """Return (p50, p90, p99, max_stall) of the gaps between chunk arrivals, or None."""
+    if chunk_offsets is None or len(chunk_offsets) < 2:
+        return None
+    gaps = sorted(b - a for a, b in zip(chunk_offsets, chunk_offsets[1:]))
+    return _percentile(gaps, 0.5), _percentile(gaps, 0.9), _percentile(gaps, 0.99), gaps[-1]
+
+
+# --- Connection Timing Columns ---
+def connection_columns(timing):
+    """Timing columns plus `reused_connection`, which is only inferred when the connect hook ran for the request."""
+    timing = timing or {}
+    cols = [f"{timing[k]:.4f}" if timing.get(k) is not None else "N/A" for k in ("time_to_headers", "connect_time", "tls_time")]
+    if timing.get("time_to_headers") is None or not timing.get("connect_timed"):
+        return cols + ["N/A"]
+    return cols + [0 if timing.get("connect_time") is not None else 1]
+
+
+# --- Run Recorder (shared by the Locust and asyncio engines) ---
+def writer_options_from_env():
+    return {
+        "batch_size": int(os.environ.get("METRICS_BATCH_SIZE", 500)),
+        "flush_interval": float(os.environ.get("METRICS_FLUSH_INTERVAL", 1.0)),
+        "max_queue": int(os.environ.get("METRICS_MAX_QUEUE", 50000)),
+    }
+
+
+class RunRecorder:
+    """Writes one run's artifacts: metrics rows, the chunk times sidecar and the config JSON summary."""
+
+    def __init__(self, csv_file, chunks_file, config_file, token_counter, sketches_file=None, **writer_options):
+        self.config_file = config_file
+        self.token_counter = token_counter
+        # Bounded-memory windowed percentiles, saved alongside the raw rows on every flush
+        self.sketches_file = sketches_file
+        self.sketches = WindowedSketches(float(os.environ.get("SKETCH_WINDOW_SECONDS", DEFAULT_WINDOW_SECONDS)))
+        # Config JSON sections refreshed on every flush; engines can register more
+        self.config_sources = {"token_counting": token_counter.summary, "metrics_writer": self.writer_summary}
+        self.metrics_writer = MetricsWriter(csv_file, METRICS_HEADER, **writer_options)
+        self.chunk_times_writer = ChunkTimesWriter(chunks_file, **writer_options)
+        self.log_seconds = 0.0  # time spent formatting rows on the request path
+
+    def log(self, timestamp, ttft, total_latency, tokens, concurrent, status, request_id, chunk_offsets=None, input_tokens=None,
+            avg_concurrency=None, timing=None, prefix=None, target=None):
+        """Queue one request's row; `concurrent` is the in-flight count at its start, `avg_concurrency` the time-weighted mean while it ran.
+
+        `timing` holds `time_to_headers`, `connect_time` and `tls_time` in seconds, and
+        `connect_timed` when the engine's connect hook is active; only then does a
+        request that got headers without a connect time count as a reused connection.
+        `prefix` is the work item's `(hit, reuse_distance)` tag from a prefix-cache workload.
+        `target` names the endpoint/model the request went to in multi-target runs.
+        """
+        started = time.perf_counter()
+        tps = tokens / total_latency if total_latency > 0 else 0
+        tpot = total_latency / tokens if tokens > 0 else 0
+        itl = summarize_itl(chunk_offsets)
+        itl_cols = [f"{v:.4f}" for v in itl] if itl else ["N/A"] * 4
+        self.metrics_writer.write([timestamp, f"{ttft:.4f}" if ttft else "N/A", f"{total_latency:.4f}", tokens,
+            f"{tps:.4f}", f"{tpot:.4f}", concurrent, status, request_id, *itl_cols,
+            input_tokens if input_tokens is not None else "N/A", length_bin(input_tokens),
+            length_bin(tokens) if status == "success" else "N/A",
+            f"{avg_concurrency:.2f}" if avg_concurrency is not None else "N/A",
+            *connection_columns(timing),
+            *(("N/A", "N/A") if prefix is None else (int(prefix[0]), prefix[1] if prefix[1] is not None else "N/A")),
+            target or "N/A",
+        ])
+        if chunk_offsets:
+            self.chunk_times_writer.write((request_id, chunk_offsets))
+        if status == "success":
+            self.sketches.add_many({
+                "ttft": ttft,
+                "tpot": tpot if tokens > 0 else None,
+                "total_latency": total_latency,
+                "itl": [b - a for a, b in zip(chunk_offsets, chunk_offsets[1:])] if chunk_offsets else (),
+            })
+        self.log_seconds += time.perf_counter() - started
+
+    def write_seconds(self):
+        """Total client time spent recording metrics: row formatting plus batch writes."""
+        return self.log_seconds + self.metrics_writer.write_seconds + self.chunk_times_writer.write_seconds
+
+    def writer_summary(self):
+        return {"dropped_rows": self.metrics_writer.dropped, "dropped_chunk_records": self.chunk_times_writer.dropped}
+
+    def config_updates(self):
+        return {name: source() for name, source in self.config_sources.items()}
+
+    def flush(self):
+        self.metrics_writer.flush()
+        self.chunk_times_writer.flush()
+        if self.sketches_file:
+            self.sketches.save(self.sketches_file)
+        update_run_config(self.config_file, self.config_updates())
+
+    def close(self):
+        self.metrics_writer.close()
+        self.chunk_times_writer.close()
+        # Rows logged by requests that finished during shutdown are lost; record how many so far
+        update_run_config(self.config_file, {"metrics_writer": self.writer_summary()})
+
+
+# --- Run Config Updates ---
+def update_run_config(path, updates):
+    """Merge `updates` into the run's `_config.json`, creating it if missing."""
+    config = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            config = json.load(f)
+    config.update(updates)
+    with open(path, "w") as f:
+        json.dump(config, f, indent=4)
@@ -0,0 +1,244 @@
+"""Local OpenAI-compatible streaming server with programmable latencies.
+
+Serves `/v1/chat/completions` as SSE with known TTFT, inter-token delay and
+output length, so the harness can be benchmarked without a GPU endpoint:
+comparing what the harness measured against what the server actually
+emitted (`GET /mock/stats`, or the `--summary` JSON written on shutdown)
+gives the harness's own measurement error and its maximum throughput.
+
+    python mock_server.py --port 8000 --ttft exp:0.2 --itl 0.02 --tokens uniform:50,300 --error-rate 0.01 --slowdown 0.005
+
+Delay and length specs are `<value>` or `const:<v>`, `uniform:<lo>,<hi>`,
+`normal:<mean>,<sd>`, `exp:<mean>` and `lognormal:<median>,<sigma>`.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+from aiohttp import web
+
+from sketches import QuantileSketch, SKETCH_QUANTILES, quantile_label
+from workload import CHAT_COMPLETIONS_PATH
+
+DEFAULT_PORT = 8000
+MOCK_TOKEN = "tok "
+
+
+# --- Programmable Distributions ---
+class Distribution:
+    """A non-negative random value parsed from a `kind:params` spec."""
+
+    KINDS = {
+        "const": lambda rng, v: v,
+        "uniform": lambda rng, lo, hi: rng.uniform(lo, hi),
+        "normal": lambda rng, mean, sd: rng.gauss(mean, sd),
+        "exp": lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0,
+        "lognormal": lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0,
+    }
+
+    def __init__(self, spec):
+        self.spec = str(spec)
+        kind, _, params = self.spec.partition(":") if ":" in self.spec else ("const", "", self.spec)
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown distribution: {kind} (expected one of {', '.join(self.KINDS)})")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",")]
+
+    def sample(self, rng):
+        return max(self.KINDS[self.kind](rng, *self.params), 0.0)
+
+    def __repr__(self):
+        return self.spec
+
+
+# --- Server Behaviour ---
+class MockOptions:
+    """Latency, length, error and slowdown settings for the mock server.
+
+    Under load, every delay is multiplied by `1 + slowdown * max(in_flight - knee, 0)`,
+    a linear stand-in for a server whose batches slow down as they grow.
+    """
+
+    def __init__(self, ttft="0.2", itl="0.02", tokens="200", error_rate=0.0, error_status=500, abort_rate=0.0,
+                 slowdown=0.0, knee=0, seed=None, model="mock-model"):
+        self.ttft = Distribution(ttft)
+        self.itl = Distribution(itl)
+        self.tokens = Distribution(tokens)
+        self.error_rate = float(error_rate)
+        self.error_status = int(error_status)
+        self.abort_rate = float(abort_rate)
+        self.slowdown = float(slowdown)
+        self.knee = int(knee)
+        self.seed = seed
+        self.model = model
+
+    def describe(self):
+        return {
+            "ttft": self.ttft.spec,
+            "itl": self.itl.spec,
+            "tokens": self.tokens.spec,
+            "error_rate": self.error_rate,
+            "error_status": self.error_status,
+            "abort_rate": self.abort_rate,
+            "slowdown": self.slowdown,
+            "knee": self.knee,
+            "seed": self.seed,
+        }
+
+
+class MockServer:
+    """Streams chat completions on the configured schedule and records what it actually emitted."""
+
+    def __init__(self, options):
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.aborted = 0
+        self.tokens = 0
+        self.started = time.monotonic()
+        # Server-side ground truth: delays as emitted (after slowdown and sleep overshoot)
+        self.truth = {"ttft": QuantileSketch(), "itl": QuantileSketch(), "total_latency": QuantileSketch()}
+
+    def slowdown_factor(self):
+        return 1 + self.options.slowdown * max(self.in_flight - self.options.knee, 0)
+
+    async def chat_completions(self, request):
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self._stream(request, time.perf_counter())
+        finally:
+            self.in_flight -= 1
+
+    async def _stream(self, request, started):
+        options, rng = self.options, self.rng
+        try:
+            body = json.loads(await request.read() or b"{}")
+        except ValueError:
+            return web.json_response({"error": {"message": "invalid JSON body"}}, status=400)
+        if rng.random() < options.error_rate:
+            self.errors += 1
+            return web.json_response({"error": {"message": "injected error", "type": "mock"}}, status=options.error_status)
+
+        n_tokens = max(int(round(options.tokens.sample(rng))), 1)
+        if body.get("max_tokens"):
+            n_tokens = min(n_tokens, int(body["max_tokens"]))
+        abort_at = rng.randrange(n_tokens) if rng.random() < options.abort_rate else None
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages") or [])
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        chunk_id = f"chatcmpl-mock-{self.requests}"
+        created = int(time.time())
+        # Every token chunk is identical, so it is encoded once per request
+        token_chunk = _sse({"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": options.model,
+                            "choices": [{"index": 0, "delta": {"content": MOCK_TOKEN}, "finish_reason": None}]})
+
+        await asyncio.sleep(options.ttft.sample(rng) * self.slowdown_factor())
+        last = time.perf_counter()
+        self.truth["ttft"].add(last - started)
+        for i in range(n_tokens):
+            if i:
+                await asyncio.sleep(options.itl.sample(rng) * self.slowdown_factor())
+                now = time.perf_counter()
+                self.truth["itl"].add(now - last)
+                last = now
+            if i == abort_at:
+                # Mid-stream failure: drop the connection without a final chunk
+                self.aborted += 1
+                request.transport.close()
+                return response
+            await response.write(token_chunk)
+            self.tokens += 1
+
+        await response.write(_sse({"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": options.model,
+                                   "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await response.write(_sse({"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": options.model,
+                                       "choices": [], "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": n_tokens,
+                                                                "total_tokens": prompt_tokens + n_tokens}}))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        self.truth["total_latency"].add(time.perf_counter() - started)
+        return response
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        stats = {
+            "options": self.options.describe(),
+            "requests": self.requests,
+            "errors": self.errors,
+            "aborted": self.aborted,
+            "tokens": self.tokens,
+            "peak_in_flight": self.peak_in_flight,
+            "elapsed_sec": round(elapsed, 3),
+            "tokens_per_sec": round(self.tokens / elapsed, 2),
+        }
+        for metric, sketch in self.truth.items():
+            for q in SKETCH_QUANTILES:
+                value = sketch.quantile(q)
+                stats[f"{metric}_{quantile_label(q)}"] = round(value, 6) if value is not None else None
+        return stats
+
+    async def stats(self, request):
+        return web.json_response(self.summary())
+
+    async def models(self, request):
+        return web.json_response({"object": "list", "data": [{"id": self.options.model, "object": "model", "owned_by": "mock"}]})
+
+    def app(self, summary_path=None):
+        app = web.Application()
+        app.router.add_post(CHAT_COMPLETIONS_PATH, self.chat_completions)
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_get("/mock/stats", self.stats)
+        if summary_path:
+            async def write_summary(app):
+                with open(summary_path, "w") as f:
+                    json.dump(self.summary(), f, indent=4)
+            app.on_shutdown.append(write_summary)
+        return app
+
+
+def _sse(chunk):
+    return b"data: " + json.dumps(chunk, separators=(",", ":")).encode("utf-8") + b"\n\n"
+
+
+def mock_args(port=DEFAULT_PORT, ttft="0.2", itl="0.02", tokens="200", error_rate=0.0, error_status=500, abort_rate=0.0,
+              slowdown=0.0, knee=0, seed=None, summary=None):
+    """Command-line arguments for a mock server subprocess."""
+    args = ["--port", str(port), "--ttft", str(ttft), "--itl", str(itl), "--tokens", str(tokens),
+            "--error-rate", str(error_rate), "--error-status", str(error_status), "--abort-rate", str(abort_rate),
+            "--slowdown", str(slowdown), "--knee", str(knee)]
+    if seed is not None:
+        args += ["--seed", str(seed)]
+    if summary:
+        args += ["--summary", summary]
+    return args
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible streaming chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--ttft", default="0.2", help="time to first token spec (sec)")
+    parser.add_argument("--itl", default="0.02", help="inter-token delay spec (sec)")
+    parser.add_argument("--tokens", default="200", help="output length spec (tokens; capped by max_tokens)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--abort-rate", type=float, default=0.0, help="share of streams cut off mid-response")
+    parser.add_argument("--slowdown", type=float, default=0.0, help="extra delay factor per in-flight request above --knee")
+    parser.add_argument("--knee", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--summary", help="write ground-truth stats to this JSON file on shutdown")
+    args = parser.parse_args()
+
+    server = MockServer(MockOptions(args.ttft, args.itl, args.tokens, args.error_rate, args.error_status, args.abort_rate,
+                                    args.slowdown, args.knee, args.seed))
+    web.run_app(server.app(args.summary), host=args.host, port=args.port, access_log=None)
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+
+import pandas as pd
+
+from analytics import run_summary
+from steady_state import resolve_window, trim_to_window
+
+INDEX_FILE = ".run_index.json"
+INDEX_VERSION = 3
+
+
+# --- Run Loading ---
+def load_metrics(path):
+    """Read a run's metrics CSV with parsed timestamps."""
+    df = pd.read_csv(path)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def config_path_for(metrics_path):
+    return metrics_path.replace("_metrics.csv", "_config.json")
+
+
+def load_config(metrics_path):
+    try:
+        with open(config_path_for(metrics_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def test_label(metrics_path, config):
+    """Short label used for a run in comparison charts."""
+    try:
+        return f"{config['users']}u_{config['spawn_rate']}u/s_{config['run_time']}"
+    except (KeyError, TypeError):
+        return os.path.basename(metrics_path).replace("_metrics.csv", "")
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+# --- Persistent Incremental Index ---
+class RunIndex:
+    """Persistent per-run summaries keyed by metrics path, mtime and size.
+
+    `refresh` stats every file but only re-reads runs whose metrics or config
+    file changed since they were last summarized, then saves the index if
+    anything was recomputed. Summaries cover each run's steady-state window
+    (stored in its config, else detected), so saving a new window
+    re-summarizes the run.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, INDEX_FILE)
+        self._lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+            if stored.get("version") == INDEX_VERSION:
+                self.entries = stored.get("runs", {})
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": INDEX_VERSION, "runs": self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, metric_files):
+        """Return `{file: entry}` for `metric_files`, recomputing only new or changed runs."""
+        with self._lock:
+            changed = False
+            result = {}
+            for file in metric_files:
+                metrics_path = os.path.join(self.data_dir, file)
+                signature = [file_signature(metrics_path), file_signature(config_path_for(metrics_path))]
+                entry = self.entries.get(file)
+                if entry is None or entry.get("signature") != signature:
+                    config = load_config(metrics_path)
+                    df = load_metrics(metrics_path)
+                    window = resolve_window(df, config)
+                    entry = {
+                        "signature": signature,
+                        "test": test_label(metrics_path, config),
+                        "window": window,
+                        "summary": run_summary(trim_to_window(df, window)),
+                    }
+                    self.entries[file] = entry
+                    changed = True
+                result[file] = entry
+            if changed:
+                self._save()
+            return result
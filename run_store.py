@@ -0,0 +1,199 @@
+import glob
+import json
+import os
+import re
+from urllib.parse import urlsplit
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+STORE_DIR = os.path.join("data", "store")
+
+# --- Typed Metrics Schema ("N/A" and empty CSV cells become nulls) ---
+METRICS_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("s")),
+    ("ttft", pa.float64()),
+    ("total_latency", pa.float64()),
+    ("tokens_per_request", pa.int64()),
+    ("tps", pa.float64()),
+    ("tpot", pa.float64()),
+    ("concurrent_requests", pa.int64()),
+    ("status", pa.string()),
+    ("request_id", pa.int64()),
+    ("itl_p50", pa.float64()),
+    ("itl_p90", pa.float64()),
+    ("itl_p99", pa.float64()),
+    ("max_stall", pa.float64()),
+    ("input_tokens", pa.int64()),
+    ("input_bin", pa.string()),
+    ("output_bin", pa.string()),
+    ("avg_concurrency", pa.float64()),
+    ("time_to_headers", pa.float64()),
+    ("connect_time", pa.float64()),
+    ("tls_time", pa.float64()),
+    ("reused_connection", pa.int8()),
+    ("prefix_hit", pa.int8()),
+    ("reuse_distance", pa.int64()),
+    ("target", pa.string()),
+])
+RUN_FIELDS = [("run_id", pa.string()), ("model", pa.string())]
+WINDOW_FIELD = pa.field("steady_state", pa.int8())  # 1 inside the run's steady-state window; null in older files
+PARTITION_SCHEMA = pa.schema([("date", pa.string()), ("endpoint", pa.string())])
+STORE_SCHEMA = pa.schema(list(METRICS_SCHEMA) + RUN_FIELDS + [WINDOW_FIELD] + list(PARTITION_SCHEMA))
+
+NULL_VALUES = ["N/A", ""]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# --- Partition Keys ---
+def endpoint_slug(url):
+    """Filesystem-safe partition value for a target URL (host plus path)."""
+    parts = urlsplit(url or "")
+    slug = re.sub(r"[^A-Za-z0-9.-]+", "_", f"{parts.netloc}{parts.path}").strip("_")
+    return slug or "unknown"
+
+
+def run_model(config):
+    return ((config or {}).get("workload") or {}).get("model")
+
+
+def run_store_path(run_id, config, store_dir=STORE_DIR):
+    """`<store>/date=YYYY-MM-DD/endpoint=<slug>/<run_id>.parquet`"""
+    return os.path.join(
+        store_dir,
+        f"date={run_id[:10]}",
+        f"endpoint={endpoint_slug((config or {}).get('target_url'))}",
+        f"{run_id}.parquet",
+    )
+
+
+# --- Compaction (CSV + config JSON -> one Parquet file per run) ---
+def read_metrics_csv(path):
+    """Read a metrics CSV into an Arrow table typed by METRICS_SCHEMA.
+
+    Columns missing from older runs are added as nulls; columns this schema
+    does not know yet keep their inferred types.
+    """
+    with open(path, newline="") as f:
+        header = f.readline().strip().split(",")
+    known = {field.name: field.type for field in METRICS_SCHEMA}
+    table = pacsv.read_csv(
+        path,
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: known[name] for name in header if name in known},
+            null_values=NULL_VALUES,
+            strings_can_be_null=True,
+            timestamp_parsers=[TIMESTAMP_FORMAT],
+        ),
+    )
+    for field in METRICS_SCHEMA:
+        if field.name not in table.column_names:
+            table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+    return table
+
+
+def compact_run(metrics_path, config=None, store_dir=STORE_DIR):
+    """Write one run's metrics to the columnar store and return the Parquet path.
+
+    The run's config JSON is kept in the file's key-value metadata, so the
+    store is self-contained. Rows are flagged with the run's steady-state
+    window. Re-compacting a run overwrites its file.
+    """
+    run_id = os.path.basename(metrics_path).replace("_metrics.csv", "")
+    if config is None:
+        config_path = metrics_path.replace("_metrics.csv", "_config.json")
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                config = json.load(f)
+    table = read_metrics_csv(metrics_path)
+    for name, type_ in RUN_FIELDS:
+        value = run_id if name == "run_id" else run_model(config)
+        table = table.append_column(pa.field(name, type_), pa.array([value] * table.num_rows, type_))
+    table = table.append_column(WINDOW_FIELD, pa.array(steady_state_flags(table, config), WINDOW_FIELD.type))
+    table = table.replace_schema_metadata({"run_config": json.dumps(config or {})})
+
+    out_path = run_store_path(run_id, config, store_dir)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def steady_state_flags(table, config):
+    """Per-row 1/0 flags for the run's stored (or detected) steady-state window."""
+    from steady_state import resolve_window, window_mask
+
+    df = table.select(["timestamp", "ttft", "tokens_per_request", "status"]).to_pandas()
+    return window_mask(df, resolve_window(df, config)).astype("int8")
+
+
+def _run_mtime(metrics_path):
+    # A run changes when its metrics or its config (e.g. a re-saved steady-state window) is rewritten
+    config_path = metrics_path.replace("_metrics.csv", "_config.json")
+    return max(os.path.getmtime(metrics_path), os.path.getmtime(config_path) if os.path.exists(config_path) else 0)
+
+
+def compact_all(data_dir="data", store_dir=STORE_DIR):
+    """Compact every CSV run that is missing from the store or changed since; returns how many were written."""
+    stored = {
+        os.path.basename(p).replace(".parquet", ""): os.path.getmtime(p)
+        for p in glob.glob(os.path.join(store_dir, "date=*", "endpoint=*", "*.parquet"))
+    }
+    written = 0
+    for metrics_path in sorted(glob.glob(os.path.join(data_dir, "*_metrics.csv"))):
+        run_id = os.path.basename(metrics_path).replace("_metrics.csv", "")
+        if run_id in stored and stored[run_id] >= _run_mtime(metrics_path):
+            continue
+        compact_run(metrics_path, store_dir=store_dir)
+        written += 1
+    return written
+
+
+def store_signature(store_dir=STORE_DIR):
+    """(file count, newest mtime) of the store, for cache keys."""
+    paths = glob.glob(os.path.join(store_dir, "date=*", "endpoint=*", "*.parquet"))
+    return [len(paths), max((os.path.getmtime(p) for p in paths), default=0)]
+
+
+# --- History Queries (partition and column pushdown) ---
+def open_store(store_dir=STORE_DIR):
+    return ds.dataset(store_dir, format="parquet", schema=STORE_SCHEMA,
+                      partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"))
+
+
+def list_endpoints(store_dir=STORE_DIR):
+    """Endpoint partition values, read from directory names only."""
+    return sorted({
+        os.path.basename(p).split("=", 1)[1]
+        for p in glob.glob(os.path.join(store_dir, "date=*", "endpoint=*"))
+    })
+
+
+def list_models(store_dir=STORE_DIR):
+    if not os.path.isdir(store_dir):
+        return []
+    models = open_store(store_dir).to_table(columns=["model"]).column("model").unique().to_pylist()
+    return sorted(m for m in models if m)
+
+
+def query_history(start_date, end_date, columns, endpoints=None, models=None, steady_only=False, store_dir=STORE_DIR):
+    """Rows from runs between two `YYYY-MM-DD` dates (inclusive) as a DataFrame.
+
+    Date and endpoint filters prune whole partitions; the model and
+    `steady_only` filters are pushed down to Parquet row-group statistics;
+    only `columns` are read. Files compacted before steady-state flags
+    existed are kept whole.
+    """
+    if not os.path.isdir(store_dir):
+        return pa.table({c: pa.array([], STORE_SCHEMA.field(c).type) for c in columns}).to_pandas()
+    expr = (ds.field("date") >= str(start_date)) & (ds.field("date") <= str(end_date))
+    if endpoints:
+        expr &= ds.field("endpoint").isin(list(endpoints))
+    if models:
+        expr &= ds.field("model").isin(list(models))
+    if steady_only:
+        expr &= (ds.field("steady_state") == 1) | ds.field("steady_state").is_null()
+    return open_store(store_dir).to_table(columns=list(columns), filter=expr).to_pandas()
@@ -0,0 +1,187 @@
+import json
+import math
+import os
+import threading
+import time
+
+# --- Sketch Settings ---
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_WINDOW_SECONDS = 10
+SKETCH_METRICS = ["ttft", "tpot", "total_latency", "itl"]
+SKETCH_QUANTILES = [0.5, 0.95, 0.99, 0.999]
+MIN_TRACKED_VALUE = 1e-6  # sec; smaller values land in the zero bucket
+
+
+# --- Log-Bucketed Quantile Sketch ---
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch-style).
+
+    Values are counted in logarithmic buckets, so any quantile is returned
+    within `relative_accuracy` of the true value. Memory grows with the
+    log of the value range, not with the number of samples. Two sketches
+    with the same accuracy merge by adding bucket counts.
+    """
+
+    __slots__ = ("relative_accuracy", "_gamma", "_log_gamma", "bins", "zero_count", "count")
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value):
+        if value is None or value != value:  # skip None and NaN
+            return
+        self.count += 1
+        if value <= MIN_TRACKED_VALUE:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, n in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return 2 * self._gamma ** key / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.bins) / (self._gamma + 1)
+
+    def to_dict(self):
+        return {"zero": self.zero_count, "count": self.count, "bins": {str(k): n for k, n in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        sketch = cls(relative_accuracy)
+        sketch.zero_count = data.get("zero", 0)
+        sketch.count = data.get("count", 0)
+        sketch.bins = {int(k): n for k, n in data.get("bins", {}).items()}
+        return sketch
+
+
+# --- Sliding Time Windows ---
+class WindowedSketches:
+    """One sketch per metric per wall-clock window.
+
+    Windows are aligned to epoch multiples of `window_seconds`, so sketches
+    from different worker processes line up and merge window by window.
+    """
+
+    def __init__(self, window_seconds=DEFAULT_WINDOW_SECONDS, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.window_seconds = window_seconds
+        self.relative_accuracy = relative_accuracy
+        self.windows = {}  # window start (epoch sec) -> {metric: QuantileSketch}
+        self._lock = threading.Lock()
+
+    def _window(self, now):
+        start = int(now // self.window_seconds) * self.window_seconds
+        window = self.windows.get(start)
+        if window is None:
+            window = self.windows[start] = {m: QuantileSketch(self.relative_accuracy) for m in SKETCH_METRICS}
+        return window
+
+    def add(self, metric, value, now=None):
+        with self._lock:
+            self._window(time.time() if now is None else now)[metric].add(value)
+
+    def add_many(self, values, now=None):
+        """Add `{metric: value or iterable of values}` to the current window."""
+        with self._lock:
+            window = self._window(time.time() if now is None else now)
+            for metric, value in values.items():
+                if isinstance(value, (int, float)) or value is None:
+                    window[metric].add(value)
+                else:
+                    for v in value:
+                        window[metric].add(v)
+
+    def merge(self, other):
+        for start, metrics in other.windows.items():
+            window = self.windows.setdefault(start, {m: QuantileSketch(self.relative_accuracy) for m in SKETCH_METRICS})
+            for metric, sketch in metrics.items():
+                window.setdefault(metric, QuantileSketch(self.relative_accuracy)).merge(sketch)
+        return self
+
+    def overall(self, metric):
+        """Sketch of `metric` over the whole run."""
+        total = QuantileSketch(self.relative_accuracy)
+        for window in self.windows.values():
+            if metric in window:
+                total.merge(window[metric])
+        return total
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "relative_accuracy": self.relative_accuracy,
+                "window_seconds": self.window_seconds,
+                "windows": {
+                    str(start): {m: s.to_dict() for m, s in metrics.items() if s.count}
+                    for start, metrics in sorted(self.windows.items())
+                },
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        ws = cls(data.get("window_seconds", DEFAULT_WINDOW_SECONDS), data.get("relative_accuracy", DEFAULT_RELATIVE_ACCURACY))
+        for start, metrics in data.get("windows", {}).items():
+            ws.windows[int(start)] = {
+                m: QuantileSketch.from_dict(metrics.get(m, {}), ws.relative_accuracy) for m in SKETCH_METRICS
+            }
+        return ws
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def quantile_rows(self, metric, quantiles=SKETCH_QUANTILES):
+        """`[{"window_start", "count", "p50", ...}]` per window, for plotting percentiles over time."""
+        rows = []
+        for start in sorted(self.windows):
+            sketch = self.windows[start].get(metric)
+            if sketch is None or sketch.count == 0:
+                continue
+            row = {"window_start": start, "count": sketch.count}
+            for q in quantiles:
+                row[quantile_label(q)] = sketch.quantile(q)
+            rows.append(row)
+        return rows
+
+
+def quantile_label(q):
+    return "p" + f"{q * 100:g}"
+
+
+def merge_sketch_files(paths, out_path):
+    """Merge per-worker sketch files into one without touching raw rows."""
+    merged = None
+    for path in paths:
+        ws = WindowedSketches.load(path)
+        merged = ws if merged is None else merged.merge(ws)
+    if merged is not None:
+        merged.save(out_path)
+    return merged
@@ -0,0 +1,168 @@
+import json
+import time
+from array import array
+
+# --- Optional Fast JSON Backend ---
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    loads = json.loads
+    JSON_BACKEND = "json"
+
+# --- SSE Constants ---
+DATA_PREFIX = b"data:"
+DONE_MARKER = b"[DONE]"
+DELTA_KEY = b'"delta":'
+CONTENT_KEY = b'"content":'
+USAGE_KEY = b'"usage":'
+
+
+# --- Bytes-Level SSE Parsing ---
+def payload_start(line):
+    """Return the offset of the payload in an SSE `data:` line, or -1 for any other line."""
+    if not line.startswith(DATA_PREFIX):
+        return -1
+    start = len(DATA_PREFIX)
+    end = len(line)
+    while start < end and line[start] in b" \t":
+        start += 1
+    return start
+
+
+def iter_data(lines):
+    """Yield `(line, start)` for every data event in a stream of raw SSE lines.
+
+    Lines stay as the bytes the HTTP client produced; nothing is decoded or
+    copied. Iteration stops at the `[DONE]` marker.
+    """
+    for line in lines:
+        if not line:
+            continue
+        start = payload_start(line)
+        if start < 0:
+            continue
+        if line.startswith(DONE_MARKER, start):
+            return
+        yield line, start
+
+
+def decode_chunk(line, start=0):
+    """Fully decode the JSON payload of a data line."""
+    return loads(line[start:])
+
+
+def chunk_content(chunk):
+    """Pull `choices[0].delta.content` out of an already decoded chunk."""
+    choices = chunk.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+def extract_content(line, start=0):
+    """Return `choices[0].delta.content` from a data line.
+
+    Plain content strings are sliced straight out of the line without parsing
+    the rest of the chunk. The scan is anchored on the `delta` object, and
+    only a `content` key at its top level before any nested value is
+    trusted, so `content` keys elsewhere (message-shaped payloads,
+    `logprobs.content`) are never mistaken for it. Escaped strings, or
+    chunks whose shape the scanner does not recognise, fall back to a full
+    decode. Raises ValueError on malformed JSON in the fallback path.
+    """
+    end = len(line)
+    delta = line.find(DELTA_KEY, start)
+    if delta < 0:
+        return chunk_content(decode_chunk(line, start))
+    pos = delta + len(DELTA_KEY)
+    while pos < end and line[pos] in b" \t":
+        pos += 1
+    if pos >= end or line[pos] != 0x7B:  # opening brace
+        return chunk_content(decode_chunk(line, start))
+
+    key = line.find(CONTENT_KEY, pos + 1)
+    # Any brace or bracket before the key means it may not belong to the delta itself
+    if key < 0 or any(line.find(c, pos + 1, key) >= 0 for c in (b"{", b"}", b"[")):
+        return chunk_content(decode_chunk(line, start))
+
+    pos = key + len(CONTENT_KEY)
+    while pos < end and line[pos] in b" \t":
+        pos += 1
+
+    if line.startswith(b"null", pos):
+        return ""
+    if pos < end and line[pos] == 0x22:  # opening quote
+        close = line.find(b'"', pos + 1)
+        if close > 0 and line.find(b"\\", pos + 1, close) < 0:
+            return line[pos + 1:close].decode("utf-8")
+    return chunk_content(decode_chunk(line, start))
+
+
+def has_usage(line, start=0):
+    """True when the data line carries a non-null `usage` block (stream_options.include_usage)."""
+    key = line.find(USAGE_KEY, start)
+    if key < 0:
+        return False
+    pos = key + len(USAGE_KEY)
+    end = len(line)
+    while pos < end and line[pos] in b" \t":
+        pos += 1
+    return pos < end and line[pos] == 0x7B  # opening brace
+
+
+# --- Per-Request Stream State (shared by the Locust and asyncio engines) ---
+class StreamStats:
+    """Accumulates what one streamed response produced: chunk arrival offsets, text and usage.
+
+    `parse_seconds` is the client time spent inside `feed`, for harness self-monitoring.
+    """
+
+    __slots__ = ("start_time", "ttft", "chunk_offsets", "completion", "usage", "parse_seconds")
+
+    def __init__(self, start_time):
+        self.start_time = start_time
+        self.ttft = None
+        self.chunk_offsets = array("f")
+        self.completion = []
+        self.usage = None
+        self.parse_seconds = 0.0
+
+    def feed(self, line, start):
+        """Consume one data line; returns its content. Raises ValueError on malformed JSON."""
+        arrived = time.perf_counter()
+        try:
+            return self._feed(line, start, arrived)
+        finally:
+            self.parse_seconds += time.perf_counter() - arrived
+
+    def _feed(self, line, start, arrived):
+        if has_usage(line, start):
+            chunk = decode_chunk(line, start)
+            self.usage = chunk.get("usage")
+            content = chunk_content(chunk)
+        else:
+            content = extract_content(line, start)
+
+        if content:
+            self.chunk_offsets.append(arrived - self.start_time)
+            if self.ttft is None:
+                self.ttft = self.chunk_offsets[0]
+            self.completion.append(content)
+        return content
+
+    def text(self):
+        return "".join(self.completion)
+
+
+async def aiter_data(lines):
+    """Async counterpart of `iter_data` for clients that yield raw lines with their line endings."""
+    async for line in lines:
+        line = line.rstrip(b"\r\n")
+        if not line:
+            continue
+        start = payload_start(line)
+        if start < 0:
+            continue
+        if line.startswith(DONE_MARKER, start):
+            return
+        yield line, start
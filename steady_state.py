@@ -0,0 +1,161 @@
+"""Steady-state window detection for load test runs.
+
+A run opens with the spawn ramp and cold connections and ends with the
+drain of in-flight requests; neither reflects the endpoint under the
+configured load. The steady state is the span where rolling throughput sits
+on its plateau and rolling TTFT is not inflated, found from per-second
+bins with cumulative-sum rolling windows (no per-row Python).
+
+A window is a JSON-safe dict stored as `steady_state` in the run's
+`_config.json`; `start_sec` and `end_sec` are inclusive offsets from the
+run's first completed request, and `method` is `auto`, `manual` or `full`.
+"""
+import numpy as np
+
+DEFAULT_WINDOW_SECONDS = 10   # rolling window width
+DEFAULT_TOLERANCE = 0.2       # rolling throughput within 20% of the plateau
+LATENCY_TOLERANCE = 0.5       # rolling TTFT at most 50% above its steady-state median
+PLATEAU_QUANTILE = 75         # percentile of rolling throughput taken as the plateau
+MIN_WINDOWS = 3               # runs shorter than this many windows are used whole
+
+
+# --- Per-Second Bins ---
+def _offsets(df):
+    """Seconds since the run's first completed request, per row."""
+    ts = df["timestamp"]
+    return (ts - ts.min()).dt.total_seconds().to_numpy(dtype=np.float64)
+
+
+def _rolling_mean(sums, counts, window):
+    """Centered rolling `sum(sums) / sum(counts)` over `window` bins; NaN where the window is empty."""
+    n = len(sums)
+    lo = np.clip(np.arange(n) - window // 2, 0, n)
+    hi = np.clip(lo + window, 0, n)
+    s = np.concatenate([[0.0], np.cumsum(sums)])
+    c = np.concatenate([[0.0], np.cumsum(counts)])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (s[hi] - s[lo]) / (c[hi] - c[lo])
+
+
+def full_window(df):
+    return {"method": "full", "start_sec": 0.0, "end_sec": float(_offsets(df).max()) if len(df) else 0.0}
+
+
+def manual_window(start_sec, end_sec):
+    return {"method": "manual", "start_sec": float(start_sec), "end_sec": float(end_sec)}
+
+
+# --- Detection ---
+def detect_steady_state(df, window_sec=DEFAULT_WINDOW_SECONDS, tolerance=DEFAULT_TOLERANCE, latency_tolerance=LATENCY_TOLERANCE):
+    """The steady-state window of a run, or the whole run when none is found.
+
+    Throughput is tokens/sec (requests/sec when no tokens were counted),
+    rolled over `window_sec` seconds. The plateau is its PLATEAU_QUANTILE
+    percentile; seconds within `tolerance` of the plateau whose rolling TTFT
+    is within `latency_tolerance` of the steady median qualify, and the
+    window runs from the first qualifying second to the last.
+    """
+    if df.empty:
+        return full_window(df)
+    offsets = _offsets(df)
+    n = int(offsets.max()) + 1
+    window = int(window_sec)
+    if n < MIN_WINDOWS * window:
+        return full_window(df)
+
+    seconds = offsets.astype(np.int64)
+    tokens = np.nan_to_num(df["tokens_per_request"].to_numpy(dtype=np.float64, na_value=np.nan))
+    weights = tokens if tokens.sum() > 0 else np.ones(len(df))
+    ones = np.ones(n)
+    throughput = _rolling_mean(np.bincount(seconds, weights=weights, minlength=n), ones, window)
+
+    ok = (df["status"] == "success").to_numpy()
+    ttft = df["ttft"].to_numpy(dtype=np.float64, na_value=np.nan)
+    ok &= ~np.isnan(ttft)
+    latency = _rolling_mean(np.bincount(seconds[ok], weights=ttft[ok], minlength=n),
+                            np.bincount(seconds[ok], minlength=n), window)
+
+    plateau = float(np.percentile(throughput, PLATEAU_QUANTILE))
+    if plateau <= 0:
+        return full_window(df)
+    on_plateau = throughput >= (1 - tolerance) * plateau
+    steady = on_plateau
+    if not np.isnan(latency[on_plateau]).all():
+        latency_level = float(np.nanmedian(latency[on_plateau]))
+        with np.errstate(invalid="ignore"):
+            steady = on_plateau & ~(latency > (1 + latency_tolerance) * latency_level)
+
+    if not steady.any():
+        return full_window(df)
+    start = int(steady.argmax())
+    end = n - 1 - int(steady[::-1].argmax())
+    if end - start < window:
+        return full_window(df)
+    return {
+        "method": "auto",
+        "start_sec": float(start),
+        "end_sec": float(end),
+        "window_sec": window,
+        "tolerance": tolerance,
+        "plateau_throughput": round(plateau, 3),
+    }
+
+
+# --- Applying a Window ---
+def resolve_window(df, config=None):
+    """The window stored with the run, or a freshly detected one."""
+    return (config or {}).get("steady_state") or detect_steady_state(df)
+
+
+def window_mask(df, window):
+    """Rows that completed inside `window`."""
+    if not window or window.get("method") == "full" or df.empty:
+        return np.ones(len(df), dtype=bool)
+    offsets = _offsets(df)
+    return (offsets >= window["start_sec"]) & (offsets <= window["end_sec"])
+
+
+def trim_to_window(df, window):
+    if not window or window.get("method") == "full":
+        return df
+    return df[window_mask(df, window)]
+
+
+def window_bounds(df, window):
+    """(start, end) timestamps of `window`, for shading time charts."""
+    t0 = df["timestamp"].min()
+    return (t0 + np.timedelta64(int(window["start_sec"] * 1000), "ms"),
+            t0 + np.timedelta64(int(window["end_sec"] * 1000), "ms"))
+
+
+def describe_window(window):
+    if not window or window.get("method") == "full":
+        return "whole run"
+    return f"{window['method']}: {window['start_sec']:.0f}s to {window['end_sec']:.0f}s"
+
+
+# --- Stored Windows ---
+def save_window(metrics_path, window):
+    from metrics_writer import update_run_config
+    update_run_config(metrics_path.replace("_metrics.csv", "_config.json"), {"steady_state": window})
+
+
+def record_steady_state(metrics_path, df=None):
+    """Detect and store a finished run's window; a manually set window is kept. Returns the stored window."""
+    from run_index import load_config, load_metrics
+
+    stored = (load_config(metrics_path) or {}).get("steady_state")
+    if stored and stored.get("method") == "manual":
+        return stored
+    window = detect_steady_state(load_metrics(metrics_path) if df is None else df)
+    save_window(metrics_path, window)
+    return window
+
+
+def load_steady_state(metrics_path):
+    """A run's metrics trimmed to its stored (or detected) steady-state window, and the window."""
+    from run_index import load_config, load_metrics
+
+    df = load_metrics(metrics_path)
+    window = resolve_window(df, load_config(metrics_path))
+    return trim_to_window(df, window), window
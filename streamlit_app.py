@@ -1,12 +1,29 @@
-import subprocess
 import streamlit as st
 import time
 import os
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 import json
+from metrics_writer import read_chunk_times
+from launcher import build_run_config, write_run_config, start_load_test, wait_for_processes, merge_shards, parse_run_time, start_mock_server, stop_mock_server, ENGINES
+from arrivals import LOAD_MODES, ARRIVAL_PROCESSES
+from capacity import CAPACITY_MODES, DEFAULT_SLO
+from http_client import HTTP_CLIENTS, DEFAULT_POOL_SIZE
+from client_health import CPU_SATURATION_PERCENT, LAG_SATURATION_MS
+from workload import LENGTH_BIN_LABELS
+from downsample import downsample_series, binned_bands, MAX_RAW_SCATTER_POINTS
+from sweep import Sweep, SWEEP_AXES, expand_grid, list_sweeps, start_sweep_runner, sweep_results
+from run_index import RunIndex, load_metrics, file_signature, config_path_for
+from steady_state import (resolve_window, detect_steady_state, full_window, manual_window, trim_to_window, window_bounds,
+                          describe_window, save_window, record_steady_state, load_steady_state)
+from run_store import compact_run, compact_all, query_history, list_endpoints, list_models, store_signature
+from compare import compare_runs
+from analytics import summarize, throughput, hover_labels, run_targets, target_summary, harness_error, load_column, history_summary, prefix_cache_summary, HISTORY_COLUMNS, DEFAULT_THRESHOLDS
+from live_metrics import MetricsTail, LiveAggregator
+from sketches import WindowedSketches, SKETCH_METRICS, SKETCH_QUANTILES, quantile_label
 # --- Page Config ---
 st.set_page_config(page_title="LLM Performance and Evaluation", page_icon="assets/WWT_Monogram_1.png", layout="wide")
 
@@ -16,30 +33,92 @@ LIGHT_BLUE = "#0086EA"
 DARK_BLUE = "#1C0087"
 NAVY = "#1D1E4B"
 
+LIVE_WINDOW_SECONDS = 300
+
 # --- Initialize Page State ---
 if "page" not in st.session_state:
     st.session_state.page = "Home"
 
 # --- Sidebar with Logo and Navigation ---
 st.sidebar.image("assets/WWT_Logo_RGB_Color.png", width=200)
-selection = st.sidebar.radio("Navigation", ["Home", "Dashboard"], index=["Home", "Dashboard"].index(st.session_state.page))
+PAGES = ["Home", "Dashboard", "History", "Sweeps"]
+selection = st.sidebar.radio("Navigation", PAGES, index=PAGES.index(st.session_state.page))
 if selection != st.session_state.page:
     st.session_state.page = selection
     st.rerun()
 
-# --- Time Parsing Function ---
-def parse_run_time(rt_str):
-    rt_str = rt_str.lower().strip()
-    minutes, seconds = 0, 0
-    if "m" in rt_str and "s" in rt_str:
-        parts = rt_str.replace("m", " ").replace("s", "").split()
-        minutes = int(parts[0])
-        seconds = int(parts[1])
-    elif "m" in rt_str:
-        minutes = int(rt_str.replace("m", ""))
-    elif "s" in rt_str:
-        seconds = int(rt_str.replace("s", ""))
-    return minutes * 60 + seconds
+# --- Cached Run Data (keyed by file signature so unchanged runs are never re-read) ---
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_metrics_cached(path, signature):
+    return load_metrics(path)
+
+# Chart data is reduced server-side and cached per file, columns and grouping, so the browser gets a bounded payload
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_series_cached(path, signature, x, ys, group=None):
+    return downsample_series(load_metrics_cached(path, signature), x, list(ys), group=group)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_bands_cached(path, signature, x, ys, group=None):
+    return binned_bands(load_metrics_cached(path, signature), x, list(ys), group=group)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_timeline_series_cached(path, signature, ys):
+    return downsample_series(load_timeline_cached(path, signature), "timestamp", list(ys))
+
+def band_figure(bands, outliers, x, title, labels, group=None, colors=None):
+    """Percentile bands (one line per quantile) with the outliers above the top band as points."""
+    color = group or ("series" if bands["series"].nunique() > 1 else "band")
+    fig = px.line(
+        bands,
+        x=x,
+        y="value",
+        color=color,
+        line_dash="band" if color != "band" else None,
+        markers=True,
+        hover_data=["count"],
+        title=title,
+        labels=labels,
+        color_discrete_sequence=colors,
+    )
+    if not outliers.empty:
+        fig.add_trace(go.Scattergl(
+            x=outliers[x], y=outliers["value"], mode="markers", name="outliers (above top band)",
+            marker={"size": 4, "color": "rgba(29, 30, 75, 0.35)"},
+        ))
+    return fig
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_itl_gaps_cached(path, signature):
+    gaps = [np.diff(np.asarray(offsets, dtype=np.float64)) for _, offsets in read_chunk_times(path) if len(offsets) > 1]
+    return np.concatenate(gaps) if gaps else np.array([])
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_sketch_quantiles_cached(path, signature, metric):
+    rows = pd.DataFrame(WindowedSketches.load(path).quantile_rows(metric))
+    if not rows.empty:
+        rows["window_start"] = pd.to_datetime(rows["window_start"], unit="s", utc=True).dt.tz_convert(None)
+    return rows
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_timeline_cached(path, signature):
+    timeline = pd.read_csv(path)
+    timeline["timestamp"] = pd.to_datetime(timeline["timestamp"], unit="s", utc=True).dt.tz_convert(None)
+    return timeline
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def compare_runs_cached(baseline_path, candidate_path, signatures, warmup, confidence, min_effect_pct, steady_only=True):
+    # `signatures` covers both runs' metrics and config files, so a re-saved window invalidates the result
+    load = (lambda path: load_steady_state(path)[0]) if steady_only else load_metrics
+    return compare_runs(load(baseline_path), load(candidate_path), warmup=warmup,
+                        confidence=confidence, min_effect_pct=min_effect_pct)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_history_cached(start_date, end_date, endpoints, models, signature, steady_only=True):
+    return history_summary(query_history(start_date, end_date, HISTORY_COLUMNS, endpoints, models, steady_only))
+
+@st.cache_resource
+def get_run_index(data_dir):
+    return RunIndex(data_dir)
 
 # --- Page: Home ---
 if st.session_state.page == "Home":
@@ -60,6 +139,75 @@ if st.session_state.page == "Home":
             spawn_rate = st.number_input("Spawn Rate (users/sec)", min_value=1, value=2)
             run_time = st.text_input("Run Time (e.g., 1m, 30s, 2m30s)", value="1m")
             target_url = st.text_input("Target URL", value="https://your-model-endpoint.com")
+            engine = st.selectbox("Load Engine", ENGINES, help="asyncio runs as one process and ignores Worker Processes")
+            workers = st.number_input("Worker Processes (0 = single process)", min_value=0, value=0)
+
+            load_mode = st.radio("Load Mode", LOAD_MODES, horizontal=True,
+                                 help="closed: users wait for each response (Users/Spawn Rate apply). open: requests arrive at a target rate. "
+                                      "capacity: searches for the most users that meet the SLOs (Run Time is the upper limit).")
+            with st.expander("Open-Loop Arrival Settings"):
+                target_rps = st.number_input("Target Rate (requests/sec)", min_value=0.1, value=5.0)
+                arrival_process = st.selectbox("Arrival Process", ARRIVAL_PROCESSES)
+                start_rps = st.number_input("Ramp Start Rate (requests/sec, 0 = no ramp)", min_value=0.0, value=0.0)
+                ramp_seconds = st.number_input("Ramp Duration (sec)", min_value=0, value=0)
+                max_in_flight = st.number_input("Max In-Flight Requests (arrivals above this are dropped)", min_value=1, value=1000)
+
+            with st.expander("Capacity Search Settings"):
+                capacity_mode = st.selectbox("Search Mode", CAPACITY_MODES, help="step: add users until the SLOs break. binary: double, then bisect.")
+                cap_cols = st.columns(3)
+                cap_start_users = cap_cols[0].number_input("Start Users", min_value=1, value=1)
+                cap_step = cap_cols[1].number_input("Step (users)", min_value=1, value=5)
+                cap_max_users = cap_cols[2].number_input("Max Users", min_value=1, value=200)
+                hold_cols = st.columns(2)
+                cap_min_hold = hold_cols[0].number_input("Min Hold per Level (sec)", min_value=5, value=30)
+                cap_max_hold = hold_cols[1].number_input("Max Hold per Level (sec)", min_value=5, value=180)
+                slo_cols = st.columns(3)
+                slo_ttft = slo_cols[0].number_input("SLO: TTFT p95 (sec)", min_value=0.0, value=DEFAULT_SLO["ttft_p95"], step=0.1)
+                slo_tpot = slo_cols[1].number_input("SLO: TPOT p95 (sec)", min_value=0.0, value=DEFAULT_SLO["tpot_p95"], step=0.01)
+                slo_errors = slo_cols[2].number_input("SLO: Error Rate (%)", min_value=0.0, value=DEFAULT_SLO["error_rate"], step=0.5)
+
+            with st.expander("Prefix-Cache Workload"):
+                prefix_enabled = st.checkbox("Send shared-prefix prompt families (overrides Workload Replay)", value=False)
+                pc_cols = st.columns(2)
+                prefix_tokens = pc_cols[0].number_input("Shared Prefix Length (words)", min_value=1, value=1024)
+                suffix_tokens = pc_cols[1].number_input("Unique Suffix Length (words)", min_value=1, value=32)
+                share_cols = st.columns(2)
+                share_ratio = share_cols[0].slider("Share Ratio (requests reusing a prefix)", 0.0, 1.0, 0.8)
+                reuse_distance = share_cols[1].number_input("Mean Reuse Distance (requests)", min_value=1, value=10)
+
+            with st.expander("HTTP Client"):
+                http_backend = st.selectbox("Client Backend (locust)", HTTP_CLIENTS,
+                                            help="requests: locust HttpUser session. fasthttp: geventhttpclient-based FastHttpUser.")
+                http_pool_size = st.number_input("Connection Pool Size", min_value=1, value=DEFAULT_POOL_SIZE)
+                http_keep_alive = st.checkbox("Keep-Alive (reuse connections)", value=True)
+                profile_enabled = st.checkbox("Profile the streaming loop (writes a flamegraph-ready _profile.folded)", value=False)
+
+            with st.expander("A/B Targets"):
+                st.caption("Split every request stream across endpoint/model pairs by weight. Blank URL = Target URL, "
+                           "blank model = the workload's model. Leave empty for a single-target run.")
+                targets_table = st.data_editor(
+                    pd.DataFrame({"name": pd.Series(dtype=str), "url": pd.Series(dtype=str),
+                                  "model": pd.Series(dtype=str), "weight": pd.Series(dtype=float)}),
+                    num_rows="dynamic", use_container_width=True, key="targets_table",
+                )
+
+            with st.expander("Local Mock Server (no GPU endpoint)"):
+                mock_enabled = st.checkbox("Run against a local mock server (replaces Target URL)", value=False,
+                                           help="Delay specs: a number, or const:v, uniform:lo,hi, normal:mean,sd, exp:mean, lognormal:median,sigma")
+                mock_cols = st.columns(3)
+                mock_ttft = mock_cols[0].text_input("TTFT (sec)", value="0.2")
+                mock_itl = mock_cols[1].text_input("Inter-Token Delay (sec)", value="0.02")
+                mock_tokens = mock_cols[2].text_input("Output Length (tokens)", value="200")
+                fault_cols = st.columns(4)
+                mock_error_rate = fault_cols[0].number_input("Error Rate", min_value=0.0, max_value=1.0, value=0.0, step=0.01)
+                mock_abort_rate = fault_cols[1].number_input("Mid-Stream Abort Rate", min_value=0.0, max_value=1.0, value=0.0, step=0.01)
+                mock_slowdown = fault_cols[2].number_input("Slowdown per In-Flight Request", min_value=0.0, value=0.0, step=0.001, format="%.3f")
+                mock_knee = fault_cols[3].number_input("Slowdown Starts Above (in flight)", min_value=0, value=0)
+
+            with st.expander("Workload Replay"):
+                dataset_path = st.text_input("Prompt Dataset (JSONL path, blank = fixed prompt)", value="")
+                dataset_seed = st.number_input("Sampling Seed", min_value=0, value=0)
+                dataset_field = st.text_input("Prompt Field (blank = auto: messages/prompt/content/body)", value="")
 
             submitted = st.form_submit_button(
                 "Start Load Test",
@@ -76,41 +224,138 @@ if st.session_state.page == "Home":
 
             # Save test config to file
             timestamp_prefix = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            config_data = {
-                "timestamp": timestamp_prefix,
-                "users": users,
-                "spawn_rate": spawn_rate,
-                "run_time": run_time,
-                "target_url": target_url
-            }
-
-            os.makedirs("data", exist_ok=True)
-            with open(f"data/{timestamp_prefix}_config.json", "w") as f:
-                json.dump(config_data, f, indent=4)
-
-
-            # --- Start Locust first ---
-            command = [
-                "locust",
-                "-f", "locust_load_test.py",
-                "--host", target_url,
-                "--users", str(users),
-                "--spawn-rate", str(spawn_rate),
-                "--headless",
-                "--run-time", run_time,
-            ]
-            os.environ["TEST_TIMESTAMP"] = timestamp_prefix
-            subprocess.Popen(command, env=os.environ)
 
-            # --- Show progress bar while test runs ---
+            mock_process = None
+            mock = None
+            if mock_enabled:
+                mock = {"ttft": mock_ttft, "itl": mock_itl, "tokens": mock_tokens, "error_rate": mock_error_rate,
+                        "abort_rate": mock_abort_rate, "slowdown": mock_slowdown, "knee": mock_knee}
+                mock_process, target_url = start_mock_server(timestamp_prefix, **mock)
+
+            http_client = {"backend": http_backend, "pool_size": http_pool_size, "keep_alive": http_keep_alive}
+
+            targets = []
+            for row in targets_table.to_dict("records"):
+                name, url, model = (row[k].strip() if isinstance(row[k], str) else "" for k in ("name", "url", "model"))
+                if url or model:
+                    weight = float(row["weight"]) if pd.notna(row["weight"]) and row["weight"] > 0 else 1.0
+                    targets.append({"name": name or None, "url": url or None, "model": model or None, "weight": weight})
+
+            prefix = None
+            if prefix_enabled:
+                prefix = {
+                    "prefix_tokens": prefix_tokens,
+                    "suffix_tokens": suffix_tokens,
+                    "share_ratio": share_ratio,
+                    "reuse_distance": reuse_distance,
+                }
+
+            dataset = None
+            if dataset_path.strip():
+                dataset = {
+                    "path": dataset_path.strip(),
+                    "seed": dataset_seed,
+                    "prompt_field": dataset_field.strip() or None,
+                }
+
+            arrival = None
+            if load_mode == "open":
+                arrival = {
+                    "rate": target_rps,
+                    "process": arrival_process,
+                    "start_rate": start_rps,
+                    "ramp": ramp_seconds,
+                    "max_in_flight": max_in_flight,
+                }
+
+            capacity = None
+            if load_mode == "capacity":
+                capacity = {
+                    "mode": capacity_mode,
+                    "start_users": cap_start_users,
+                    "step": cap_step,
+                    "max_users": cap_max_users,
+                    "min_hold": cap_min_hold,
+                    "max_hold": cap_max_hold,
+                    "slo": {"ttft_p95": slo_ttft, "tpot_p95": slo_tpot, "error_rate": slo_errors},
+                }
+
+            write_run_config(timestamp_prefix, build_run_config(timestamp_prefix, target_url, users, spawn_rate, run_time, workers,
+                                                                engine, arrival, dataset, capacity, targets, mock))
+
+
+            # --- Start the load engine first (locust master + workers when workers > 0) ---
+            processes = start_load_test(timestamp_prefix, target_url, users, spawn_rate, run_time, workers, engine, arrival, dataset,
+                                         capacity, http_client, prefix, profile_enabled, targets)
+
+            # --- Live view: tail the metrics file(s) until the load engine exits ---
             progress_bar = st.progress(0)
             status_text = st.empty()
-
-            for i in range(duration):
+            live_cards = st.empty()
+            live_chart_cols = st.columns(2)
+            live_charts = [col.empty() for col in live_chart_cols for _ in range(2)]
+
+            tail = MetricsTail(f"data/{timestamp_prefix}_metrics*.csv")
+            timeline_tail = MetricsTail(f"data/{timestamp_prefix}_concurrency*.csv")
+            live = LiveAggregator(window=LIVE_WINDOW_SECONDS)
+            started = time.monotonic()
+            tick = 0
+            while processes[0].poll() is None:
                 time.sleep(1)
-                percent = int((i + 1) / duration * 100)
+                tick += 1
+                rows = tail.poll()
+                live.update(tail.header, rows)
+                timeline_rows = timeline_tail.poll_files()
+                live.update_timeline(timeline_tail.header, timeline_rows)
+                elapsed = time.monotonic() - started
+                percent = min(int(elapsed / max(duration, 1) * 100), 100)
                 progress_bar.progress(percent)
-                status_text.markdown(f"<p style='color:{NAVY};'>Progress: {percent}%</p>", unsafe_allow_html=True)
+                status_text.markdown(
+                    f"<p style='color:{NAVY};'>Elapsed: {int(elapsed)}s / {duration}s | "
+                    f"Requests: {live.total_requests} | Failures: {live.total_failures}</p>",
+                    unsafe_allow_html=True
+                )
+
+                live_df = live.frame()
+                if live_df.empty:
+                    continue
+                # Timeline seconds can run ahead of the last completion, so each card takes its own latest value
+                sampled = live_df["in_flight"].dropna()
+                completed = live_df.dropna(subset=["error_rate"])
+                in_flight = int(sampled.iloc[-1]) if not sampled.empty else "N/A"
+                if completed.empty:
+                    live_cards.markdown(f"**In-Flight:** `{in_flight}`")
+                else:
+                    latest = completed.iloc[-1]
+                    live_cards.markdown(
+                        f"**In-Flight:** `{in_flight}` &nbsp; | &nbsp; "
+                        f"**TPS:** `{latest['tps']}` &nbsp; | &nbsp; "
+                        f"**TTFT:** `{latest['ttft'] if pd.isna(latest['ttft']) else round(latest['ttft'], 3)} s` &nbsp; | &nbsp; "
+                        f"**Error Rate:** `{latest['error_rate']:.1f}%`"
+                    )
+                for placeholder, (metric, label, color) in zip(live_charts, [
+                    ("ttft", "TTFT (s)", RED),
+                    ("tps", "Tokens/sec", LIGHT_BLUE),
+                    ("error_rate", "Error Rate (%)", DARK_BLUE),
+                    ("in_flight", "In-Flight Requests", NAVY) if not sampled.empty
+                    else ("concurrency_at_start", "Concurrency at Request Start", NAVY),
+                ]):
+                    fig_live = px.line(live_df, x="timestamp", y=metric, title=f"Live {label}",
+                                       labels={"timestamp": "Time", metric: label}, color_discrete_sequence=[color])
+                    fig_live.update_layout(height=280, margin=dict(t=40, b=20))
+                    placeholder.plotly_chart(fig_live, use_container_width=True, key=f"live_{metric}_{tick}")
+
+            progress_bar.progress(100)
+
+            # Workers write shards; combine them into the single metrics file once every process has exited
+            wait_for_processes(processes, timeout=60)
+            if mock_process is not None:
+                stop_mock_server(mock_process)
+            merge_shards(timestamp_prefix)
+            # Steady-state window stored with the run, then the typed Parquet copy for the History page
+            if os.path.exists(f"data/{timestamp_prefix}_metrics.csv"):
+                record_steady_state(f"data/{timestamp_prefix}_metrics.csv")
+                compact_run(f"data/{timestamp_prefix}_metrics.csv")
 
             st.success("Load test completed. Redirecting to Dashboard...")
             st.session_state.disabled = False
@@ -126,17 +371,18 @@ elif st.session_state.page == "Dashboard":
     RED = "#EE282A"
     VIOLET = "#330072"
     NAVY = "#1D1E4B"
-    # Checking data folder for files with todays date
+    # Checking data folder for files from the selected date (History compares across days)
     DATA_DIR = "data"
-    today_str = datetime.today().strftime("%Y-%m-%d")
+    run_date = st.date_input("Run Date:", value=datetime.today())
+    date_str = run_date.strftime("%Y-%m-%d")
 
     metric_files = sorted(
-        [f for f in os.listdir(DATA_DIR) if f.endswith("_metrics.csv") and f.startswith(today_str)],
+        [f for f in os.listdir(DATA_DIR) if f.endswith("_metrics.csv") and f.startswith(date_str)],
         reverse=True
     )
     # Giving filenames as options in select box
     if not metric_files:
-        st.warning("No metrics files found for today in the data folder.")
+        st.warning(f"No metrics files found for {date_str} in the data folder.")
     else:
         selected_file = st.selectbox("Select a Test File:", metric_files)
         file_path = os.path.join(DATA_DIR, selected_file)
@@ -152,21 +398,41 @@ elif st.session_state.page == "Dashboard":
                 f"🕒 `{config.get('timestamp', '-')}` | "
                 f"👥 Users: `{config.get('users', '-')}` | "
                 f"⚡ Spawn Rate: `{config.get('spawn_rate', '-')}/s` | "
-                f"⏱️ Duration: `{config.get('run_time', '-')}`"
+                f"⏱️ Duration: `{config.get('run_time', '-')}` | "
+                f"⚙️ Engine: `{config.get('engine', 'locust')}` | "
+                f"🔢 Token Count: `{(config.get('token_counting') or {}).get('method') or '-'}`"
             )
+            if config.get("load_mode") == "open":
+                dispatch = config.get("dispatch") or {}
+                config_summary += (
+                    f" | 🎯 Target: `{config.get('target_rps', '-')} req/s ({config.get('arrival_process', '-')})`"
+                    f" | ⏳ Late: `{dispatch.get('late', '-')}` | 🚫 Dropped: `{dispatch.get('dropped', '-')}`"
+                )
+            if config.get("targets"):
+                config_summary += " | 🔀 Targets: " + ", ".join(
+                    f"`{t.get('name') or t.get('model') or t.get('url')} ({t.get('requests', t.get('weight'))})`" for t in config["targets"]
+                )
             st.subheader(":blue[Test Parameters]")
             st.subheader(config_summary)
+
+            client_health = config.get("client_health") or {}
+            if client_health.get("saturated"):
+                st.error(
+                    f"⚠️ The load generator was the bottleneck in this run: CPU p95 `{client_health.get('cpu_percent_p95')}%`, "
+                    f"scheduling lag p99 `{client_health.get('sched_lag_ms_p99')} ms`. TTFT and TPS reflect the client, not the model. "
+                    f"Add worker processes or lower the load."
+                )
         else:
+            config = {}
             st.warning(f"Config file not found for `{timestamp_prefix}`.")
 
 
+        target_color = None  # charts split by target in multi-target runs
+        df = run_df = window = None  # stay None when the metrics file cannot be loaded; the per-run sections below check them
         try:
-            df = pd.read_csv(file_path)
-            # To find test duration
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            start_time = df["timestamp"].min()
-            end_time = df["timestamp"].max()
-            duration_sec = max((end_time - start_time).total_seconds(), 1)
+            df = load_metrics_cached(file_path, file_signature(file_path))
+            if len(run_targets(df)) > 1:
+                target_color = "target"
 
             # --- Optimized CSS ---
             st.markdown("""
@@ -213,51 +479,55 @@ elif st.session_state.page == "Dashboard":
             </style>
             """, unsafe_allow_html=True)
 
+            # Headline numbers cover the steady-state window: no spawn ramp, cold connections or end-of-run drain
+            stored_window = resolve_window(df, config)
+            run_end = max(full_window(df)["end_sec"], 1.0)
+            with st.expander(f"Steady-State Window ({describe_window(stored_window)})"):
+                window_mode = st.radio("Summarize:", ["Steady state", "Manual trim", "Whole run"], horizontal=True, key="window_mode")
+                if window_mode == "Manual trim":
+                    trim = st.slider(
+                        "Window (sec after the first completed request)", 0.0, run_end,
+                        (min(stored_window["start_sec"], run_end), min(stored_window["end_sec"], run_end)),
+                        step=1.0, key=f"window_trim_{selected_file}",
+                    )
+                    window = manual_window(*trim)
+                    if st.button("Save Window with Run", key="save_window"):
+                        save_window(file_path, window)
+                        st.rerun()
+                elif window_mode == "Whole run":
+                    window = full_window(df)
+                else:
+                    window = stored_window
+                    if window.get("method") == "manual" and st.button("Replace with Detected Window", key="redetect_window"):
+                        save_window(file_path, detect_steady_state(df))
+                        st.rerun()
+            run_df = trim_to_window(df, window)
+            st.caption(f"Summaries below cover {len(run_df)} of {len(df)} requests ({describe_window(window)}).")
+
             # Metrics (Max users before PD, Max users WF, TTFT at peak)
             st.subheader(":blue[Performance at a Glance]")
             # --- Define Thresholds ---
-            high_ttft_threshold = 2.0   # sec
-            high_tpot_threshold = 0.2    # sec
-            low_tps_threshold = 5.0      # tokens/sec
+            with st.expander("Degradation Thresholds"):
+                th_cols = st.columns(3)
+                thresholds = {
+                    "ttft": th_cols[0].number_input("High TTFT (sec)", min_value=0.0, value=DEFAULT_THRESHOLDS["ttft"], step=0.1),
+                    "tpot": th_cols[1].number_input("High TPOT (sec)", min_value=0.0, value=DEFAULT_THRESHOLDS["tpot"], step=0.01),
+                    "tps": th_cols[2].number_input("Low TPS (tokens/sec)", min_value=0.0, value=DEFAULT_THRESHOLDS["tps"], step=0.5),
+                }
+
+            # All headline numbers come from the vectorized analytics module
+            run_stats = summarize(run_df, thresholds)
 
             # Initialize safe defaults
             max_users_tested = config.get("users", "-")
-            max_safe_users = max_users_tested
-            max_perf_users = max_users_tested
-
-            # --- Detect First Failure ---
-            failed_df = df[df["status"] != "success"]
-            if not failed_df.empty:
-                first_fail_index = failed_df.index[0]
-                max_safe_users = int(df.loc[first_fail_index, "concurrent_requests"])
-
-            # --- Detect First Performance Degradation ---
-            def is_degraded(row):
-                return (
-                    row["ttft"] > high_ttft_threshold or
-                    row["tpot"] > high_tpot_threshold or
-                    row["tps"] < low_tps_threshold
-                )
-            degraded_rows = df[df.apply(is_degraded, axis=1)]
-            if not degraded_rows.empty:
-                first_degrade_index = degraded_rows.index[0]
-                max_perf_users = int(df.loc[first_degrade_index, "concurrent_requests"])
-            
-            # TTFT at peak
-            high_conc_threshold = df["concurrent_requests"].quantile(0.6)
-            high_load_df = df[df["concurrent_requests"] >= high_conc_threshold]
-            ttft_at_peak = high_load_df["ttft"].mean()
-
-            # Calculate metrics (TPS, RPS, Error Rate)
-            total_tokens = df["tokens_per_request"].sum()
-            total_requests = len(df)
-            failed_requests = len(df[df["status"] != "success"])
-            tps_per_req_avg = df["tps"].mean()
-
-            tps = total_tokens / duration_sec
-            rps = total_requests / duration_sec
-            
-            error_rate = (failed_requests / total_requests) * 100 if total_requests > 0 else 0
+            max_safe_users = run_stats["first_failure_concurrency"] or max_users_tested
+            max_perf_users = run_stats["first_degradation_concurrency"] or max_users_tested
+
+            ttft_at_peak = run_stats["ttft_at_peak"]
+            tps_per_req_avg = run_stats["tps_per_request_avg"]
+            tps = run_stats["tps"]
+            rps = run_stats["rps"]
+            error_rate = run_stats["error_rate"]
 
             perf_cols = st.columns(3)
 
@@ -321,16 +591,17 @@ elif st.session_state.page == "Dashboard":
                         
             # --- First Row: Metrics 0–3 ---
             # --- Metrics ---
+            latency_pct = run_stats["latency_percentiles"]
             metrics = [
-                ("Total Requests", len(df)),
-                ("Failures", len(df[df["status"] != "success"])),
+                ("Total Requests", run_stats["requests"]),
+                ("Failures", run_stats["failures"]),
                 #("RPS", round(len(df) / duration_sec, 2)),
-                ("Time To First Token (Avg)", f"{round(df['ttft'].mean(), 2)} s"),
-                ("Time Per Output Token (Avg)", f"{round(df['tpot'].mean(), 2)} s"),
-                ("Latency (Avg)", f"{round(df['total_latency'].mean(), 2)} s"),
-                ("#Tokens/Request (Avg)", f"{round(df['tokens_per_request'].mean(), 2)}"),
-                ("Latency Percentiles", f"P50: {round(np.percentile(df['total_latency'], 50), 2)} s | "f"P95: {round(np.percentile(df['total_latency'], 95), 2)} s"),
-                ("Min/Max Latency", f"{round(df['total_latency'].min(), 2)} s | {round(df['total_latency'].max(), 2)} s"),
+                ("Time To First Token (Avg)", f"{round(run_stats['ttft_avg'], 2)} s"),
+                ("Time Per Output Token (Avg)", f"{round(run_stats['tpot_avg'], 2)} s"),
+                ("Latency (Avg)", f"{round(run_stats['latency_avg'], 2)} s"),
+                ("#Tokens/Request (Avg)", f"{round(run_stats['tokens_per_request_avg'], 2)}"),
+                ("Latency Percentiles", f"P50: {round(latency_pct[50] or 0, 2)} s | "f"P95: {round(latency_pct[95] or 0, 2)} s"),
+                ("Min/Max Latency", f"{round(run_stats['latency_min'], 2)} s | {round(run_stats['latency_max'], 2)} s"),
             ]
 
             top_cols = st.columns(4)
@@ -357,36 +628,58 @@ elif st.session_state.page == "Dashboard":
         except Exception as e:
             st.error(f"Failed to load or process file: {e}")
 
+        # Multi-target runs: every target measured under the same load, side by side
+        if target_color:
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Per-Target Comparison (same run, same load)]")
+                targets_df = target_summary(run_df)
+
+                target_cols = st.columns([5, 0.5, 5])
+                with target_cols[0]:
+                    melted_targets = targets_df.melt(
+                        id_vars="target",
+                        value_vars=["ttft_p50", "ttft_p95", "tpot_p50", "tpot_p95", "total_latency_p50", "total_latency_p95"],
+                        var_name="Metric", value_name="Value",
+                    )
+                    fig_targets = px.bar(
+                        melted_targets, x="Metric", y="Value", color="target", barmode="group",
+                        title="Latency Percentiles by Target",
+                        labels={"Value": "Latency (s)", "target": "Target"},
+                        color_discrete_sequence=[RED, LIGHT_BLUE, VIOLET, NAVY],
+                    )
+                    st.plotly_chart(fig_targets, use_container_width=True)
+                with target_cols[2]:
+                    fig_target_tp = px.bar(
+                        targets_df, x="target", y="tps", color="target",
+                        hover_data=["rps", "requests", "error_rate"],
+                        title="Throughput by Target",
+                        labels={"tps": "Tokens/sec", "target": "Target"},
+                        color_discrete_sequence=[RED, LIGHT_BLUE, VIOLET, NAVY],
+                    )
+                    st.plotly_chart(fig_target_tp, use_container_width=True)
+
+                st.dataframe(targets_df.round(4), use_container_width=True, hide_index=True)
+            except Exception as e:
+                st.error(f"Error comparing targets: {e}")
+
         # --- Bar Chart ---
         st.markdown("---")  # Horizontal divider
         st.subheader(":blue[Benchmark Comparison: Latency & Throughput]")
         try:
             comparison_data = []
 
+            # Summaries come from the persistent run index; only new or changed runs are re-read
+            run_entries = get_run_index(DATA_DIR).refresh(metric_files)
             for file in metric_files:
-                compare_df = pd.read_csv(os.path.join(DATA_DIR, file))
-                compare_df["timestamp"] = pd.to_datetime(compare_df["timestamp"])
-                duration_sec = max((compare_df["timestamp"].max() - compare_df["timestamp"].min()).total_seconds(), 1)
-
-                test_rps = round(len(compare_df) / duration_sec, 2)
-                total_tokens = compare_df["tokens_per_request"].sum()
-                test_tps = round(total_tokens / duration_sec, 2)
-
-                config_filename = file.replace("_metrics.csv", "_config.json")
-                try:
-                    with open(os.path.join(DATA_DIR, config_filename), "r") as config_file:
-                        config = json.load(config_file)
-                        test_id = f"{config['users']}u_{config['spawn_rate']}u/s_{config['run_time']}"
-                except:
-                    test_id = file.replace("_metrics.csv", "")
-
+                summary = run_entries[file]["summary"]
                 comparison_data.append({
-                    "Test": test_id,
-                    "Max TTFT": compare_df["ttft"].max(),
-                    "Max TPOT": compare_df["tpot"].max(),
-                    "Max Total Latency": compare_df["total_latency"].max(),
-                    "RPS": test_rps,
-                    "TPS": test_tps
+                    "Test": run_entries[file]["test"],
+                    "Max TTFT": summary["max_ttft"],
+                    "Max TPOT": summary["max_tpot"],
+                    "Max Total Latency": summary["max_latency"],
+                    "RPS": summary["rps"],
+                    "TPS": summary["tps"]
                 })
 
 
@@ -398,17 +691,14 @@ elif st.session_state.page == "Dashboard":
                 value_vars=["Max TTFT", "Max TPOT", "Max Total Latency"],
                 var_name="Metric", value_name="Value"
             )
-            melted_latency["Hover"] = melted_latency.apply(
-                lambda row: f"{row['Metric']}: {row['Value']:.2f} s<br>Test: {row['Test']}", axis=1)
+            melted_latency["Hover"] = hover_labels(melted_latency, "s")
 
             melted_throughput = comp_df.melt(
                 id_vars="Test",
                 value_vars=["RPS", "TPS"], 
                 var_name="Metric", value_name="Value"
             )
-            melted_throughput["Hover"] = melted_throughput.apply(
-                lambda row: f"{row['Metric']}: {row['Value']:.2f} req/sec" if "RPS" in row["Metric"]
-                else f"{row['Metric']}: {row['Value']:.2f} tokens/sec<br>Test: {row['Test']}", axis=1)
+            melted_throughput["Hover"] = hover_labels(melted_throughput, {"RPS": "req/sec", "TPS": "tokens/sec"})
 
             # --- Layout container ---
             with st.container():
@@ -451,64 +741,749 @@ elif st.session_state.page == "Dashboard":
         except Exception as e:
             st.error(f"Error loading comparison data: {e}")
 
-
-        # Distribution Plots metric vs concurrency and Time
+        # Run-to-run regression check (bootstrap CIs on percentile differences)
         try:
             st.markdown("---")
-            st.subheader(":blue[Metric Trends Across Load and Time]")
+            st.subheader(":blue[Run-to-Run Regression Check]")
+            if len(metric_files) < 2:
+                st.info("At least two runs are needed for a regression check.")
+            else:
+                reg_col1, reg_col2 = st.columns(2)
+                with reg_col1:
+                    baseline_file = st.selectbox("Baseline run:", metric_files, index=1 if metric_files[0] == selected_file else 0, key="regression_baseline")
+                with reg_col2:
+                    candidate_file = st.selectbox("Candidate run:", metric_files, index=metric_files.index(selected_file), key="regression_candidate")
+                reg_col3, reg_col4, reg_col5 = st.columns(3)
+                with reg_col3:
+                    warmup = st.number_input("Extra warm-up to trim (sec)", min_value=0, value=0, step=5, key="regression_warmup")
+                with reg_col4:
+                    confidence = st.selectbox("Confidence", [0.90, 0.95, 0.99], index=1, key="regression_confidence")
+                with reg_col5:
+                    min_effect = st.number_input("Minimum effect (%)", min_value=0.0, value=5.0, step=1.0, key="regression_min_effect")
+                steady_only = st.checkbox("Compare each run's steady-state window", value=True, key="regression_steady")
+
+                baseline_path = os.path.join(DATA_DIR, baseline_file)
+                candidate_path = os.path.join(DATA_DIR, candidate_file)
+                with st.spinner("Bootstrapping percentile differences..."):
+                    report = compare_runs_cached(
+                        baseline_path, candidate_path,
+                        [file_signature(p) for p in (baseline_path, candidate_path, config_path_for(baseline_path), config_path_for(candidate_path))],
+                        warmup, confidence, min_effect, steady_only,
+                    )
 
-            available_metrics = ["ttft", "tpot", "total_latency", "tps"]
+                regressions = report[report["regression"]]
+                if not regressions.empty:
+                    st.error("Significant regression: " + ", ".join(regressions["metric"] + " " + regressions["statistic"]))
+                else:
+                    st.success(f"No significant regression at {confidence:.0%} confidence.")
+
+                report["label"] = report["metric"] + " " + report["statistic"]
+                fig_ci = px.scatter(
+                    report,
+                    x="diff_pct",
+                    y="label",
+                    color="regression",
+                    error_x=100 * (report["ci_high"] - report["diff"]) / report["baseline"],
+                    error_x_minus=100 * (report["diff"] - report["ci_low"]) / report["baseline"],
+                    title="Candidate vs Baseline (% change with confidence interval)",
+                    labels={"diff_pct": "Change (%)", "label": "Metric"},
+                    color_discrete_map={True: RED, False: LIGHT_BLUE},
+                )
+                fig_ci.add_vline(x=0, line_dash="dash", line_color=NAVY)
+                st.plotly_chart(fig_ci, use_container_width=True)
+                st.dataframe(report.drop(columns=["label"]).round(4), use_container_width=True)
+        except Exception as e:
+            st.error(f"Error comparing runs: {e}")
 
-            unit_map = {
-                "ttft": "s",
-                "tpot": "s",
-                "total_latency": "s",
-                "tps": "tokens/sec"
-            }
 
-            plot_col1, spacer, plot_col2 = st.columns([5, 0.5, 5])
-
-            with plot_col1:
-                y_metric_1 = st.selectbox("Y-Axis (vs Concurrent Requests):", available_metrics, key="select_concurrent")
-                fig_concurrent = px.scatter(
-                    df,
-                    x="concurrent_requests",
-                    y=y_metric_1,
-                    title=f"{y_metric_1} vs Concurrent Requests",
-                    labels={
-                        "concurrent_requests": "Concurrent Requests",
-                        y_metric_1: f"{y_metric_1} ({unit_map.get(y_metric_1, '')})"
-                    },
-                    color_discrete_sequence=[RED]
+        # Distribution Plots metric vs concurrency and Time
+        if df is not None:
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Metric Trends Across Load and Time]")
+
+                available_metrics = [m for m in ["ttft", "tpot", "total_latency", "tps", "itl_p50", "itl_p99", "max_stall"] if m in df.columns]
+
+                unit_map = {
+                    "ttft": "s",
+                    "tpot": "s",
+                    "total_latency": "s",
+                    "tps": "tokens/sec",
+                    "itl_p50": "s",
+                    "itl_p99": "s",
+                    "max_stall": "s"
+                }
+
+                # Time-weighted in-flight average per request when recorded, else the count at request start
+                x_load = load_column(df)
+                x_load_label = "Avg Concurrent Requests (while running)" if x_load == "avg_concurrency" else "Concurrent Requests"
+
+                plot_col1, spacer, plot_col2 = st.columns([5, 0.5, 5])
+
+                with plot_col1:
+                    y_metric_1 = st.selectbox("Y-Axis (vs Concurrent Requests):", available_metrics, key="select_concurrent")
+                    if len(df) <= MAX_RAW_SCATTER_POINTS:
+                        fig_concurrent = px.scatter(
+                            df,
+                            x=x_load,
+                            y=y_metric_1,
+                            color=target_color,
+                            title=f"{y_metric_1} vs Concurrent Requests",
+                            labels={
+                                x_load: x_load_label,
+                                y_metric_1: f"{y_metric_1} ({unit_map.get(y_metric_1, '')})"
+                            },
+                            color_discrete_sequence=[RED, LIGHT_BLUE, VIOLET, NAVY]
+                        )
+                        fig_concurrent.update_traces(mode="markers")
+                    else:
+                        # Large runs: percentile bands per load bin instead of one marker per request
+                        bands, outliers = load_bands_cached(file_path, file_signature(file_path), x_load, (y_metric_1,), target_color)
+                        fig_concurrent = band_figure(
+                            bands, outliers, x_load,
+                            title=f"{y_metric_1} vs Concurrent Requests (p50/p95/p99 bands)",
+                            labels={x_load: x_load_label, "value": f"{y_metric_1} ({unit_map.get(y_metric_1, '')})", "band": "Percentile"},
+                            group=target_color,
+                            colors=[RED, LIGHT_BLUE, VIOLET, NAVY],
+                        )
+                    st.plotly_chart(fig_concurrent, use_container_width=True)
+
+                with plot_col2:
+                    y_metric_2 = st.selectbox("Y-Axis (vs Timestamp):", available_metrics, key="select_time")
+                    # LTTB keeps the line's peaks and dips in at most MAX_SERIES_POINTS points per line
+                    fig_time = px.line(
+                        load_series_cached(file_path, file_signature(file_path), "timestamp", (y_metric_2,), target_color),
+                        x="timestamp",
+                        y="value",
+                        color=target_color,
+                        title=f"{y_metric_2} over Time",
+                        labels={
+                            "timestamp": "Timestamp",
+                            "value": f"{y_metric_2} ({unit_map.get(y_metric_2, '')})"
+                        },
+                        color_discrete_sequence=[VIOLET, RED, LIGHT_BLUE, NAVY]
+                    )
+                    if window and window.get("method") != "full":
+                        window_start, window_end = window_bounds(df, window)
+                        fig_time.add_vrect(x0=window_start, x1=window_end, fillcolor=LIGHT_BLUE, opacity=0.08, line_width=0,
+                                           annotation_text="steady state", annotation_position="top left")
+                    st.plotly_chart(fig_time, use_container_width=True)
+
+            except Exception as e:
+                st.error(f"Error generating interactive graphs: {e}")
+
+        # Latency broken down by prompt and output length bins
+        if df is not None and "input_bin" in df.columns and df["input_bin"].notna().any():
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Latency by Prompt and Output Size]")
+
+                bin_col1, spacer, bin_col2 = st.columns([5, 0.5, 5])
+
+                with bin_col1:
+                    y_metric_bin = st.selectbox("Y-Axis (vs Input Length):", ["ttft", "total_latency", "tpot"], key="select_input_bin")
+                    fig_in_bin = px.box(
+                        df[df["status"] == "success"],
+                        x="input_bin",
+                        y=y_metric_bin,
+                        color=target_color,
+                        category_orders={"input_bin": LENGTH_BIN_LABELS},
+                        title=f"{y_metric_bin} by Input Length (tokens)",
+                        labels={"input_bin": "Input Length (tokens)", y_metric_bin: f"{y_metric_bin} (s)"},
+                        color_discrete_sequence=[LIGHT_BLUE, RED, VIOLET, NAVY]
+                    )
+                    st.plotly_chart(fig_in_bin, use_container_width=True)
+
+                with bin_col2:
+                    y_metric_out = st.selectbox("Y-Axis (vs Output Length):", ["total_latency", "tpot", "ttft"], key="select_output_bin")
+                    fig_out_bin = px.box(
+                        df[df["status"] == "success"],
+                        x="output_bin",
+                        y=y_metric_out,
+                        color=target_color,
+                        category_orders={"output_bin": LENGTH_BIN_LABELS},
+                        title=f"{y_metric_out} by Output Length (tokens)",
+                        labels={"output_bin": "Output Length (tokens)", y_metric_out: f"{y_metric_out} (s)"},
+                        color_discrete_sequence=[VIOLET, RED, LIGHT_BLUE, NAVY]
+                    )
+                    st.plotly_chart(fig_out_bin, use_container_width=True)
+
+            except Exception as e:
+                st.error(f"Error generating prompt size graphs: {e}")
+
+        # Inter-token latency distribution and ITL vs concurrency
+        chunks_path = os.path.join(DATA_DIR, f"{timestamp_prefix}_chunks.bin")
+        if df is not None and os.path.exists(chunks_path) and "itl_p99" in df.columns:
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Inter-Token Latency]")
+
+                itl_ms = load_itl_gaps_cached(chunks_path, file_signature(chunks_path)) * 1000
+
+                itl_col1, spacer, itl_col2 = st.columns([5, 0.5, 5])
+
+                with itl_col1:
+                    fig_itl_hist = px.histogram(
+                        x=itl_ms,
+                        nbins=100,
+                        log_y=True,
+                        title="Inter-Token Latency Distribution (all chunks)",
+                        labels={"x": "Inter-Token Latency (ms)"},
+                        color_discrete_sequence=[LIGHT_BLUE]
+                    )
+                    fig_itl_hist.update_layout(yaxis_title="Chunks")
+                    st.plotly_chart(fig_itl_hist, use_container_width=True)
+
+                with itl_col2:
+                    itl_columns = ("itl_p50", "itl_p99", "max_stall")
+                    if len(df) <= MAX_RAW_SCATTER_POINTS:
+                        itl_df = df.melt(
+                            id_vars=x_load,
+                            value_vars=list(itl_columns),
+                            var_name="Metric", value_name="Value"
+                        ).dropna()
+                        fig_itl_conc = px.scatter(
+                            itl_df,
+                            x=x_load,
+                            y="Value",
+                            color="Metric",
+                            title="Per-Request ITL vs Concurrent Requests",
+                            labels={x_load: x_load_label, "Value": "ITL (s)"},
+                            color_discrete_sequence=[VIOLET, RED, NAVY]
+                        )
+                    else:
+                        bands, outliers = load_bands_cached(file_path, file_signature(file_path), x_load, itl_columns)
+                        fig_itl_conc = band_figure(
+                            bands, outliers, x_load,
+                            title="Per-Request ITL vs Concurrent Requests (p50/p95/p99 bands)",
+                            labels={x_load: x_load_label, "value": "ITL (s)", "series": "Metric", "band": "Percentile"},
+                            colors=[VIOLET, RED, NAVY],
+                        )
+                    st.plotly_chart(fig_itl_conc, use_container_width=True)
+
+            except Exception as e:
+                st.error(f"Error generating inter-token latency graphs: {e}")
+
+        # Prefix cache: TTFT for requests whose prefix was sent before vs new prefixes
+        prefix_stats = prefix_cache_summary(run_df) if run_df is not None else None
+        if prefix_stats is not None:
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Prefix Cache]")
+
+                pc_cards = [
+                    ("Prefix Hit Rate", f"{prefix_stats['hit_rate']:.1f}%"),
+                    ("TTFT p50 (Hit)", f"{prefix_stats['ttft_hit_p50']:.3f} s"),
+                    ("TTFT p50 (Miss)", f"{prefix_stats['ttft_miss_p50']:.3f} s"),
+                    ("TTFT Saved on Hits", f"{prefix_stats['ttft_saving_pct']:.1f}%"),
+                ]
+                pc_cols = st.columns(4)
+                for col, (label, value) in zip(pc_cols, pc_cards):
+                    with col:
+                        st.markdown(f"""
+                        <div class="metric-card">
+                            <div class="metric-label">{label}</div>
+                            <div class="metric-value">{value}</div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+                prefix_df = df[(df["status"] == "success") & df["prefix_hit"].notna()].assign(
+                    Prefix=lambda d: np.where(d["prefix_hit"] == 1, "hit", "miss")
+                )
+                pc_col1, spacer, pc_col2 = st.columns([5, 0.5, 5])
+
+                with pc_col1:
+                    fig_prefix = px.box(
+                        prefix_df,
+                        x="Prefix",
+                        y="ttft",
+                        color="Prefix",
+                        category_orders={"Prefix": ["hit", "miss"]},
+                        title="TTFT for Prefix Hits vs Misses",
+                        labels={"ttft": "TTFT (s)"},
+                        color_discrete_map={"hit": LIGHT_BLUE, "miss": RED}
+                    )
+                    st.plotly_chart(fig_prefix, use_container_width=True)
+
+                with pc_col2:
+                    fig_distance = px.scatter(
+                        prefix_df[prefix_df["Prefix"] == "hit"],
+                        x="reuse_distance",
+                        y="ttft",
+                        log_x=True,
+                        title="Hit TTFT vs Reuse Distance",
+                        labels={"reuse_distance": "Reuse Distance (requests since prefix was last sent)", "ttft": "TTFT (s)"},
+                        color_discrete_sequence=[VIOLET]
+                    )
+                    st.plotly_chart(fig_distance, use_container_width=True)
+
+            except Exception as e:
+                st.error(f"Error generating prefix cache graphs: {e}")
+
+        # Client-side connection setup vs model latency
+        if run_df is not None and "time_to_headers" in df.columns and df["time_to_headers"].notna().any():
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Connection Overhead]")
+
+                http_config = config.get("http_client") or {}
+                reused = run_df["reused_connection"].dropna()
+                conn_cards = [
+                    ("Client", f"{http_config.get('backend', '-')} (pool {http_config.get('pool_size', '-')}, "
+                               f"keep-alive {'on' if http_config.get('keep_alive', True) else 'off'})"),
+                    ("Connection Reuse", f"{reused.mean() * 100:.1f}%" if len(reused) else "-"),
+                    ("Time to Headers (Avg)", f"{run_df['time_to_headers'].mean():.3f} s"),
+                    ("Connect + TLS (Avg, new connections)",
+                     f"{run_df['connect_time'].mean():.3f} s + {run_df['tls_time'].mean() if run_df['tls_time'].notna().any() else 0:.3f} s"
+                     if run_df["connect_time"].notna().any() else "-"),
+                ]
+                conn_cols = st.columns(4)
+                for col, (label, value) in zip(conn_cols, conn_cards):
+                    with col:
+                        st.markdown(f"""
+                        <div class="metric-card">
+                            <div class="metric-label">{label}</div>
+                            <div class="metric-value">{value}</div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+                conn_col1, spacer, conn_col2 = st.columns([5, 0.5, 5])
+
+                with conn_col1:
+                    overhead_df = df.melt(
+                        value_vars=["connect_time", "tls_time", "time_to_headers", "ttft"],
+                        var_name="Phase", value_name="Seconds"
+                    ).dropna()
+                    fig_overhead = px.box(
+                        overhead_df,
+                        x="Phase",
+                        y="Seconds",
+                        title="Connect, TLS, Time to Headers and TTFT",
+                        color_discrete_sequence=[LIGHT_BLUE]
+                    )
+                    st.plotly_chart(fig_overhead, use_container_width=True)
+
+                with conn_col2:
+                    if len(df) <= MAX_RAW_SCATTER_POINTS:
+                        headers_df = df.dropna(subset=["time_to_headers"]).assign(
+                            Connection=lambda d: np.where(d["reused_connection"] == 1, "reused", "new")
+                        )
+                        fig_headers = px.scatter(
+                            headers_df,
+                            x=x_load,
+                            y="time_to_headers",
+                            color="Connection",
+                            title="Time to Headers vs Concurrent Requests",
+                            labels={x_load: x_load_label, "time_to_headers": "Time to Headers (s)"},
+                            color_discrete_map={"reused": LIGHT_BLUE, "new": RED}
+                        )
+                    else:
+                        bands, outliers = load_bands_cached(file_path, file_signature(file_path), x_load, ("time_to_headers",),
+                                                            "reused_connection")
+                        bands["reused_connection"] = np.where(bands["reused_connection"] == 1, "reused", "new")
+                        fig_headers = band_figure(
+                            bands, outliers, x_load,
+                            title="Time to Headers vs Concurrent Requests (p50/p95/p99 bands)",
+                            labels={x_load: x_load_label, "value": "Time to Headers (s)", "reused_connection": "Connection",
+                                    "band": "Percentile"},
+                            group="reused_connection",
+                            colors=[LIGHT_BLUE, RED],
+                        )
+                    st.plotly_chart(fig_headers, use_container_width=True)
+
+            except Exception as e:
+                st.error(f"Error generating connection overhead graphs: {e}")
+
+        # Load generator self-monitoring: was the client the bottleneck?
+        harness_path = os.path.join(DATA_DIR, f"{timestamp_prefix}_harness.csv")
+        if os.path.exists(harness_path):
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Client Health]")
+
+                harness_df = pd.read_csv(harness_path)
+                harness_df["timestamp"] = pd.to_datetime(harness_df["timestamp"], unit="s", utc=True).dt.tz_convert(None)
+                harness_df["process"] = harness_df["process"].astype(str)
+
+                health_col1, spacer, health_col2 = st.columns([5, 0.5, 5])
+
+                with health_col1:
+                    fig_cpu = px.line(
+                        harness_df,
+                        x="timestamp",
+                        y="cpu_percent",
+                        color="process",
+                        title="Load Generator CPU (% of one core)",
+                        labels={"timestamp": "Time (UTC)", "cpu_percent": "CPU (%)", "process": "Process"}
+                    )
+                    fig_cpu.add_hline(y=CPU_SATURATION_PERCENT, line_dash="dash", line_color=RED)
+                    st.plotly_chart(fig_cpu, use_container_width=True)
+
+                with health_col2:
+                    fig_lag = px.line(
+                        harness_df,
+                        x="timestamp",
+                        y="sched_lag_ms",
+                        color="process",
+                        title="Scheduling Lag (greenlet / event loop)",
+                        labels={"timestamp": "Time (UTC)", "sched_lag_ms": "Lag (ms)", "process": "Process"}
+                    )
+                    fig_lag.add_hline(y=LAG_SATURATION_MS, line_dash="dash", line_color=RED)
+                    st.plotly_chart(fig_lag, use_container_width=True)
+
+                client_health = config.get("client_health") or {}
+                st.markdown(
+                    f"**Time parsing SSE:** `{client_health.get('parse_percent', '-')}%` &nbsp; | &nbsp; "
+                    f"**Time recording metrics:** `{client_health.get('write_percent', '-')}%` of wall time"
                 )
-                fig_concurrent.update_traces(mode="markers")
-                st.plotly_chart(fig_concurrent, use_container_width=True)
 
-            with plot_col2:
-                y_metric_2 = st.selectbox("Y-Axis (vs Timestamp):", available_metrics, key="select_time")
-                fig_time = px.line(
-                    df,
+                profile_path = os.path.join(DATA_DIR, f"{timestamp_prefix}_profile.folded")
+                if os.path.exists(profile_path):
+                    with open(profile_path, "rb") as f:
+                        st.download_button("Download Streaming Loop Profile (collapsed stacks)", f.read(),
+                                           file_name=os.path.basename(profile_path))
+
+            except Exception as e:
+                st.error(f"Error generating client health graphs: {e}")
+
+        # Mock server runs: the server's true latencies are known, so the gap is the harness's own error
+        mock_path = os.path.join(DATA_DIR, f"{timestamp_prefix}_mock.json")
+        if run_df is not None and os.path.exists(mock_path):
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Harness Measurement Error (Mock Server)]")
+
+                with open(mock_path) as f:
+                    truth = json.load(f)
+                # Latency percentiles and tokens/sec both come from the same (windowed) frame
+                error_df = harness_error(run_df, truth)
+                measured_tps = throughput(run_df)[0]
+                mock_options = truth.get("options") or {}
+                st.markdown(
+                    f"**Server schedule:** TTFT `{mock_options.get('ttft')}` s, ITL `{mock_options.get('itl')}` s, "
+                    f"tokens `{mock_options.get('tokens')}`, slowdown `{mock_options.get('slowdown')}` above `{mock_options.get('knee')}` in flight"
+                    f" &nbsp; | &nbsp; **Server tokens/sec:** `{truth.get('tokens_per_sec')}` vs measured `{measured_tps:.2f}`"
+                    f" &nbsp; | &nbsp; **Peak in flight:** `{truth.get('peak_in_flight')}`"
+                )
+
+                if not error_df.empty:
+                    error_df["label"] = error_df["metric"] + " " + error_df["percentile"]
+                    fig_error = px.bar(
+                        error_df.melt(id_vars="label", value_vars=["server", "measured"], var_name="Source", value_name="Seconds"),
+                        x="label",
+                        y="Seconds",
+                        color="Source",
+                        barmode="group",
+                        title="Server-Emitted vs Harness-Measured Latency",
+                        labels={"label": "Metric"},
+                        color_discrete_sequence=[NAVY, RED]
+                    )
+                    st.plotly_chart(fig_error, use_container_width=True)
+                    st.dataframe(error_df.drop(columns=["label"]).round(4), use_container_width=True, hide_index=True)
+
+            except Exception as e:
+                st.error(f"Error comparing against the mock server: {e}")
+
+        # In-flight, queued and active users sampled at a fixed interval (not per request)
+        timeline_path = os.path.join(DATA_DIR, f"{timestamp_prefix}_concurrency.csv")
+        if os.path.exists(timeline_path):
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Concurrency Timeline]")
+
+                timeline_series = load_timeline_series_cached(timeline_path, file_signature(timeline_path),
+                                                              ("in_flight_avg", "queued", "active_users"))
+                fig_timeline = px.line(
+                    timeline_series,
                     x="timestamp",
-                    y=y_metric_2,
-                    title=f"{y_metric_2} over Time",
-                    labels={
-                        "timestamp": "Timestamp",
-                        y_metric_2: f"{y_metric_2} ({unit_map.get(y_metric_2, '')})"
-                    },
-                    color_discrete_sequence=[VIOLET]
+                    y="value",
+                    color="series",
+                    title="In-Flight Requests (time-weighted), Queued Requests and Active Users",
+                    labels={"timestamp": "Time (UTC)", "value": "Count", "series": "Series"},
+                    color_discrete_sequence=[LIGHT_BLUE, RED, NAVY]
                 )
-                st.plotly_chart(fig_time, use_container_width=True)
+                st.plotly_chart(fig_timeline, use_container_width=True)
+
+            except Exception as e:
+                st.error(f"Error generating concurrency timeline: {e}")
+
+        # Capacity search: throughput vs latency per held level, with the knee marked
+        capacity_path = os.path.join(DATA_DIR, f"{timestamp_prefix}_capacity.json")
+        if os.path.exists(capacity_path):
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Capacity Search]")
+
+                with open(capacity_path) as f:
+                    capacity_results = json.load(f)
+                curve_df = pd.DataFrame(capacity_results.get("curve", []))
+
+                cap_cols = st.columns(3)
+                for col, (label, value) in zip(cap_cols, [
+                    ("Max Sustainable Users (SLOs met)", capacity_results.get("max_sustainable_users") or "-"),
+                    ("Knee of the Curve (users)", capacity_results.get("knee_users") or "-"),
+                    ("First Failing Level (users)", capacity_results.get("first_failing_users") or "-"),
+                ]):
+                    with col:
+                        st.markdown(f"""
+                        <div class="metric-card">
+                            <div class="metric-label">{label}</div>
+                            <div class="metric-value">{value}</div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+                if not curve_df.empty:
+                    curve_df = curve_df.sort_values("rps")
+                    curve_df["SLO"] = np.where(curve_df["slo_met"], "met", "broken")
+                    fig_cap = px.line(
+                        curve_df,
+                        x="rps",
+                        y="latency_p95",
+                        text="users",
+                        markers=True,
+                        title="Throughput vs p95 Latency per Concurrency Level",
+                        labels={"rps": "Throughput (req/sec)", "latency_p95": "Latency p95 (s)", "users": "Users"},
+                        hover_data=["users", "tps", "ttft_p95", "tpot_p95", "error_rate"],
+                        color_discrete_sequence=[LIGHT_BLUE]
+                    )
+                    fig_cap.update_traces(textposition="top center")
+                    broken = curve_df[~curve_df["slo_met"]]
+                    fig_cap.add_scatter(x=broken["rps"], y=broken["latency_p95"], mode="markers", name="SLO broken",
+                                        marker=dict(color=RED, size=12, symbol="x"))
+                    knee = curve_df[curve_df["users"] == capacity_results.get("knee_users")]
+                    if not knee.empty:
+                        fig_cap.add_scatter(x=knee["rps"], y=knee["latency_p95"], mode="markers", name="Knee",
+                                            marker=dict(color=VIOLET, size=16, symbol="star"))
+                    st.plotly_chart(fig_cap, use_container_width=True)
+
+            except Exception as e:
+                st.error(f"Error generating capacity search graphs: {e}")
+
+        # Windowed percentiles from the load generator's streaming sketches (no raw rows needed)
+        sketches_path = os.path.join(DATA_DIR, f"{timestamp_prefix}_sketches.json")
+        if os.path.exists(sketches_path):
+            try:
+                st.markdown("---")
+                st.subheader(":blue[Latency Percentiles Over Time]")
+
+                sketch_metric = st.selectbox("Metric:", SKETCH_METRICS, key="select_sketch_metric")
+                sketch_df = load_sketch_quantiles_cached(sketches_path, file_signature(sketches_path), sketch_metric)
+                if sketch_df.empty:
+                    st.info(f"No `{sketch_metric}` samples were recorded in this run's sketches.")
+                else:
+                    fig_sketch = px.line(
+                        sketch_df,
+                        x="window_start",
+                        y=[quantile_label(q) for q in SKETCH_QUANTILES],
+                        title=f"{sketch_metric} p50 / p95 / p99 / p99.9 per Window",
+                        labels={"window_start": "Window Start (UTC)", "value": f"{sketch_metric} (s)", "variable": "Percentile"},
+                        color_discrete_sequence=[LIGHT_BLUE, VIOLET, RED, NAVY]
+                    )
+                    st.plotly_chart(fig_sketch, use_container_width=True)
 
-        except Exception as e:
-            st.error(f"Error generating interactive graphs: {e}")
+            except Exception as e:
+                st.error(f"Error generating percentile sketch graphs: {e}")
 
 
+# --- Page: History ---
+elif st.session_state.page == "History":
+    st.title(":blue[Run History]")
 
+    # Bring CSV runs into the columnar store (only new or changed runs are rewritten)
+    with st.spinner("Compacting runs..."):
+        compact_all("data")
 
+    filter_cols = st.columns(3)
+    today = datetime.today().date()
+    date_range = filter_cols[0].date_input("Date Range:", value=(today - timedelta(days=30), today))
+    endpoints = filter_cols[1].multiselect("Endpoints:", list_endpoints())
+    models = filter_cols[2].multiselect("Models:", list_models())
+    history_steady_only = st.checkbox("Steady-state windows only (drop each run's ramp-up and drain)", value=True, key="history_steady")
 
+    if not isinstance(date_range, (list, tuple)) or len(date_range) != 2:
+        st.info("Select a start and end date.")
+    else:
+        try:
+            history_df = load_history_cached(
+                date_range[0].strftime("%Y-%m-%d"), date_range[1].strftime("%Y-%m-%d"),
+                tuple(endpoints), tuple(models), store_signature(), history_steady_only
+            )
+            if history_df.empty:
+                st.warning("No runs found for these filters.")
+            else:
+                history_metric = st.selectbox("Latency Metric:", ["ttft", "tpot", "total_latency"], key="select_history_metric")
+                hist_col1, spacer, hist_col2 = st.columns([5, 0.5, 5])
+
+                with hist_col1:
+                    fig_hist_lat = px.line(
+                        history_df,
+                        x="start",
+                        y=f"{history_metric}_p95",
+                        color="endpoint",
+                        markers=True,
+                        hover_data=["run_id", "model", f"{history_metric}_p50"],
+                        title=f"{history_metric} p95 per Run",
+                        labels={"start": "Run Start", f"{history_metric}_p95": f"{history_metric} p95 (s)"}
+                    )
+                    st.plotly_chart(fig_hist_lat, use_container_width=True)
+
+                with hist_col2:
+                    fig_hist_tp = px.scatter(
+                        history_df,
+                        x="start",
+                        y="tps",
+                        color="endpoint",
+                        size="requests",
+                        hover_data=["run_id", "model", "rps", "error_rate"],
+                        title="Throughput per Run",
+                        labels={"start": "Run Start", "tps": "Tokens/sec"}
+                    )
+                    st.plotly_chart(fig_hist_tp, use_container_width=True)
 
+                st.dataframe(history_df.sort_values("start", ascending=False), use_container_width=True, hide_index=True)
 
-        
+        except Exception as e:
+            st.error(f"Error loading run history: {e}")
+
+
+# --- Page: Sweeps ---
+elif st.session_state.page == "Sweeps":
+    st.title(":blue[Parameter Sweeps]")
+
+    def parse_int_list(text):
+        return [int(v) for v in text.replace(",", " ").split()]
+
+    with st.expander("New Sweep", expanded=not list_sweeps()):
+        with st.form("sweep_form"):
+            sweep_url = st.text_input("Target URL", value="https://your-model-endpoint.com")
+            axis_cols = st.columns(3)
+            sweep_users = axis_cols[0].text_input("Users (list)", value="10, 50, 100")
+            sweep_prompts = axis_cols[1].text_input("Prompt Length (words, list; blank = default prompt)", value="128, 1024")
+            sweep_max_tokens = axis_cols[2].text_input("Max Tokens (list; blank = uncapped)", value="256")
+            run_cols = st.columns(5)
+            sweep_spawn_rate = run_cols[0].number_input("Spawn Rate (users/sec)", min_value=1, value=10)
+            sweep_run_time = run_cols[1].text_input("Run Time per Config", value="1m")
+            sweep_engine = run_cols[2].selectbox("Load Engine", ENGINES)
+            sweep_workers = run_cols[3].number_input("Worker Processes", min_value=0, value=0)
+            sweep_cooldown = run_cols[4].number_input("Cooldown (sec)", min_value=0, value=30)
+            sweep_name = st.text_input("Name (optional)", value="")
+            sweep_submitted = st.form_submit_button("Queue and Start Sweep")
+
+        if sweep_submitted:
+            try:
+                configs = expand_grid({
+                    "users": parse_int_list(sweep_users),
+                    "prompt_tokens": parse_int_list(sweep_prompts),
+                    "max_tokens": parse_int_list(sweep_max_tokens),
+                })
+                base = {"target_url": sweep_url, "spawn_rate": sweep_spawn_rate, "run_time": sweep_run_time,
+                        "engine": sweep_engine, "workers": sweep_workers}
+                new_sweep = Sweep.create(base, configs, sweep_cooldown, sweep_name.strip().replace(" ", "_") or None)
+                start_sweep_runner(new_sweep)
+                st.success(f"Started sweep `{new_sweep.id}` with {len(configs)} runs.")
+            except ValueError as e:
+                st.error(f"Invalid sweep values: {e}")
+
+    sweep_paths = list_sweeps()
+    if not sweep_paths:
+        st.info("No sweeps yet.")
+    else:
+        selected_sweep = st.selectbox("Sweep:", sweep_paths, format_func=lambda p: os.path.basename(p).replace(".json", ""))
+        sweep = Sweep.load(selected_sweep)
+        running = sweep.is_running()
+        progress = sweep.progress()
+        finished = sum(n for status, n in progress.items() if status not in ("pending", "running"))
+        st.progress(finished / max(len(sweep.runs), 1))
+        st.markdown(
+            f"**State:** `{'running' if running else 'idle'}` &nbsp; | &nbsp; "
+            + " &nbsp; | &nbsp; ".join(f"**{status}:** `{n}`" for status, n in sorted(progress.items()))
+        )
+
+        action_cols = st.columns(3)
+        if action_cols[0].button("Refresh"):
+            st.rerun()
+        if running and action_cols[1].button("Cancel Sweep"):
+            sweep.request_cancel()
+            st.warning("Cancel requested; the current run is stopped and its partial results kept.")
+        if not running and progress.get("pending") and action_cols[2].button("Resume Sweep"):
+            start_sweep_runner(sweep)
+            st.rerun()
 
-    
+        st.dataframe(
+            pd.DataFrame([{**run["params"], "status": run["status"], "run_id": run["run_id"]} for run in sweep.runs]),
+            use_container_width=True, hide_index=True,
+        )
+
+        try:
+            results = sweep_results(sweep, get_run_index("data"))
+            if results.empty:
+                st.info("No finished runs yet.")
+            else:
+                st.markdown("---")
+                st.subheader(":blue[Sweep Results]")
+                sweep_metric = st.selectbox(
+                    "Metric:",
+                    ["ttft_p95", "ttft_p50", "tpot_p95", "tpot_p50", "total_latency_p95", "total_latency_p50", "tps", "rps", "error_rate"],
+                    key="select_sweep_metric",
+                )
+                # Axes that actually vary in this sweep; a third axis becomes a facet
+                varying = [axis for axis in SWEEP_AXES if results[axis].nunique(dropna=False) > 1]
+                x_axis = varying[0] if varying else "users"
+                y_axis = varying[1] if len(varying) > 1 else None
+                facet_axis = varying[2] if len(varying) > 2 else None
+                facet_value = None
+                if facet_axis:
+                    facet_value = st.selectbox(f"{facet_axis}:", sorted(results[facet_axis].dropna().unique()), key="select_sweep_facet")
+                view = results if facet_axis is None else results[results[facet_axis] == facet_value]
+
+                sweep_col1, spacer, sweep_col2 = st.columns([5, 0.5, 5])
+                with sweep_col1:
+                    if y_axis:
+                        grid = view.pivot_table(index=y_axis, columns=x_axis, values=sweep_metric, aggfunc="mean").sort_index()
+                        fig_heat = px.imshow(
+                            grid,
+                            text_auto=".2f",
+                            aspect="auto",
+                            color_continuous_scale="RdYlBu_r" if sweep_metric not in ("tps", "rps") else "RdYlBu",
+                            title=f"{sweep_metric} by {x_axis} and {y_axis}",
+                            labels={"x": x_axis, "y": y_axis, "color": sweep_metric},
+                        )
+                        fig_heat.update_xaxes(type="category")
+                        fig_heat.update_yaxes(type="category")
+                        st.plotly_chart(fig_heat, use_container_width=True)
+                    else:
+                        fig_sweep_bar = px.bar(view, x=x_axis, y=sweep_metric, title=f"{sweep_metric} by {x_axis}",
+                                               color_discrete_sequence=[LIGHT_BLUE])
+                        st.plotly_chart(fig_sweep_bar, use_container_width=True)
+
+                with sweep_col2:
+                    latency_metric = sweep_metric if sweep_metric not in ("tps", "rps", "error_rate") else "ttft_p95"
+                    fig_curve = px.line(
+                        view.sort_values(["users"]),
+                        x="tps",
+                        y=latency_metric,
+                        color=y_axis if y_axis and y_axis != "users" else None,
+                        markers=True,
+                        hover_data=["users", "run_id"],
+                        title=f"Latency vs Throughput ({latency_metric} vs tokens/sec)",
+                        labels={"tps": "Tokens/sec", latency_metric: f"{latency_metric} (s)"},
+                    )
+                    st.plotly_chart(fig_curve, use_container_width=True)
+
+                if y_axis:
+                    # Latency surface over the two main sweep axes, with throughput as color
+                    surface = view.pivot_table(index=y_axis, columns=x_axis, values=latency_metric, aggfunc="mean").sort_index()
+                    throughput_grid = view.pivot_table(index=y_axis, columns=x_axis, values="tps", aggfunc="mean").reindex_like(surface)
+                    fig_surface = go.Figure(go.Surface(
+                        x=surface.columns.astype(float), y=surface.index.astype(float), z=surface.values,
+                        surfacecolor=throughput_grid.values, colorscale="Viridis", colorbar={"title": "Tokens/sec"},
+                    ))
+                    fig_surface.update_layout(
+                        title=f"{latency_metric} Surface (color = tokens/sec)", height=550,
+                        scene={"xaxis_title": x_axis, "yaxis_title": y_axis, "zaxis_title": f"{latency_metric} (s)"},
+                    )
+                    st.plotly_chart(fig_surface, use_container_width=True)
 
+                st.dataframe(results, use_container_width=True, hide_index=True)
+        except Exception as e:
+            st.error(f"Error loading sweep results: {e}")
@@ -0,0 +1,305 @@
+"""Parameter sweeps: run a grid of load test configurations one after another.
+
+A sweep is a persistent queue in `data/sweeps/<id>.json`. Every run keeps its
+own `_config.json` and `_metrics.csv`, and the queue is saved after every
+state change, so an interrupted sweep resumes where it stopped.
+
+    python sweep.py create --target-url https://endpoint --users 10 50 100 --prompt-tokens 128 1024 --max-tokens 128 512 --run
+    python sweep.py run <sweep_id>      # resume
+    python sweep.py cancel <sweep_id>
+    python sweep.py status [<sweep_id>]
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from launcher import (DATA_DIR, build_run_config, write_run_config, start_load_test, wait_for_processes, stop_processes,
+                      merge_shards, parse_run_time)
+
+SWEEP_DIR = os.path.join(DATA_DIR, "sweeps")
+SWEEP_AXES = ["users", "prompt_tokens", "max_tokens"]
+DEFAULT_COOLDOWN = 30  # sec between runs, so one run's queues drain before the next starts
+TIMEOUT_GRACE = 120  # sec past a run's run_time before it is stopped
+POLL_INTERVAL = 1.0
+
+
+# --- Sweep Definition ---
+def expand_grid(axes):
+    """Cartesian product of `{axis: [values]}` as a list of `{axis: value}` dicts (first axis varies slowest)."""
+    axes = {k: v for k, v in axes.items() if v}
+    return [dict(zip(axes, values)) for values in itertools.product(*axes.values())]
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except (OSError, TypeError):
+        return False
+    return True
+
+
+class Sweep:
+    """A persistent queue of run configurations.
+
+    `base` holds the settings shared by every run (target URL, spawn rate,
+    run time, engine, workers); each queued run adds its own `params`. Runs
+    move from `pending` to `running` and end `done`, `failed`, `timeout` or
+    `cancelled`.
+    """
+
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+
+    @classmethod
+    def create(cls, base, configs, cooldown=DEFAULT_COOLDOWN, name=None, sweep_dir=SWEEP_DIR):
+        sweep_id = datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + (f"_{name}" if name else "")
+        sweep = cls(os.path.join(sweep_dir, f"{sweep_id}.json"), {
+            "id": sweep_id,
+            "created": time.time(),
+            "base": base,
+            "cooldown": cooldown,
+            "runner_pid": None,
+            "runs": [{"index": i, "params": params, "status": "pending", "run_id": None} for i, params in enumerate(configs)],
+        })
+        sweep.save()
+        return sweep
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(path, json.load(f))
+
+    @property
+    def id(self):
+        return self.data["id"]
+
+    @property
+    def runs(self):
+        return self.data["runs"]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def progress(self):
+        counts = {}
+        for run in self.runs:
+            counts[run["status"]] = counts.get(run["status"], 0) + 1
+        return counts
+
+    def is_running(self):
+        return _pid_alive(self.data.get("runner_pid"))
+
+    # Cancellation is a flag file, so any process (CLI, Dashboard) can stop a running sweep
+    @property
+    def cancel_path(self):
+        return self.path.replace(".json", ".cancel")
+
+    def request_cancel(self):
+        open(self.cancel_path, "w").close()
+
+    def cancel_requested(self):
+        return os.path.exists(self.cancel_path)
+
+    def claim(self):
+        """Become this sweep's runner; runs left `running` by a dead runner go back to `pending`."""
+        if self.is_running() and self.data["runner_pid"] != os.getpid():
+            raise RuntimeError(f"Sweep {self.id} is already running (pid {self.data['runner_pid']})")
+        if os.path.exists(self.cancel_path):
+            os.remove(self.cancel_path)
+        for run in self.runs:
+            if run["status"] == "running":
+                run["status"] = "pending"
+        self.data["runner_pid"] = os.getpid()
+        self.save()
+
+    def release(self):
+        self.data["runner_pid"] = None
+        self.save()
+
+
+def list_sweeps(sweep_dir=SWEEP_DIR):
+    """Sweep files, newest first."""
+    return sorted(glob.glob(os.path.join(sweep_dir, "*.json")), reverse=True)
+
+
+# --- Running ---
+def run_params(sweep, run):
+    return {**sweep.data["base"], **run["params"]}
+
+
+def _new_timestamp_prefix():
+    # Runs are keyed by second; never reuse a prefix that already has files
+    while True:
+        prefix = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        if not glob.glob(os.path.join(DATA_DIR, f"{prefix}_*")):
+            return prefix
+        time.sleep(0.5)
+
+
+def run_one(sweep, run, poll_interval=POLL_INTERVAL):
+    """Run one queued configuration to completion, timeout or cancellation."""
+    params = run_params(sweep, run)
+    timestamp_prefix = _new_timestamp_prefix()
+    engine = params.get("engine", "locust")
+    workers = int(params.get("workers", 0))
+    synthetic = None
+    if params.get("prompt_tokens") or params.get("max_tokens"):
+        synthetic = {"prompt_tokens": int(params.get("prompt_tokens") or 128), "max_tokens": params.get("max_tokens")}
+
+    config_data = build_run_config(timestamp_prefix, params["target_url"], params["users"], params["spawn_rate"], params["run_time"],
+                                   workers, engine, synthetic=synthetic)
+    config_data["sweep"] = {"id": sweep.id, "index": run["index"], "params": run["params"]}
+    write_run_config(timestamp_prefix, config_data)
+
+    run.update({"status": "running", "run_id": timestamp_prefix, "started": time.time()})
+    sweep.save()
+    print(f"[sweep {sweep.id}] run {run['index'] + 1}/{len(sweep.runs)}: {run['params']} -> {timestamp_prefix}", flush=True)
+
+    processes = start_load_test(timestamp_prefix, params["target_url"], params["users"], params["spawn_rate"], params["run_time"],
+                                workers, engine, synthetic=synthetic)
+    deadline = time.monotonic() + parse_run_time(params["run_time"]) + TIMEOUT_GRACE
+    status = None
+    while processes[0].poll() is None:
+        if sweep.cancel_requested():
+            status = "cancelled"
+        elif time.monotonic() > deadline:
+            status = "timeout"
+        if status:
+            stop_processes(processes)
+            break
+        time.sleep(poll_interval)
+    returncode = wait_for_processes(processes, timeout=60)
+
+    merge_shards(timestamp_prefix)
+    metrics_path = os.path.join(DATA_DIR, f"{timestamp_prefix}_metrics.csv")
+    if os.path.exists(metrics_path):
+        from run_store import compact_run
+        from steady_state import record_steady_state
+        record_steady_state(metrics_path)
+        compact_run(metrics_path)
+    # locust exits 1 when any request failed; the run still counts as done if it produced metrics
+    run.update({
+        "status": status or ("done" if os.path.exists(metrics_path) else "failed"),
+        "returncode": returncode,
+        "finished": time.time(),
+    })
+    sweep.save()
+
+
+def _cooldown(sweep, seconds, poll_interval=POLL_INTERVAL):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline and not sweep.cancel_requested():
+        time.sleep(min(poll_interval, max(deadline - time.monotonic(), 0)))
+
+
+def run_sweep(sweep, poll_interval=POLL_INTERVAL):
+    """Work through the sweep's pending runs in order, with a cooldown between runs."""
+    sweep.claim()
+    try:
+        first = True
+        for run in sweep.runs:
+            if run["status"] != "pending":
+                continue
+            if sweep.cancel_requested():
+                break
+            if not first:
+                _cooldown(sweep, sweep.data.get("cooldown", DEFAULT_COOLDOWN), poll_interval)
+                if sweep.cancel_requested():
+                    break
+            first = False
+            run_one(sweep, run, poll_interval)
+        if sweep.cancel_requested():
+            for run in sweep.runs:
+                if run["status"] == "pending":
+                    run["status"] = "cancelled"
+    finally:
+        sweep.release()
+
+
+def start_sweep_runner(sweep):
+    """Run a sweep in a detached process that outlives the caller (e.g. a Streamlit rerun)."""
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "run", sweep.path], start_new_session=True)
+
+
+# --- Results ---
+def sweep_results(sweep, run_index):
+    """One row per finished run: its sweep parameters, error rate and the run index summary."""
+    import pandas as pd
+
+    finished = [r for r in sweep.runs if r.get("run_id") and os.path.exists(os.path.join(DATA_DIR, f"{r['run_id']}_metrics.csv"))]
+    entries = run_index.refresh([f"{r['run_id']}_metrics.csv" for r in finished])
+    rows = []
+    for run in finished:
+        summary = entries[f"{run['run_id']}_metrics.csv"]["summary"]
+        rows.append({
+            **{axis: run_params(sweep, run).get(axis) for axis in SWEEP_AXES},
+            "run_id": run["run_id"],
+            "status": run["status"],
+            "error_rate": summary["failures"] / summary["requests"] * 100 if summary["requests"] else None,
+            **summary,
+        })
+    return pd.DataFrame(rows)
+
+
+def _resolve(arg):
+    return arg if arg.endswith(".json") else os.path.join(SWEEP_DIR, f"{arg}.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a grid of load test configurations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="queue a new sweep")
+    create.add_argument("--target-url", required=True)
+    create.add_argument("--users", type=int, nargs="+", required=True)
+    create.add_argument("--prompt-tokens", type=int, nargs="+", help="synthetic prompt lengths (words)")
+    create.add_argument("--max-tokens", type=int, nargs="+", help="output caps")
+    create.add_argument("--spawn-rate", type=float, default=10)
+    create.add_argument("--run-time", default="1m")
+    create.add_argument("--engine", default="locust", choices=["locust", "asyncio"])
+    create.add_argument("--workers", type=int, default=0)
+    create.add_argument("--cooldown", type=float, default=DEFAULT_COOLDOWN)
+    create.add_argument("--name")
+    create.add_argument("--run", action="store_true", help="start running immediately")
+
+    for name in ("run", "cancel"):
+        sub = commands.add_parser(name)
+        sub.add_argument("sweep", help="sweep id or path")
+    status = commands.add_parser("status")
+    status.add_argument("sweep", nargs="?")
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        base = {"target_url": args.target_url, "spawn_rate": args.spawn_rate, "run_time": args.run_time,
+                "engine": args.engine, "workers": args.workers}
+        configs = expand_grid({"users": args.users, "prompt_tokens": args.prompt_tokens, "max_tokens": args.max_tokens})
+        sweep = Sweep.create(base, configs, args.cooldown, args.name)
+        print(f"Created sweep {sweep.id} with {len(configs)} runs: {sweep.path}")
+        if args.run:
+            run_sweep(sweep)
+    elif args.command == "run":
+        run_sweep(Sweep.load(_resolve(args.sweep)))
+    elif args.command == "cancel":
+        Sweep.load(_resolve(args.sweep)).request_cancel()
+    else:
+        paths = [_resolve(args.sweep)] if args.sweep else list_sweeps()
+        for path in paths:
+            sweep = Sweep.load(path)
+            state = "running" if sweep.is_running() else "idle"
+            print(f"{sweep.id}: {state} {sweep.progress()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
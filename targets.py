@@ -0,0 +1,102 @@
+import json
+import os
+
+from workload import CHAT_COMPLETIONS_PATH
+
+_MODEL_KEY = '{"model": '
+_decoder = json.JSONDecoder()
+
+
+def with_model(payload, model):
+    """Return a pre-encoded chat completions body with its `model` replaced.
+
+    Bodies from `workload.build_payload` start with the model key, so only
+    that value is re-encoded; anything else is decoded and re-serialized.
+    """
+    text = payload.decode("utf-8")
+    if text.startswith(_MODEL_KEY):
+        _, end = _decoder.raw_decode(text, len(_MODEL_KEY))
+        return (_MODEL_KEY + json.dumps(model) + text[end:]).encode("utf-8")
+    body = json.loads(text)
+    body["model"] = model
+    return json.dumps(body).encode("utf-8")
+
+
+# --- Targets (endpoint + model pairs sharing one run) ---
+class Target:
+    """One endpoint and model that receives `weight` shares of the run's requests.
+
+    `url` defaults to the run's host and `model` to the workload's model;
+    `name` tags the target's metrics rows.
+    """
+
+    def __init__(self, name=None, url=None, model=None, weight=1.0, host=None):
+        if float(weight) <= 0:
+            raise ValueError(f"Target weight must be positive: {weight}")
+        self.name = name or "/".join(p for p in [(url or "").split("://")[-1].rstrip("/"), model] if p) or None
+        self.url = url
+        self.model = model
+        self.weight = float(weight)
+        base = url or host
+        # Absolute URL for another host; locust resolves the bare path against --host
+        self.endpoint = base.rstrip("/") + CHAT_COMPLETIONS_PATH if base else CHAT_COMPLETIONS_PATH
+        self.requests = 0
+        self._last_payload = None
+        self._last_body = None
+
+    def payload(self, payload):
+        """The work item's body for this target (memoized, since the fixed prompt reuses one body)."""
+        if self.model is None:
+            return payload
+        if payload is not self._last_payload:
+            self._last_payload, self._last_body = payload, with_model(payload, self.model)
+        return self._last_body
+
+    def describe(self):
+        return {"name": self.name, "url": self.url, "model": self.model, "weight": self.weight, "requests": self.requests}
+
+
+class TargetMix:
+    """Splits requests across targets in proportion to their weights.
+
+    Smooth weighted round-robin interleaves the targets evenly (weights 3:1
+    send A, A, B, A, ... rather than bursts), so every target sees the same
+    load profile and server conditions over the run.
+    """
+
+    def __init__(self, targets):
+        if not targets:
+            raise ValueError("TargetMix needs at least one target")
+        self.targets = targets
+        self._total = sum(t.weight for t in targets)
+        self._current = [0.0] * len(targets)
+
+    def next(self):
+        best = 0
+        for i, target in enumerate(self.targets):
+            self._current[i] += target.weight
+            if self._current[i] > self._current[best]:
+                best = i
+        self._current[best] -= self._total
+        target = self.targets[best]
+        target.requests += 1
+        return target
+
+    def describe(self):
+        return [t.describe() for t in self.targets]
+
+
+def targets_env(targets):
+    """Env vars that hand a list of `{name, url, model, weight}` targets to a load engine subprocess."""
+    return {"TARGETS": json.dumps([{k: v for k, v in t.items() if v not in (None, "")} for t in targets])}
+
+
+def targets_from_env(host=None):
+    """The TARGETS mix, or a single unnamed target for the run's host and workload model."""
+    raw = os.environ.get("TARGETS")
+    if not raw:
+        return TargetMix([Target(host=host)])
+    return TargetMix([
+        Target(t.get("name"), t.get("url"), t.get("model"), t.get("weight", 1.0), host=host)
+        for t in json.loads(raw)
+    ])
@@ -0,0 +1,59 @@
+import math
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from analytics import (error_rate, first_degradation_concurrency, first_failure_concurrency, load_column,
+                       percentiles, summarize, throughput)
+
+
+@pytest.fixture
+def run_df():
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(["2024-01-01 00:00:00", "2024-01-01 00:00:02", "2024-01-01 00:00:05",
+                                     "2024-01-01 00:00:10"]),
+        "ttft": [0.5, 1.0, 3.0, np.nan],
+        "tpot": [0.05, 0.05, 0.1, np.nan],
+        "tps": [20.0, 18.0, 10.0, np.nan],
+        "total_latency": [2.0, 3.0, 6.0, np.nan],
+        "tokens_per_request": [40, 50, 60, np.nan],
+        "concurrent_requests": [1, 2, 4, 8],
+        "status": ["success", "success", "success", "fail"],
+    })
+
+
+def test_throughput_and_error_rate(run_df):
+    tps, rps = throughput(run_df)
+    assert tps == pytest.approx(150 / 10)
+    assert rps == pytest.approx(4 / 10)
+    assert error_rate(run_df) == 25.0
+    assert error_rate(run_df.iloc[:0]) == 0.0
+
+
+def test_first_limits_use_the_start_snapshot_without_avg_concurrency(run_df):
+    assert load_column(run_df) == "concurrent_requests"
+    assert first_failure_concurrency(run_df) == 8
+    assert first_degradation_concurrency(run_df) == 4
+    assert first_degradation_concurrency(run_df, {"ttft": 10.0}) is None
+
+
+def test_time_weighted_concurrency_is_preferred(run_df):
+    run_df["avg_concurrency"] = [1.2, 2.4, 3.6, 6.6]
+    assert load_column(run_df) == "avg_concurrency"
+    assert first_failure_concurrency(run_df) == 7
+
+
+def test_percentiles_ignore_missing_values(run_df):
+    assert percentiles(run_df, "total_latency", (50,)) == {50: 3.0}
+    assert percentiles(run_df.iloc[3:], "total_latency") == {50: None, 95: None, 99: None}
+
+
+def test_summarize(run_df):
+    summary = summarize(run_df)
+    assert (summary["requests"], summary["failures"], summary["duration_sec"]) == (4, 1, 10.0)
+    assert summary["ttft_avg"] == pytest.approx(1.5)
+    assert summary["latency_min"] == 2.0 and summary["latency_max"] == 6.0
+    assert summary["latency_percentiles"][50] == 3.0
+    assert not math.isnan(summary["ttft_at_peak"])
@@ -0,0 +1,40 @@
+import pytest
+
+from arrivals import ArrivalSchedule, DispatchStats, LATE_THRESHOLD, arrival_env
+
+
+def test_rejects_unknown_process():
+    with pytest.raises(ValueError):
+        ArrivalSchedule(10, process="bursty")
+
+
+def test_constant_arrivals_follow_the_ramp():
+    schedule = ArrivalSchedule(10, process="constant", start_rate=2, ramp=10)
+    assert schedule.next_interval(0) == pytest.approx(0.5)
+    assert schedule.rate_at(5) == pytest.approx(6)
+    assert schedule.next_interval(10) == pytest.approx(0.1)
+    assert schedule.next_interval(60) == pytest.approx(0.1)
+
+
+def test_poisson_mean_interval_and_seed():
+    schedule = ArrivalSchedule(20, seed=3)
+    gaps = [schedule.next_interval(0) for _ in range(20000)]
+    assert sum(gaps) / len(gaps) == pytest.approx(1 / 20, rel=0.05)
+    replay = ArrivalSchedule(20, seed=3)
+    assert [replay.next_interval(0) for _ in range(5)] == gaps[:5]
+
+
+def test_from_env_splits_rate_across_workers(monkeypatch):
+    for key, value in arrival_env(12, process="constant", start_rate=4, ramp=30, max_in_flight=9, seed=1).items():
+        monkeypatch.setenv(key, value)
+    schedule = ArrivalSchedule.from_env(share=3)
+    assert (schedule.rate, schedule.start_rate, schedule.ramp, schedule.max_in_flight) == (4, 4 / 3, 30, 3)
+    assert schedule.process == "constant"
+
+
+def test_dispatch_stats():
+    stats = DispatchStats()
+    stats.record(0.0, dropped=False)
+    stats.record(LATE_THRESHOLD * 2, dropped=False)
+    stats.record(0.5, dropped=True)
+    assert stats.as_dict() == {"scheduled": 3, "dispatched": 2, "late": 1, "dropped": 1, "max_lag": 0.5}
@@ -0,0 +1,58 @@
+import csv
+import json
+import os
+
+import pytest
+
+from launcher import merge_shards, parse_run_time, shard_metrics_path
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    return tmp_path / "data"
+
+
+def write_shard(worker, rows, header=("timestamp", "status")):
+    with open(shard_metrics_path("run", worker), "w", newline="") as f:
+        writer = csv.writer(f)
+        if header:
+            writer.writerow(header)
+        writer.writerows(rows)
+
+
+@pytest.mark.parametrize("run_time, seconds", [("30s", 30), ("2m", 120), ("1m30s", 90), (" 5M ", 300)])
+def test_parse_run_time(run_time, seconds):
+    assert parse_run_time(run_time) == seconds
+
+
+def test_merge_shards_without_shards(data_dir):
+    assert merge_shards("run") == 0
+
+
+def test_merge_shards_interleaves_rows_by_timestamp(data_dir):
+    write_shard(0, [["2024-01-01 00:00:01", "success"], ["2024-01-01 00:00:03", "success"]])
+    write_shard(1, [["2024-01-01 00:00:02", "fail"]])
+    assert merge_shards("run") == 2
+    with open(data_dir / "run_metrics.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [["timestamp", "status"], ["2024-01-01 00:00:01", "success"],
+                    ["2024-01-01 00:00:02", "fail"], ["2024-01-01 00:00:03", "success"]]
+    assert sorted(os.listdir(data_dir)) == ["run_metrics.csv"]
+
+
+def test_merge_shards_with_all_empty_shards(data_dir):
+    write_shard(0, [], header=None)
+    write_shard(1, [], header=None)
+    for worker, dropped in ((0, 2), (1, 3)):
+        with open(data_dir / f"run_config.w{worker}.json", "w") as f:
+            json.dump({"engine": "locust", "metrics_writer": {"dropped_rows": dropped, "dropped_chunk_records": 0}}, f)
+
+    assert merge_shards("run") == 2
+    assert not (data_dir / "run_metrics.csv").exists()
+    with open(data_dir / "run_config.json") as f:
+        config = json.load(f)
+    assert config["engine"] == "locust"
+    assert config["metrics_writer"] == {"dropped_rows": 5, "dropped_chunk_records": 0}
+    assert sorted(os.listdir(data_dir)) == ["run_config.json"]
@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from live_metrics import LiveAggregator, MetricsTail
+
+METRICS = "timestamp,ttft,tokens_per_request,concurrent_requests,status\n"
+TIMELINE = "timestamp,in_flight,in_flight_avg,streaming,queued,active_users\n"
+
+
+def test_tail_holds_back_partial_lines(tmp_path):
+    path = tmp_path / "run_metrics.csv"
+    path.write_text(METRICS + "2024-01-01 00:00:00,0.5,10,1,success\n2024-01-01 00:00:0")
+    tail = MetricsTail(str(tmp_path / "run_metrics*.csv"))
+    assert tail.poll() == [["2024-01-01 00:00:00", "0.5", "10", "1", "success"]]
+    with open(path, "a") as f:
+        f.write("1,N/A,0,2,fail\n")
+    assert tail.poll() == [["2024-01-01 00:00:01", "N/A", "0", "2", "fail"]]
+    assert tail.poll() == []
+
+
+def test_in_flight_sums_worker_timelines_while_nothing_completes(tmp_path):
+    epoch = time.mktime(time.strptime("2024-01-01 00:00:05", "%Y-%m-%d %H:%M:%S"))
+    (tmp_path / "run_metrics.csv").write_text(METRICS + "2024-01-01 00:00:05,0.5,10,3,success\n")
+    for worker, counts in ((0, (3, 4)), (1, (2, 6))):
+        rows = "".join(f"{epoch + i:.3f},{n},{n},{n},0,8\n" for i, n in enumerate(counts))
+        (tmp_path / f"run_concurrency.w{worker}.csv").write_text(TIMELINE + rows)
+
+    metrics_tail = MetricsTail(str(tmp_path / "run_metrics*.csv"))
+    timeline_tail = MetricsTail(str(tmp_path / "run_concurrency*.csv"))
+    live = LiveAggregator()
+    rows = metrics_tail.poll()
+    live.update(metrics_tail.header, rows)
+    live.update_timeline(timeline_tail.header, timeline_tail.poll_files())
+
+    df = live.frame()
+    assert list(df["in_flight"]) == [5, 10]
+    assert df["concurrency_at_start"].iloc[0] == 3
+    assert df["rps"].tolist() == [1, 0]
+    assert df["error_rate"].isna().tolist() == [False, True]
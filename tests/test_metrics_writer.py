@@ -0,0 +1,71 @@
+import csv
+import threading
+from array import array
+
+import pytest
+
+from metrics_writer import BatchWriter, ChunkTimesWriter, MetricsWriter, read_chunk_times
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_batch_writer_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        BatchWriter(str(tmp_path / "rows.csv"))
+
+
+@pytest.mark.parametrize("max_queue", [50000, 7])
+def test_rows_keep_write_order_under_concurrent_flushes(tmp_path, max_queue):
+    path = str(tmp_path / "rows.csv")
+    writer = MetricsWriter(path, ["n"], batch_size=5, flush_interval=0.001, max_queue=max_queue)
+    done = threading.Event()
+
+    def flush_repeatedly():
+        while not done.is_set():
+            writer.flush()
+
+    flushers = [threading.Thread(target=flush_repeatedly) for _ in range(4)]
+    for t in flushers:
+        t.start()
+    for n in range(5000):
+        writer.write([n])
+    done.set()
+    for t in flushers:
+        t.join()
+    writer.close()
+
+    rows = read_rows(path)
+    assert rows[0] == ["n"]
+    assert [int(row[0]) for row in rows[1:]] == list(range(5000))
+
+
+def test_header_written_once_when_appending(tmp_path):
+    path = str(tmp_path / "rows.csv")
+    for value in ("a", "b"):
+        writer = MetricsWriter(path, ["col"])
+        writer.write([value])
+        writer.close()
+    assert read_rows(path) == [["col"], ["a"], ["b"]]
+
+
+def test_writes_after_close_are_counted(tmp_path, capsys):
+    writer = MetricsWriter(str(tmp_path / "rows.csv"), ["col"])
+    writer.write(["kept"])
+    writer.close()
+    writer.write(["late"])
+    writer.write(["later"])
+    assert writer.dropped == 2
+    assert read_rows(writer.path) == [["col"], ["kept"]]
+    assert capsys.readouterr().err.count("dropping rows") == 1
+
+
+def test_chunk_times_round_trip(tmp_path):
+    path = str(tmp_path / "chunks.bin")
+    writer = ChunkTimesWriter(path)
+    writer.write((1, array("f", [0.5, 0.75])))
+    writer.write((2, array("f")))
+    writer.close()
+    assert [(rid, list(offsets)) for rid, offsets in read_chunk_times(path)] == [(1, [0.5, 0.75]), (2, [])]
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from sketches import DEFAULT_RELATIVE_ACCURACY, SKETCH_QUANTILES, QuantileSketch, WindowedSketches
+
+
+def exact_quantile(values, q):
+    """The rank QuantileSketch targets: the value at index floor(q * (n - 1))."""
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def samples(distribution, n=20000, seed=7):
+    rng = random.Random(seed)
+    draw = {
+        "lognormal": lambda: rng.lognormvariate(-1, 1.5),
+        "uniform": lambda: rng.uniform(0.001, 30),
+        "exponential": lambda: rng.expovariate(5),
+    }[distribution]
+    return [draw() for _ in range(n)]
+
+
+@pytest.mark.parametrize("distribution", ["lognormal", "uniform", "exponential"])
+@pytest.mark.parametrize("relative_accuracy", [DEFAULT_RELATIVE_ACCURACY, 0.05])
+def test_quantiles_within_relative_accuracy(distribution, relative_accuracy):
+    values = samples(distribution)
+    sketch = QuantileSketch(relative_accuracy)
+    for v in values:
+        sketch.add(v)
+    for q in [0.0, 0.25] + SKETCH_QUANTILES + [1.0]:
+        exact = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= relative_accuracy * exact
+
+
+def test_merged_sketch_matches_single_sketch():
+    values = samples("lognormal")
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i, v in enumerate(values):
+        whole.add(v)
+        (left if i % 2 else right).add(v)
+    merged = left.merge(right)
+    assert merged.count == whole.count
+    for q in SKETCH_QUANTILES:
+        assert merged.quantile(q) == whole.quantile(q)
+
+
+def test_skips_missing_values_and_counts_zeros():
+    sketch = QuantileSketch()
+    for v in (None, float("nan"), 0.0, 0.0, 1.0):
+        sketch.add(v)
+    assert sketch.count == 3
+    assert sketch.quantile(0.5) == 0.0
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+
+def test_windowed_sketches_round_trip(tmp_path):
+    ws = WindowedSketches(window_seconds=10)
+    ws.add_many({"ttft": [0.1, 0.2, 0.3], "itl": 0.05}, now=100)
+    ws.add("ttft", 0.4, now=115)
+    path = str(tmp_path / "sketches.json")
+    ws.save(path)
+
+    loaded = WindowedSketches.load(path)
+    assert sorted(loaded.windows) == [100, 110]
+    assert loaded.overall("ttft").count == 4
+    assert [row["count"] for row in loaded.quantile_rows("ttft")] == [3, 1]
+    assert loaded.quantile_rows("ttft")[0]["p50"] == pytest.approx(0.2, rel=DEFAULT_RELATIVE_ACCURACY)
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from sse_parser import StreamStats, extract_content, iter_data
+
+
+def data_line(chunk):
+    return b"data: " + json.dumps(chunk).encode("utf-8")
+
+
+def delta_chunk(delta, **choice):
+    return {"id": "c1", "choices": [{"index": 0, "delta": delta, **choice}]}
+
+
+# --- extract_content ---
+@pytest.mark.parametrize("chunk, expected", [
+    (delta_chunk({"content": "Hello"}), "Hello"),
+    (delta_chunk({"role": "assistant", "content": ""}), ""),
+    (delta_chunk({"content": None}), ""),
+    (delta_chunk({}), ""),
+    ({"choices": []}, ""),
+    # Escaped quotes and unicode fall back to a full decode
+    (delta_chunk({"content": 'say "hi"\n'}), 'say "hi"\n'),
+    (delta_chunk({"content": "café ☃"}), "café ☃"),
+    # A nested value before the key means `content` may belong to it
+    (delta_chunk({"tool_calls": [{"function": {"content": "nested"}}], "content": "top"}), "top"),
+    (delta_chunk({"tool_calls": [{"function": {"content": "nested"}}]}), ""),
+    # `content` keys outside the delta are never taken for it
+    ({"choices": [{"message": {"content": "message"}, "delta": {"content": "delta"}}]}, "delta"),
+    ({"choices": [{"logprobs": {"content": [{"token": "x"}]}, "delta": {"content": "y"}}]}, "y"),
+    ({"choices": [{"delta": {"role": "assistant"}, "logprobs": {"content": [{"token": "x"}]}}]}, ""),
+])
+def test_extract_content_matches_full_decode(chunk, expected):
+    line = data_line(chunk)
+    assert extract_content(line, len(b"data: ")) == expected
+
+
+def test_extract_content_raises_on_malformed_fallback():
+    with pytest.raises(ValueError):
+        extract_content(b'data: {"choices": [{"delta": {"content": "a\\"b"', 6)
+
+
+# --- Streams ---
+def test_iter_data_stops_at_done():
+    lines = [b": keep-alive", b"", data_line(delta_chunk({"content": "a"})), b"data:[DONE]",
+             data_line(delta_chunk({"content": "b"}))]
+    assert [extract_content(line, start) for line, start in iter_data(lines)] == ["a"]
+
+
+def test_stream_stats_reads_usage_chunk():
+    stats = StreamStats(start_time=0.0)
+    for line, start in iter_data([
+        data_line(delta_chunk({"content": "Hel"})),
+        data_line(delta_chunk({"content": "lo"})),
+        data_line({"choices": [], "usage": {"completion_tokens": 2}}),
+    ]):
+        stats.feed(line, start)
+    assert stats.text() == "Hello"
+    assert stats.usage == {"completion_tokens": 2}
+    assert len(stats.chunk_offsets) == 2
+    assert stats.ttft == stats.chunk_offsets[0]
@@ -0,0 +1,50 @@
+import pytest
+
+import token_counter
+from token_counter import METHOD_TOKENIZER, METHOD_USAGE, METHOD_WHITESPACE, TokenCounter
+
+
+@pytest.fixture
+def no_tokenizer_env(monkeypatch):
+    monkeypatch.delenv("TOKENIZER", raising=False)
+
+
+def test_prefers_server_usage(no_tokenizer_env):
+    counter = TokenCounter()
+    assert counter.count("one two three", {"completion_tokens": 7}) == (7, METHOD_USAGE)
+    assert counter.count("one two three", {"completion_tokens": None}) == (3, METHOD_WHITESPACE)
+    assert counter.count("one two", None) == (2, METHOD_WHITESPACE)
+    assert counter.summary() == {
+        "method": METHOD_WHITESPACE,
+        "tokenizer": None,
+        "requests_by_method": {METHOD_USAGE: 1, METHOD_WHITESPACE: 2},
+    }
+
+
+def test_estimate_does_not_record_a_method(no_tokenizer_env):
+    counter = TokenCounter()
+    assert counter.estimate("a b c d") == 4
+    assert counter.summary()["method"] is None
+
+
+def test_tokenizer_results_are_memoized(monkeypatch):
+    calls = []
+
+    def encode(text):
+        calls.append(text)
+        return list(text)
+
+    monkeypatch.setattr(token_counter, "load_tokenizer", lambda name=None: (encode, "chars"))
+    counter = TokenCounter()
+    assert counter.count("abc") == (3, METHOD_TOKENIZER)
+    assert counter.count("abc") == (3, METHOD_TOKENIZER)
+    assert counter.estimate("abc") == 3
+    assert calls == ["abc"]
+    assert counter.summary()["tokenizer"] == "chars"
+
+
+def test_unavailable_tokenizer_falls_back_to_whitespace(monkeypatch, capsys):
+    monkeypatch.setenv("TOKENIZER", "no-such-tokenizer-anywhere")
+    counter = TokenCounter()
+    assert counter.count("a b") == (2, METHOD_WHITESPACE)
+    assert "falling back to whitespace" in capsys.readouterr().out
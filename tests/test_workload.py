@@ -0,0 +1,72 @@
+import json
+from collections import Counter
+
+import pytest
+
+from workload import DatasetReplay, PrefixCacheWorkload
+
+
+def system_prompt(item):
+    return json.loads(item.payload)["messages"][0]["content"]
+
+
+# --- Prefix Cache Workload ---
+def test_prefix_bookkeeping_tracks_the_recent_window():
+    workload = PrefixCacheWorkload(prefix_tokens=4, suffix_tokens=2, share_ratio=0.7, reuse_distance=5, seed=11)
+    for _ in range(5000):
+        workload.next()
+    recent = Counter(workload._recent)
+    assert workload._occurrences == dict(recent)
+    assert set(workload._prefixes) <= set(recent)
+    assert set(workload._last_sent) == set(recent)
+
+
+def test_prefix_hits_reuse_the_same_prefix_text():
+    workload = PrefixCacheWorkload(prefix_tokens=8, suffix_tokens=2, share_ratio=0.9, reuse_distance=3, seed=5)
+    seen = {}
+    hits = 0
+    for sequence in range(1, 500):
+        item = workload.next()
+        hit, distance = item.prefix
+        prefix = system_prompt(item)
+        if hit:
+            hits += 1
+            assert sequence - distance == seen[prefix]
+        else:
+            assert distance is None
+        seen[prefix] = sequence
+    assert hits == workload.hits > 0
+
+
+def test_prefix_workload_is_seeded():
+    def prompts(seed):
+        workload = PrefixCacheWorkload(prefix_tokens=4, suffix_tokens=2, seed=seed)
+        return [workload.next().payload for _ in range(50)]
+    assert prompts(1) == prompts(1)
+    assert prompts(1) != prompts(2)
+
+
+# --- Dataset Replay ---
+def write_jsonl(path, records):
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+    return str(path)
+
+
+def test_weighted_records_replay_proportionally(tmp_path):
+    path = write_jsonl(tmp_path / "prompts.jsonl", [{"prompt": "light"}, {"prompt": "heavy", "weight": 3}])
+    replay = DatasetReplay(path, seed=0, buffer_size=1)
+    prompts = Counter(json.loads(replay.next().payload)["messages"][0]["content"] for _ in range(400))
+    assert prompts == {"light": 100, "heavy": 300}
+
+
+@pytest.mark.parametrize("weight", ["2", 0, 0.5, -1, True, float("inf"), [1]])
+def test_invalid_weight_names_the_record(tmp_path, weight):
+    path = write_jsonl(tmp_path / "prompts.jsonl", [{"prompt": "ok"}, {"text": "bad", "weight": weight}])
+    with pytest.raises(ValueError, match="record 2"):
+        DatasetReplay(path, buffer_size=4)
+
+
+def test_dataset_without_prompts(tmp_path):
+    path = write_jsonl(tmp_path / "prompts.jsonl", [{"other": 1}])
+    with pytest.raises(ValueError, match="No usable prompts"):
+        DatasetReplay(path)
@@ -0,0 +1,81 @@
+import os
+from collections import Counter
+from functools import lru_cache
+
+# --- Counting Methods (recorded in the run's config JSON) ---
+METHOD_USAGE = "server_usage"
+METHOD_TOKENIZER = "tokenizer"
+METHOD_WHITESPACE = "whitespace"
+
+
+# --- Offline Tokenizer Loading ---
+def load_tokenizer(name=None):
+    """Load a tokenizer from local files only; returns (encode_fn, label) or (None, None).
+
+    `name` (or the TOKENIZER env var) may be a Hugging Face model id or a local
+    path, tried with `local_files_only=True`, or a tiktoken encoding name.
+    Nothing is downloaded during a load test.
+    """
+    name = name or os.environ.get("TOKENIZER")
+    if not name:
+        return None, None
+
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(name, local_files_only=True)
+        return (lambda text: tokenizer.encode(text, add_special_tokens=False)), f"hf:{name}"
+    except Exception:
+        pass
+
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(name)
+        return encoding.encode_ordinary, f"tiktoken:{name}"
+    except Exception:
+        pass
+
+    print(f"Warning: tokenizer '{name}' not available locally, falling back to whitespace counting.")
+    return None, None
+
+
+# --- Token Counter ---
+class TokenCounter:
+    """Counts completion tokens, preferring the server's `usage` block.
+
+    Falls back to a locally loaded tokenizer over the full completion text,
+    and to whitespace splitting when no tokenizer is configured. Tokenizer
+    results are memoized so repeated completions are only encoded once.
+    Tracks how many requests used each method.
+    """
+
+    def __init__(self, tokenizer=None, cache_size=4096):
+        self._encode, self.tokenizer_label = load_tokenizer(tokenizer)
+        self.methods = Counter()
+        if self._encode is not None:
+            self._count_text = lru_cache(maxsize=cache_size)(lambda text: len(self._encode(text)))
+
+    def count(self, text, usage=None):
+        """Return `(tokens, method)` for one completed request."""
+        if usage and usage.get("completion_tokens") is not None:
+            method, tokens = METHOD_USAGE, int(usage["completion_tokens"])
+        elif self._encode is not None:
+            method, tokens = METHOD_TOKENIZER, self._count_text(text)
+        else:
+            method, tokens = METHOD_WHITESPACE, len(text.split())
+        self.methods[method] += 1
+        return tokens, method
+
+    def estimate(self, text):
+        """Token count of `text` without recording a method (used for prompt lengths)."""
+        if self._encode is not None:
+            return self._count_text(text)
+        return len(text.split())
+
+    def summary(self):
+        """Counting-method summary for the run's config JSON."""
+        primary = self.methods.most_common(1)[0][0] if self.methods else None
+        return {
+            "method": primary,
+            "tokenizer": self.tokenizer_label,
+            "requests_by_method": dict(self.methods),
+        }
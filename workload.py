@@ -0,0 +1,387 @@
+import json
+import math
+import os
+import random
+from collections import deque
+
+# --- Request Defaults (shared by the Locust and asyncio engines) ---
+CHAT_COMPLETIONS_PATH = "/v1/chat/completions"
+DEFAULT_MODEL = "meta/llama-3.1-70b-instruct"
+DEFAULT_PROMPT = "Explain General Relativity in simple terms?"
+REQUEST_HEADERS = {"Content-Type": "application/json"}
+
+
+def build_payload(prompt=DEFAULT_PROMPT, model=DEFAULT_MODEL, messages=None, **extra):
+    """Return the pre-encoded streaming chat completions body for `prompt` (or explicit `messages`)."""
+    payload = {
+        "model": model,
+        "messages": messages or [{"role": "user", "content": prompt}],
+        "stream": True,
+        "stream_options": {"include_usage": True},
+        **extra,
+    }
+    return json.dumps(payload)
+
+
+# --- Length Bins (recorded on each metrics row) ---
+LENGTH_BIN_EDGES = [128, 512, 1024, 2048, 4096, 8192]
+LENGTH_BIN_LABELS = ["0-128", "128-512", "512-1k", "1k-2k", "2k-4k", "4k-8k", "8k+"]
+
+
+def length_bin(tokens):
+    if tokens is None:
+        return "N/A"
+    for edge, label in zip(LENGTH_BIN_EDGES, LENGTH_BIN_LABELS):
+        if tokens < edge:
+            return label
+    return LENGTH_BIN_LABELS[-1]
+
+
+# --- Work Items ---
+class WorkItem:
+    """One pre-serialized request body plus what we know about its prompt.
+
+    `prefix` is `(hit, reuse_distance)` for prefix-cache workloads, else None.
+    """
+
+    __slots__ = ("payload", "input_tokens", "prefix")
+
+    def __init__(self, payload, input_tokens=None, prefix=None):
+        self.payload = payload
+        self.input_tokens = input_tokens
+        self.prefix = prefix
+
+
+class FixedPrompt:
+    """The default workload: the same prompt on every request."""
+
+    def __init__(self, token_counter=None, prompt=DEFAULT_PROMPT):
+        input_tokens = token_counter.estimate(prompt) if token_counter else None
+        self.item = WorkItem(build_payload(prompt).encode("utf-8"), input_tokens)
+
+    def next(self):
+        return self.item
+
+    def describe(self):
+        return {"source": "fixed_prompt", "model": DEFAULT_MODEL}
+
+
+# --- Dataset Replay ---
+PROMPT_FIELDS = ["prompt", "content", "body", "text", "question"]
+
+
+def iter_jsonl(path):
+    """Lazily yield parsed records from a JSONL file, skipping blank and malformed lines."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def record_messages(record, prompt_field=None):
+    """Chat messages for a dataset record: its `messages` list, or a user turn built from a prompt field."""
+    if isinstance(record.get("messages"), list):
+        return record["messages"]
+    fields = [prompt_field] if prompt_field else PROMPT_FIELDS
+    for field in fields:
+        if isinstance(record.get(field), str) and record[field]:
+            return [{"role": "user", "content": record[field]}]
+    return None
+
+
+class DatasetReplay:
+    """Replays prompts from a JSONL file without loading it into memory.
+
+    The file is streamed (and restarted at EOF) into a bounded buffer of
+    pre-serialized payloads. Each request picks a random buffered entry
+    with a seeded RNG; an entry is replaced by the next record once it has
+    been used `weight` times, so heavier records are replayed proportionally
+    more often. `weight` is a reuse count: a number >= 1 (default 1,
+    fractions round up); anything else raises ValueError naming the record.
+    A record's `max_tokens`, when present, is sent with its payload.
+    """
+
+    def __init__(self, path, token_counter=None, seed=None, buffer_size=1024, prompt_field=None, model=DEFAULT_MODEL):
+        self.path = path
+        self.seed = seed
+        self.buffer_size = buffer_size
+        self.prompt_field = prompt_field
+        self.model = model
+        self.token_counter = token_counter
+        self._random = random.Random(seed)
+        self._records = self._cycle()
+        self._buffer = []  # [WorkItem, remaining uses]
+        self.loaded = 0
+        while len(self._buffer) < buffer_size:
+            entry = self._next_entry()
+            if entry is None:
+                break
+            self._buffer.append(entry)
+        if not self._buffer:
+            raise ValueError(f"No usable prompts in {path}")
+
+    def _cycle(self):
+        # Restart at EOF only while the previous pass yielded a usable record, so a dataset without prompts ends
+        while True:
+            loaded = self.loaded
+            yield from enumerate(iter_jsonl(self.path), 1)
+            if self.loaded == loaded:
+                return
+
+    def _next_entry(self):
+        for index, record in self._records:
+            messages = record_messages(record, self.prompt_field)
+            if not messages:
+                continue
+            extra = {"max_tokens": record["max_tokens"]} if record.get("max_tokens") else {}
+            payload = build_payload(model=record.get("model", self.model), messages=messages, **extra).encode("utf-8")
+            input_tokens = None
+            if self.token_counter is not None:
+                input_tokens = self.token_counter.estimate(" ".join(str(m.get("content", "")) for m in messages))
+            self.loaded += 1
+            return [WorkItem(payload, input_tokens), self._weight(record, index)]
+        return None
+
+    def _weight(self, record, index):
+        weight = record.get("weight")
+        if weight is None:
+            return 1
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not weight >= 1 or math.isinf(weight):
+            raise ValueError(f"{self.path}: record {index} has weight {weight!r}; "
+                             f"expected a reuse count (a number >= 1)")
+        return math.ceil(weight)
+
+    def next(self):
+        idx = self._random.randrange(len(self._buffer))
+        entry = self._buffer[idx]
+        entry[1] -= 1
+        if entry[1] <= 0:
+            replacement = self._next_entry()
+            if replacement is not None:
+                self._buffer[idx] = replacement
+        return entry[0]
+
+    def describe(self):
+        return {
+            "source": "dataset",
+            "model": self.model,
+            "path": self.path,
+            "seed": self.seed,
+            "buffer_size": self.buffer_size,
+            "prompt_field": self.prompt_field,
+            "records_loaded": self.loaded,
+        }
+
+
+def dataset_env(path, seed=None, buffer_size=1024, prompt_field=None):
+    """Env vars that point a load engine subprocess at a replay dataset."""
+    env = {"DATASET_PATH": path, "DATASET_BUFFER": str(buffer_size)}
+    if seed is not None:
+        env["DATASET_SEED"] = str(seed)
+    if prompt_field:
+        env["DATASET_PROMPT_FIELD"] = prompt_field
+    return env
+
+
+# --- Prefix-Cache Workload ---
+PREFIX_VOCABULARY = (
+    "system model cache token prefix request latency server batch memory context window document section policy "
+    "customer account order record table column value report summary detail example question answer reason step "
+    "result input output query response service region cluster node network storage compute schedule queue"
+).split()
+
+
+class PrefixCacheWorkload:
+    """Prompt families that share a long common prefix, for measuring prefix (KV) cache reuse.
+
+    Each request is a system message holding its family's prefix (about
+    `prefix_tokens` words) plus a unique user suffix (about `suffix_tokens`
+    words). With probability `share_ratio` a request reuses the prefix of a
+    family sent roughly `reuse_distance` requests earlier (exponentially
+    distributed); otherwise it starts a new family. Every item is tagged
+    with `(hit, distance)`: whether this process sent its prefix before, and
+    how many requests ago it was last sent.
+    """
+
+    def __init__(self, token_counter=None, prefix_tokens=1024, suffix_tokens=32, share_ratio=0.8, reuse_distance=10,
+                 seed=None, model=DEFAULT_MODEL):
+        self.prefix_tokens = prefix_tokens
+        self.suffix_tokens = suffix_tokens
+        self.share_ratio = share_ratio
+        self.reuse_distance = reuse_distance
+        self.seed = seed
+        self.model = model
+        self.token_counter = token_counter
+        self._random = random.Random(seed)
+        self._recent = deque(maxlen=max(int(reuse_distance) * 8, 1024))  # family ids in send order
+        self._occurrences = {}  # family id -> times it appears in `_recent`
+        self._last_sent = {}  # family id -> request sequence number
+        self._prefixes = {}  # family id -> (prefix text, estimated tokens), for families still in `_recent`
+        self._families = 0
+        self._sequence = 0
+        self.hits = 0
+
+    def _words(self, rng, n):
+        return " ".join(rng.choice(PREFIX_VOCABULARY) for _ in range(n))
+
+    def _prefix(self, family):
+        cached = self._prefixes.get(family)
+        if cached is None:
+            # Seeded per family, so the same family always renders the same prefix text
+            text = self._words(random.Random(f"{self.seed}-{family}"), self.prefix_tokens)
+            tokens = self.token_counter.estimate(text) if self.token_counter is not None else None
+            cached = self._prefixes[family] = (text, tokens)
+        return cached
+
+    def _pick_family(self):
+        if self._recent and self._random.random() < self.share_ratio:
+            back = min(int(self._random.expovariate(1 / max(self.reuse_distance, 1))) + 1, len(self._recent))
+            return self._recent[-back]
+        self._families += 1
+        return self._families
+
+    def next(self):
+        self._sequence += 1
+        family = self._pick_family()
+        last = self._last_sent.get(family)
+        hit = last is not None
+        if hit:
+            self.hits += 1
+
+        if len(self._recent) == self._recent.maxlen:
+            evicted = self._recent[0]
+            remaining = self._occurrences[evicted] - 1
+            if remaining:
+                self._occurrences[evicted] = remaining
+            else:
+                del self._occurrences[evicted]
+                if evicted != family:
+                    self._prefixes.pop(evicted, None)
+                    self._last_sent.pop(evicted, None)
+        self._recent.append(family)
+        self._occurrences[family] = self._occurrences.get(family, 0) + 1
+        self._last_sent[family] = self._sequence
+
+        prefix, prefix_tokens = self._prefix(family)
+        suffix = f"Request {self._sequence}: " + self._words(self._random, self.suffix_tokens)
+        messages = [{"role": "system", "content": prefix}, {"role": "user", "content": suffix}]
+        input_tokens = None
+        if self.token_counter is not None:
+            input_tokens = (prefix_tokens or 0) + self.token_counter.estimate(suffix)
+        payload = build_payload(model=self.model, messages=messages).encode("utf-8")
+        return WorkItem(payload, input_tokens, (hit, self._sequence - last if hit else None))
+
+    def describe(self):
+        return {
+            "source": "prefix_cache",
+            "model": self.model,
+            "prefix_tokens": self.prefix_tokens,
+            "suffix_tokens": self.suffix_tokens,
+            "share_ratio": self.share_ratio,
+            "reuse_distance": self.reuse_distance,
+            "seed": self.seed,
+            "requests": self._sequence,
+            "families": self._families,
+            "prefix_hits": self.hits,
+        }
+
+
+def prefix_env(prefix_tokens=1024, suffix_tokens=32, share_ratio=0.8, reuse_distance=10, seed=None):
+    """Env vars that switch a load engine subprocess to the prefix-cache workload."""
+    env = {
+        "WORKLOAD_MODE": "prefix",
+        "PREFIX_TOKENS": str(prefix_tokens),
+        "PREFIX_SUFFIX_TOKENS": str(suffix_tokens),
+        "PREFIX_SHARE_RATIO": str(share_ratio),
+        "PREFIX_REUSE_DISTANCE": str(reuse_distance),
+    }
+    if seed is not None:
+        env["PREFIX_SEED"] = str(seed)
+    return env
+
+
+# --- Synthetic Prompts (fixed length, unique per request) ---
+class SyntheticPrompt:
+    """Random-word prompts of about `prompt_tokens` words, optionally capped at `max_tokens` output.
+
+    Every request gets fresh text, so server prefix caches cannot hide the
+    cost of the prompt length being measured.
+    """
+
+    def __init__(self, token_counter=None, prompt_tokens=128, max_tokens=None, seed=None, model=DEFAULT_MODEL):
+        self.prompt_tokens = prompt_tokens
+        self.max_tokens = max_tokens
+        self.seed = seed
+        self.model = model
+        self.token_counter = token_counter
+        self._random = random.Random(seed)
+        self._extra = {"max_tokens": max_tokens} if max_tokens else {}
+        self.requests = 0
+
+    def next(self):
+        self.requests += 1
+        prompt = " ".join(self._random.choices(PREFIX_VOCABULARY, k=self.prompt_tokens))
+        input_tokens = self.token_counter.estimate(prompt) if self.token_counter is not None else None
+        return WorkItem(build_payload(prompt, model=self.model, **self._extra).encode("utf-8"), input_tokens)
+
+    def describe(self):
+        return {
+            "source": "synthetic",
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "max_tokens": self.max_tokens,
+            "seed": self.seed,
+            "requests": self.requests,
+        }
+
+
+def synthetic_env(prompt_tokens=128, max_tokens=None, seed=None):
+    """Env vars that switch a load engine subprocess to fixed-length synthetic prompts."""
+    env = {"WORKLOAD_MODE": "synthetic", "PROMPT_TOKENS": str(prompt_tokens)}
+    if max_tokens:
+        env["MAX_TOKENS"] = str(max_tokens)
+    if seed is not None:
+        env["SYNTHETIC_SEED"] = str(seed)
+    return env
+
+
+def workload_from_env(token_counter=None, seed_offset=0):
+    """Prefix-cache families when WORKLOAD_MODE=prefix, synthetic prompts when WORKLOAD_MODE=synthetic,
+    dataset replay when DATASET_PATH is set, otherwise the fixed default prompt.
+
+    `seed_offset` (the worker index) keeps workers from replaying the same sequence.
+    """
+    if os.environ.get("WORKLOAD_MODE") == "prefix":
+        seed = int(os.environ.get("PREFIX_SEED", 0)) + seed_offset
+        return PrefixCacheWorkload(
+            token_counter=token_counter,
+            prefix_tokens=int(os.environ.get("PREFIX_TOKENS", 1024)),
+            suffix_tokens=int(os.environ.get("PREFIX_SUFFIX_TOKENS", 32)),
+            share_ratio=float(os.environ.get("PREFIX_SHARE_RATIO", 0.8)),
+            reuse_distance=float(os.environ.get("PREFIX_REUSE_DISTANCE", 10)),
+            seed=seed,
+        )
+    if os.environ.get("WORKLOAD_MODE") == "synthetic":
+        max_tokens = os.environ.get("MAX_TOKENS")
+        return SyntheticPrompt(
+            token_counter=token_counter,
+            prompt_tokens=int(os.environ.get("PROMPT_TOKENS", 128)),
+            max_tokens=int(max_tokens) if max_tokens else None,
+            seed=int(os.environ.get("SYNTHETIC_SEED", 0)) + seed_offset,
+        )
+    path = os.environ.get("DATASET_PATH")
+    if not path:
+        return FixedPrompt(token_counter)
+    seed = os.environ.get("DATASET_SEED")
+    return DatasetReplay(
+        path,
+        token_counter=token_counter,
+        seed=int(seed) + seed_offset if seed is not None else None,
+        buffer_size=int(os.environ.get("DATASET_BUFFER", 1024)),
+        prompt_field=os.environ.get("DATASET_PROMPT_FIELD"),
+    )